@@ -29,7 +29,9 @@ CREATE TABLE clients (
   CONSTRAINT chk_client_email CHECK (email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'),
   CONSTRAINT chk_client_phone CHECK (phone REGEXP '^[0-9]+$'),
   INDEX idx_client_name (full_name),
-  INDEX idx_client_email (email)
+  INDEX idx_client_email (email),
+  FULLTEXT INDEX ft_client_search (full_name, email, address),
+  FULLTEXT INDEX ft_client_name (full_name)
 ) ENGINE=InnoDB;
 
 /* 3. HABITACIONES */
@@ -54,7 +56,8 @@ CREATE TABLE staff (
   hire_date DATE NOT NULL,
   active TINYINT(1) NOT NULL DEFAULT 1,
   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  INDEX idx_staff_name (full_name)
+  INDEX idx_staff_name (full_name),
+  FULLTEXT INDEX ft_staff_search (full_name, staff_role, area)
 ) ENGINE=InnoDB;
 
 /* 5. SERVICIOS */
@@ -65,7 +68,9 @@ CREATE TABLE services (
   description TEXT NULL,
   price DECIMAL(10,2) NOT NULL,
   status ENUM('activo','inactivo') NOT NULL DEFAULT 'activo',
-  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  FULLTEXT INDEX ft_service_search (name, description),
+  FULLTEXT INDEX ft_service_name (name)
 ) ENGINE=InnoDB;
 
 /* 6. RESERVAS */
@@ -87,8 +92,10 @@ CREATE TABLE reservations (
   CONSTRAINT chk_guest_email CHECK (guest_email IS NULL OR guest_email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'),
   CONSTRAINT chk_guest_phone CHECK (guest_phone IS NULL OR guest_phone REGEXP '^[0-9]+$'),
   INDEX idx_res_dates (checkin_date, checkout_date),
+  INDEX idx_res_room_dates (room_id, checkin_date, checkout_date),
   INDEX idx_res_status (status),
-  INDEX idx_guest_name (guest_name)
+  INDEX idx_guest_name (guest_name),
+  FULLTEXT INDEX ft_guest_name (guest_name)
 ) ENGINE=InnoDB;
 
 /* Trigger para generar reservation_code automáticamente 
@@ -111,6 +118,7 @@ CREATE TABLE reservation_services (
   quantity INT NOT NULL DEFAULT 1,
   unit_price DECIMAL(10,2) NOT NULL,
   added_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  service_date DATE NULL,
   CONSTRAINT fk_rs_reservation FOREIGN KEY (reservation_id) REFERENCES reservations(reservation_id) ON DELETE CASCADE,
   CONSTRAINT fk_rs_service FOREIGN KEY (service_id) REFERENCES services(service_id)
 ) ENGINE=InnoDB;
@@ -124,12 +132,21 @@ CREATE TABLE invoices (
   method ENUM('efectivo','tarjeta','transferencia') NOT NULL,
   invoice_date DATE NOT NULL,
   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  CONSTRAINT fk_invoices_reservation FOREIGN KEY (reservation_id) REFERENCES reservations(reservation_id) ON DELETE CASCADE
+  CONSTRAINT fk_invoices_reservation FOREIGN KEY (reservation_id) REFERENCES reservations(reservation_id) ON DELETE CASCADE,
+  INDEX idx_invoice_date (invoice_date, invoice_id)
+) ENGINE=InnoDB;
+
+/* 9. VERSIONES DE CACHÉ (bus de invalidación entre workers de la aplicación) */
+CREATE TABLE cache_versions (
+  table_name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 ) ENGINE=InnoDB;
 
 /* =========================================================
    Añadir columna service_date a reservation_services sólo si no existe
-   "ADD COLUMN IF NOT EXISTS")
+   "ADD COLUMN IF NOT EXISTS"). La tabla ya la declara; esto queda para
+   bases creadas con versiones anteriores del script.
    ========================================================= */
 
 SET @schema_name = DATABASE();
@@ -150,6 +167,109 @@ PREPARE alter_stmt FROM @sql_stmt;
 EXECUTE alter_stmt;
 DEALLOCATE PREPARE alter_stmt;
 
+/* Índice para la paginación por cursor del listado de servicios (service_date DESC, id DESC) */
+CREATE INDEX idx_rs_service_date ON reservation_services (service_date, reservation_service_id);
+
+/* =========================================================
+   FLUJOS DE RECEPCIÓN EN UN SOLO VIAJE (CALL desde web/app.py)
+   Cada procedimiento hace todo el trabajo en el servidor y devuelve
+   el estado resultante, para que la interfaz no tenga que volver a consultar.
+   Única fuente de los sp_*: add_workflow_procedures.sql se genera desde aquí con
+   db_init/build_workflow_procedures.py (hay que regenerarlo al editarlos).
+   ========================================================= */
+
+DELIMITER $$
+
+/* Cambio de estado (check-in / check-out / ...): reserva + habitación en un UPDATE multi-tabla.
+   Devuelve la reserva y su habitación (ninguna fila si la reserva no existe). */
+DROP PROCEDURE IF EXISTS sp_set_reservation_status$$
+CREATE PROCEDURE sp_set_reservation_status(IN p_reservation_id INT, IN p_status VARCHAR(20))
+BEGIN
+  UPDATE reservations r
+    JOIN rooms ro ON ro.room_id = r.room_id
+     SET r.status = p_status,
+         ro.status = CASE p_status
+                       WHEN 'checkin'  THEN 'ocupada'
+                       WHEN 'checkout' THEN 'disponible'
+                       ELSE ro.status
+                     END
+   WHERE r.reservation_id = p_reservation_id;
+
+  SELECT r.reservation_id, r.status, r.room_id, ro.room_num, ro.status AS room_status
+    FROM reservations r
+    JOIN rooms ro ON ro.room_id = r.room_id
+   WHERE r.reservation_id = p_reservation_id;
+END$$
+
+/* Facturación: bloquea la reserva, crea la factura solo si está en 'checkout' y la marca 'facturada'.
+   previous_status indica por qué no se facturó (NULL = la reserva no existe). */
+DROP PROCEDURE IF EXISTS sp_create_invoice$$
+CREATE PROCEDURE sp_create_invoice(IN p_reservation_id INT, IN p_total DECIMAL(10,2), IN p_method VARCHAR(20))
+BEGIN
+  DECLARE v_status VARCHAR(20) DEFAULT NULL;
+  DECLARE v_invoice_id INT DEFAULT NULL;
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+
+  START TRANSACTION;
+  SELECT status INTO v_status FROM reservations WHERE reservation_id = p_reservation_id FOR UPDATE;
+  IF v_status = 'checkout' THEN
+    INSERT INTO invoices (reservation_id, total, method, invoice_date)
+    VALUES (p_reservation_id, p_total, p_method, CURRENT_DATE());
+    SET v_invoice_id = LAST_INSERT_ID();
+    UPDATE reservations SET status = 'facturada' WHERE reservation_id = p_reservation_id;
+  END IF;
+  COMMIT;
+
+  SELECT v_invoice_id AS invoice_id, v_status AS previous_status,
+         p_reservation_id AS reservation_id, r.status, r.room_id, ro.room_num, ro.status AS room_status
+    FROM (SELECT 1) AS one
+    LEFT JOIN reservations r ON r.reservation_id = p_reservation_id
+    LEFT JOIN rooms ro ON ro.room_id = r.room_id;
+END$$
+
+/* Borrado de una reserva con sus servicios y facturas. Devuelve deleted = 0/1. */
+DROP PROCEDURE IF EXISTS sp_delete_reservation$$
+CREATE PROCEDURE sp_delete_reservation(IN p_reservation_id INT)
+BEGIN
+  DECLARE v_deleted INT DEFAULT 0;
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+
+  START TRANSACTION;
+  DELETE FROM reservation_services WHERE reservation_id = p_reservation_id;
+  DELETE FROM invoices WHERE reservation_id = p_reservation_id;
+  DELETE FROM reservations WHERE reservation_id = p_reservation_id;
+  SET v_deleted = ROW_COUNT();
+  COMMIT;
+
+  SELECT v_deleted AS deleted;
+END$$
+
+/* Borrado de un cliente en cascada. Devuelve dos resultados:
+   1) los reservation_id eliminados, 2) client_deleted = 0/1. */
+DROP PROCEDURE IF EXISTS sp_delete_client$$
+CREATE PROCEDURE sp_delete_client(IN p_client_id INT)
+BEGIN
+  DECLARE v_deleted INT DEFAULT 0;
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+
+  START TRANSACTION;
+  SELECT reservation_id FROM reservations WHERE client_id = p_client_id FOR UPDATE;
+  DELETE rs FROM reservation_services rs
+    JOIN reservations r ON r.reservation_id = rs.reservation_id
+   WHERE r.client_id = p_client_id;
+  DELETE i FROM invoices i
+    JOIN reservations r ON r.reservation_id = i.reservation_id
+   WHERE r.client_id = p_client_id;
+  DELETE FROM reservations WHERE client_id = p_client_id;
+  DELETE FROM clients WHERE client_id = p_client_id;
+  SET v_deleted = ROW_COUNT();
+  COMMIT;
+
+  SELECT v_deleted AS client_deleted;
+END$$
+
+DELIMITER ;
+
 /* =========================================================
    CORRECCIONES (para los demás roles)
    ========================================================= */
@@ -0,0 +1,14 @@
+/* =========================================================
+   TABLA cache_versions (bus de invalidación entre workers)
+   Solo para bases creadas antes de que Hotel_BD.sql la incluyera.
+   Ejecutar una vez:  mysql -u root -p gestion_hotelera < db_init/add_cache_versions.sql
+   (Mientras no exista, cada worker solo invalida sus propias cachés)
+   ========================================================= */
+
+USE gestion_hotelera;
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+  table_name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
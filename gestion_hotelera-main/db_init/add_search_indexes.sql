@@ -0,0 +1,19 @@
+/* =========================================================
+   ÍNDICES FULLTEXT PARA LA BÚSQUEDA (parámetro q=)
+   Solo para bases creadas antes de que Hotel_BD.sql los incluyera.
+   Ejecutar una vez:  mysql -u root -p gestion_hotelera < db_init/add_search_indexes.sql
+   (Mientras no existan, la aplicación puede usar SEARCH_MODE=like)
+   ========================================================= */
+
+USE gestion_hotelera;
+
+/* InnoDB solo admite crear un índice FULLTEXT por sentencia */
+ALTER TABLE clients ADD FULLTEXT INDEX ft_client_search (full_name, email, address);
+ALTER TABLE clients ADD FULLTEXT INDEX ft_client_name (full_name);
+
+ALTER TABLE staff ADD FULLTEXT INDEX ft_staff_search (full_name, staff_role, area);
+
+ALTER TABLE services ADD FULLTEXT INDEX ft_service_search (name, description);
+ALTER TABLE services ADD FULLTEXT INDEX ft_service_name (name);
+
+ALTER TABLE reservations ADD FULLTEXT INDEX ft_guest_name (guest_name);
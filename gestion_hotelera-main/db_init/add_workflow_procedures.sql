@@ -0,0 +1,101 @@
+/* =========================================================
+   PROCEDIMIENTOS DE CHECK-IN / CHECK-OUT / FACTURACIÓN / BORRADOS
+   Solo para bases creadas antes de que Hotel_BD.sql los incluyera.
+   Ejecutar una vez:  mysql -u root -p gestion_hotelera < db_init/add_workflow_procedures.sql
+   (Mientras no existan, la aplicación usa las mismas operaciones desde Python)
+   GENERADO desde Hotel_BD.sql por db_init/build_workflow_procedures.py: no editar a mano.
+   ========================================================= */
+
+USE gestion_hotelera;
+
+DELIMITER $$
+
+/* Cambio de estado (check-in / check-out / ...): reserva + habitación en un UPDATE multi-tabla.
+   Devuelve la reserva y su habitación (ninguna fila si la reserva no existe). */
+DROP PROCEDURE IF EXISTS sp_set_reservation_status$$
+CREATE PROCEDURE sp_set_reservation_status(IN p_reservation_id INT, IN p_status VARCHAR(20))
+BEGIN
+  UPDATE reservations r
+    JOIN rooms ro ON ro.room_id = r.room_id
+     SET r.status = p_status,
+         ro.status = CASE p_status
+                       WHEN 'checkin'  THEN 'ocupada'
+                       WHEN 'checkout' THEN 'disponible'
+                       ELSE ro.status
+                     END
+   WHERE r.reservation_id = p_reservation_id;
+
+  SELECT r.reservation_id, r.status, r.room_id, ro.room_num, ro.status AS room_status
+    FROM reservations r
+    JOIN rooms ro ON ro.room_id = r.room_id
+   WHERE r.reservation_id = p_reservation_id;
+END$$
+
+/* Facturación: bloquea la reserva, crea la factura solo si está en 'checkout' y la marca 'facturada'.
+   previous_status indica por qué no se facturó (NULL = la reserva no existe). */
+DROP PROCEDURE IF EXISTS sp_create_invoice$$
+CREATE PROCEDURE sp_create_invoice(IN p_reservation_id INT, IN p_total DECIMAL(10,2), IN p_method VARCHAR(20))
+BEGIN
+  DECLARE v_status VARCHAR(20) DEFAULT NULL;
+  DECLARE v_invoice_id INT DEFAULT NULL;
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+
+  START TRANSACTION;
+  SELECT status INTO v_status FROM reservations WHERE reservation_id = p_reservation_id FOR UPDATE;
+  IF v_status = 'checkout' THEN
+    INSERT INTO invoices (reservation_id, total, method, invoice_date)
+    VALUES (p_reservation_id, p_total, p_method, CURRENT_DATE());
+    SET v_invoice_id = LAST_INSERT_ID();
+    UPDATE reservations SET status = 'facturada' WHERE reservation_id = p_reservation_id;
+  END IF;
+  COMMIT;
+
+  SELECT v_invoice_id AS invoice_id, v_status AS previous_status,
+         p_reservation_id AS reservation_id, r.status, r.room_id, ro.room_num, ro.status AS room_status
+    FROM (SELECT 1) AS one
+    LEFT JOIN reservations r ON r.reservation_id = p_reservation_id
+    LEFT JOIN rooms ro ON ro.room_id = r.room_id;
+END$$
+
+/* Borrado de una reserva con sus servicios y facturas. Devuelve deleted = 0/1. */
+DROP PROCEDURE IF EXISTS sp_delete_reservation$$
+CREATE PROCEDURE sp_delete_reservation(IN p_reservation_id INT)
+BEGIN
+  DECLARE v_deleted INT DEFAULT 0;
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+
+  START TRANSACTION;
+  DELETE FROM reservation_services WHERE reservation_id = p_reservation_id;
+  DELETE FROM invoices WHERE reservation_id = p_reservation_id;
+  DELETE FROM reservations WHERE reservation_id = p_reservation_id;
+  SET v_deleted = ROW_COUNT();
+  COMMIT;
+
+  SELECT v_deleted AS deleted;
+END$$
+
+/* Borrado de un cliente en cascada. Devuelve dos resultados:
+   1) los reservation_id eliminados, 2) client_deleted = 0/1. */
+DROP PROCEDURE IF EXISTS sp_delete_client$$
+CREATE PROCEDURE sp_delete_client(IN p_client_id INT)
+BEGIN
+  DECLARE v_deleted INT DEFAULT 0;
+  DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+
+  START TRANSACTION;
+  SELECT reservation_id FROM reservations WHERE client_id = p_client_id FOR UPDATE;
+  DELETE rs FROM reservation_services rs
+    JOIN reservations r ON r.reservation_id = rs.reservation_id
+   WHERE r.client_id = p_client_id;
+  DELETE i FROM invoices i
+    JOIN reservations r ON r.reservation_id = i.reservation_id
+   WHERE r.client_id = p_client_id;
+  DELETE FROM reservations WHERE client_id = p_client_id;
+  DELETE FROM clients WHERE client_id = p_client_id;
+  SET v_deleted = ROW_COUNT();
+  COMMIT;
+
+  SELECT v_deleted AS client_deleted;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,60 @@
+"""
+Genera add_workflow_procedures.sql a partir de Hotel_BD.sql.
+
+Los procedimientos sp_* solo se escriben en Hotel_BD.sql (bloque "FLUJOS DE RECEPCIÓN");
+add_workflow_procedures.sql, para bases anteriores a ellos, es una copia generada:
+
+    python db_init/build_workflow_procedures.py           # regenera el archivo
+    python db_init/build_workflow_procedures.py --check   # falla si está desactualizado
+"""
+import os
+import sys
+
+DB_INIT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(DB_INIT_DIR, "Hotel_BD.sql")
+OUTPUT_FILE = os.path.join(DB_INIT_DIR, "add_workflow_procedures.sql")
+
+SECTION_TITLE = "FLUJOS DE RECEPCIÓN"
+
+HEADER = """/* =========================================================
+   PROCEDIMIENTOS DE CHECK-IN / CHECK-OUT / FACTURACIÓN / BORRADOS
+   Solo para bases creadas antes de que Hotel_BD.sql los incluyera.
+   Ejecutar una vez:  mysql -u root -p gestion_hotelera < db_init/add_workflow_procedures.sql
+   (Mientras no existan, la aplicación usa las mismas operaciones desde Python)
+   GENERADO desde Hotel_BD.sql por db_init/build_workflow_procedures.py: no editar a mano.
+   ========================================================= */
+
+USE gestion_hotelera;
+
+"""
+
+def extract_procedures(schema_sql):
+    """Bloque DELIMITER $$ ... DELIMITER ; de la sección de flujos de Hotel_BD.sql."""
+    section = schema_sql.find(SECTION_TITLE)
+    if section < 0:
+        raise ValueError(f"Hotel_BD.sql no tiene la sección '{SECTION_TITLE}'")
+    start = schema_sql.find("DELIMITER $$", section)
+    end = schema_sql.find("DELIMITER ;", start)
+    if start < 0 or end < 0:
+        raise ValueError("La sección de flujos de Hotel_BD.sql no está entre DELIMITER $$ y DELIMITER ;")
+    return schema_sql[start:end + len("DELIMITER ;")]
+
+def build():
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        return HEADER + extract_procedures(f.read()) + "\n"
+
+def main(argv):
+    content = build()
+    if "--check" in argv:
+        with open(OUTPUT_FILE, encoding="utf-8") as f:
+            if f.read() != content:
+                print("⚠️ add_workflow_procedures.sql no coincide con Hotel_BD.sql; ejecutar db_init/build_workflow_procedures.py")
+                return 1
+        return 0
+    with open(OUTPUT_FILE, "w", encoding="utf-8", newline="\n") as f:
+        f.write(content)
+    print(f"Generado {OUTPUT_FILE}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,37 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-random.seed(12345)
+"""
+Synthetic hotel data generator.
+
+Tables are generated in chunks on a process pool and every chunk streams its rows to its
+own part file, so memory stays bounded by the chunk size, not by --scale. Each chunk seeds
+its own RNG from (--seed, table, chunk): the output is the same for any --workers value.
+
+    python generate_hotel_data.py --scale 1200
+    python generate_hotel_data.py --scale 1000000 --workers 8 --output hotel_1m.sql
+    python generate_hotel_data.py --scale 10000000 --format csv --output hotel_csv
+"""
+import argparse
+import bisect
+import csv
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import time as timer
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta
+
+from faker import Faker
+
+fake = Faker('es_MX')
+
+# Rows per INSERT statement (a single INSERT with 1M rows exceeds max_allowed_packet)
+INSERT_BATCH_ROWS = 1000
+
+# Rows per chunk (one task of the process pool) for the tables that grow with --scale
+DEFAULT_CHUNK_ROWS = 100_000
 
 # Helper functions
 def sha256_hash(text):
@@ -13,13 +44,44 @@ def sql_escape(text):
         return 'NULL'
     return text.replace("'", "''")
 
-def generate_reservation_code():
-    """Generate unique reservation code like R-XXXXXX"""
-    return f"R-{fake.bothify(text='??????').upper()}"
+def sql_literal(value):
+    """Format a Python value as a MySQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return f"'{sql_escape(value)}'"
+    if isinstance(value, date):  # also datetime
+        return f"'{value}'"
+    return str(value)
+
+CODE_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+CODE_SPACE = len(CODE_ALPHABET) ** 6
+CODE_MULTIPLIER = 3 ** 18  # coprime with 26, so id -> code is a bijection
 
-def generate_invoice_code():
-    """Generate unique invoice code like I-XXXXXX"""
-    return f"I-{fake.bothify(text='??????').upper()}"
+def unique_code(prefix, record_id):
+    """Code like R-XXXXXX derived from the record id: unique without a shared set of used codes"""
+    n = (record_id * CODE_MULTIPLIER) % CODE_SPACE
+    letters = []
+    for _ in range(6):
+        n, digit = divmod(n, len(CODE_ALPHABET))
+        letters.append(CODE_ALPHABET[digit])
+    return f"{prefix}-{''.join(letters)}"
+
+def unique_email(record_id):
+    """Realistic email made unique by the record id"""
+    return f"{fake.user_name()}{record_id}@{fake.free_email_domain()}"
+
+def phone_number(rng):
+    return f"{rng.randrange(10 ** 10):010d}"
+
+def chunk_seed(seed, table, chunk):
+    """Independent, reproducible seed for one chunk of one table"""
+    digest = hashlib.sha256(f"{seed}:{table}:{chunk}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+def split_evenly(total, parts, index):
+    """Size of part 'index' when 'total' items are split into 'parts' nearly equal parts"""
+    return total * (index + 1) // parts - total * index // parts
 
 # Global counters to track existing records
 EXISTING_USERS = 4
@@ -29,200 +91,201 @@ EXISTING_STAFF = 4
 EXISTING_SERVICES = 5
 EXISTING_RESERVATIONS = 5
 
-# Track used values for uniqueness
-used_emails = set()
-used_room_nums = set(range(101, 109))  # Existing rooms
-used_service_codes = {'SPA-BAS', 'MAS-REL', 'DES-BUF', 'TRANS-AER', 'ROOM-SERV'}
-used_reservation_codes = set()
-used_invoice_codes = set()
+USER_COUNT = 1200
+STAFF_COUNT = 1000
+SERVICE_COUNT = 1000
+FIRST_ROOM_NUM = 109  # Existing rooms are 101-108
+
+EXISTING_SERVICE_CODES = {'SPA-BAS', 'MAS-REL', 'DES-BUF', 'TRANS-AER', 'ROOM-SERV'}
+
+# Today's date for status logic, and the window reservations are drawn from
+TODAY = datetime(2025, 12, 1)
+RESERVATION_START = date(2024, 1, 1)
+RESERVATION_END = date(2026, 12, 31)
+
+# Column lists, in load order. reservation_services and invoices are not referenced by other
+# tables, so their ids are left to AUTO_INCREMENT and chunks need no id coordination.
+TABLE_COLUMNS = {
+    'users': ('user_id', 'email', 'password_hash', 'user_role'),
+    'clients': ('client_id', 'user_id', 'full_name', 'email', 'phone', 'address'),
+    'rooms': ('room_id', 'room_num', 'room_type', 'capacity', 'price', 'status'),
+    'staff': ('staff_id', 'full_name', 'staff_role', 'area', 'hire_date', 'active'),
+    'services': ('service_id', 'service_code', 'name', 'description', 'price', 'status'),
+    'reservations': ('reservation_id', 'reservation_code', 'client_id', 'room_id', 'guest_name',
+                     'guest_email', 'guest_phone', 'checkin_date', 'checkout_date', 'total', 'status'),
+    'reservation_services': ('reservation_id', 'service_id', 'quantity', 'unit_price', 'service_date'),
+    'invoices': ('invoice_code', 'reservation_id', 'total', 'method', 'invoice_date'),
+}
+
+# ============================================================================
+# CHUNK OUTPUT
+# ============================================================================
+class ChunkWriter:
+    """Streams the rows of one chunk of a table to its own part file (.sql or .csv)"""
+
+    def __init__(self, directory, table, chunk, fmt):
+        self.table = table
+        self.fmt = fmt
+        self.path = os.path.join(directory, f"{table}-{chunk:05d}.{fmt}")
+        self.rows = 0
+        self._file = open(self.path, 'w', encoding='utf-8', newline='')
+        columns = TABLE_COLUMNS[table]
+        if fmt == 'csv':
+            self._csv = csv.writer(self._file, lineterminator='\n')
+            self._csv.writerow(columns)
+        else:
+            self._header = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+            self._batch = []
+
+    def write(self, row):
+        self.rows += 1
+        if self.fmt == 'csv':
+            # \N is NULL for LOAD DATA
+            self._csv.writerow(['\\N' if value is None else value for value in row])
+            return
+        self._batch.append(f"({', '.join(sql_literal(value) for value in row)})")
+        if len(self._batch) >= INSERT_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        self._file.write(self._header)
+        self._file.write(",\n".join(self._batch))
+        self._file.write(";\n")
+        self._batch = []
+
+    def close(self):
+        if self.fmt == 'sql' and self._batch:
+            self._flush()
+        self._file.close()
+        if not self.rows:
+            os.remove(self.path)
+        return self.rows
+
+def run_chunk(kind, chunk, directory, fmt, seed, params):
+    """Pool task: generate one chunk and return {table: rows written}"""
+    chunk_rng = random.Random(chunk_seed(seed, kind, chunk))
+    fake.seed_instance(chunk_seed(seed, kind, chunk))
+    tables = {'reservations': ('rooms', 'reservations', 'reservation_services', 'invoices')}.get(kind, (kind,))
+    writers = {table: ChunkWriter(directory, table, chunk, fmt) for table in tables}
+    try:
+        GENERATORS[kind](chunk_rng, writers, seed=seed, **params)
+    finally:
+        counts = {table: writer.close() for table, writer in writers.items()}
+    return counts
 
 # ============================================================================
 # 1. GENERATE USERS
 # ============================================================================
-def generate_users(count=996):
+def client_user_count(count=USER_COUNT):
+    return int(count * 0.8)  # More clients
+
+def generate_users(rng, writers, first_id, count, seed):
     """Generate users with different roles"""
-    users = []
-    user_id = EXISTING_USERS + 1
-    
-    # Role distribution
-    cliente_count = int(count * 0.8) # More clients
+    # Role distribution. The 'cliente' users take the first ids so the clients
+    # generator can link to them without looking at this chunk's output.
+    cliente_count = client_user_count(count)
     recepcion_count = 100
     spa_count = 50
     limpieza_count = 30
     admin_count = max(5, count - cliente_count - recepcion_count - spa_count - limpieza_count)
-    
-    roles_dist = (
-        ['cliente'] * cliente_count +
+
+    staff_roles = (
         ['recepcion'] * recepcion_count +
         ['spa'] * spa_count +
         ['limpieza'] * limpieza_count +
         ['admin'] * admin_count
     )
-    random.shuffle(roles_dist)
-    
+    rng.shuffle(staff_roles)
+    roles_dist = ['cliente'] * cliente_count + staff_roles
+
+    password_hash = sha256_hash('password123')  # Same password for all demo users
     for i in range(count):
-        # Generate unique email
-        while True:
-            email = fake.email()
-            if email not in used_emails:
-                used_emails.add(email)
-                break
-        
-        role = roles_dist[i]
-        password = 'password123'  # Same password for all demo users
-        password_hash = sha256_hash(password)
-        
-        users.append(f"({user_id}, '{sql_escape(email)}', '{password_hash}', '{role}')")
-        user_id += 1
-    
-    return users, user_id - 1  # Return last user_id
+        user_id = first_id + i
+        writers['users'].write((user_id, unique_email(user_id), password_hash, roles_dist[i]))
 
 # ============================================================================
 # 2. GENERATE CLIENTS
 # ============================================================================
-def generate_clients(count=994, max_user_id=1000):
+def generate_clients(rng, writers, first_id, count, first_index, total, seed):
     """Generate clients, some linked to users, some standalone"""
-    clients = []
-    client_id = EXISTING_CLIENTS + 1
-    
-    # 60% of clients will have user_id, 40% won't
-    user_link_count = int(count * 0.6)
-    
-    # Available user_ids (only 'cliente' role users)
-    # Assuming user_ids 5-804 are 'cliente' role (800 total)
-    available_user_ids = list(range(5, 805))
-    random.shuffle(available_user_ids)
-    
+    # 60% of clients will have user_id, while 'cliente' users last. The shuffled list of
+    # those users is rebuilt from the seed in every chunk, so chunks agree on it.
+    cliente_user_ids = list(range(EXISTING_USERS + 1, EXISTING_USERS + 1 + client_user_count()))
+    random.Random(chunk_seed(seed, 'client_users', 0)).shuffle(cliente_user_ids)
+    user_link_count = min(int(total * 0.6), len(cliente_user_ids))
+
     for i in range(count):
+        client_id = first_id + i
+        index = first_index + i
+        user_id = cliente_user_ids[index] if index < user_link_count else None
         full_name = fake.name()
-        
-        # Generate unique email
-        while True:
-            email = fake.email()
-            if email not in used_emails:
-                used_emails.add(email)
-                break
-        
-        phone = fake.numerify(text='##########')  # 10 digit phone
-        address = sql_escape(fake.address().replace('\n', ', '))
-        
-        # Assign user_id for first 60% of clients
-        if i < user_link_count and available_user_ids:
-            user_id = available_user_ids.pop()
-            clients.append(f"({client_id}, {user_id}, '{sql_escape(full_name)}', '{email}', '{phone}', '{address}')")
-        else:
-            clients.append(f"({client_id}, NULL, '{sql_escape(full_name)}', '{email}', '{phone}', '{address}')")
-        
-        client_id += 1
-    
-    return clients
+        address = fake.address().replace('\n', ', ')
+        writers['clients'].write((client_id, user_id, full_name, unique_email(client_id), phone_number(rng), address))
 
 # ============================================================================
 # 3. GENERATE ROOMS
 # ============================================================================
-def generate_rooms(count=992):
-    """Generate hotel rooms with realistic configurations"""
-    rooms = []
-    room_id = EXISTING_ROOMS + 1
-    
-    # Room type distribution: 40% sencilla, 40% doble, 20% suite
-    sencilla_count = int(count * 0.4)
-    doble_count = int(count * 0.4)
-    suite_count = count - sencilla_count - doble_count  # Ensure exact count
-    
-    room_types = (
-        ['sencilla'] * sencilla_count +
-        ['doble'] * doble_count +
-        ['suite'] * suite_count
-    )
-    random.shuffle(room_types)
-    
-    # Status distribution: 70% disponible, 20% ocupada, 10% mantenimiento
-    disponible_count = int(count * 0.7)
-    ocupada_count = int(count * 0.2)
-    mantenimiento_count = count - disponible_count - ocupada_count  # Ensure exact count
-    
-    status_options = (
-        ['disponible'] * disponible_count +
-        ['ocupada'] * ocupada_count +
-        ['mantenimiento'] * mantenimiento_count
-    )
-    random.shuffle(status_options)
-    
+def generate_rooms(rng, writer, first_id, count, first_index):
+    """Generate hotel rooms with realistic configurations. Returns {room_id: price}"""
+    prices = {}
     for i in range(count):
-        # Generate unique room number
-        while True:
-            room_num = random.randint(109, 1500)
-            if room_num not in used_room_nums:
-                used_room_nums.add(room_num)
-                break
-        
-        room_type = room_types[i]
-        status = status_options[i]
-        
+        room_id = first_id + i
+        # Room type distribution: 40% sencilla, 40% doble, 20% suite
+        type_draw = rng.random()
+        room_type = 'sencilla' if type_draw < 0.4 else 'doble' if type_draw < 0.8 else 'suite'
+        # Status distribution: 70% disponible, 20% ocupada, 10% mantenimiento
+        status_draw = rng.random()
+        status = 'disponible' if status_draw < 0.7 else 'ocupada' if status_draw < 0.9 else 'mantenimiento'
+
         # Set capacity and price based on room type
         if room_type == 'sencilla':
-            capacity = random.randint(1, 2)
-            price = round(random.uniform(500, 1200), 2)
+            capacity = rng.randint(1, 2)
+            price = round(rng.uniform(500, 1200), 2)
         elif room_type == 'doble':
-            capacity = random.randint(2, 4)
-            price = round(random.uniform(1000, 2000), 2)
+            capacity = rng.randint(2, 4)
+            price = round(rng.uniform(1000, 2000), 2)
         else:  # suite
-            capacity = random.randint(2, 6)
-            price = round(random.uniform(2000, 5000), 2)
-        
-        rooms.append(f"({room_id}, {room_num}, '{room_type}', {capacity}, {price}, '{status}')")
-        room_id += 1
-    
-    return rooms
+            capacity = rng.randint(2, 6)
+            price = round(rng.uniform(2000, 5000), 2)
+
+        # Room numbers follow the room index: unique across chunks
+        writer.write((room_id, FIRST_ROOM_NUM + first_index + i, room_type, capacity, price, status))
+        prices[room_id] = price
+    return prices
 
 # ============================================================================
 # 4. GENERATE STAFF
 # ============================================================================
-def generate_staff(count=996):
+def generate_staff(rng, writers, first_id, count, seed):
     """Generate staff members with various roles"""
-    staff = []
-    staff_id = EXISTING_STAFF + 1
-    
-    roles = ['recepcionista', 'camarista', 'supervisor', 'gerente', 'terapeuta spa', 
+    roles = ['recepcionista', 'camarista', 'supervisor', 'gerente', 'terapeuta spa',
              'mantenimiento', 'seguridad', 'chef', 'mesero', 'botones']
-    areas = ['Front Desk', 'Limpieza', 'Administración', 'Spa', 'Mantenimiento', 
+    areas = ['Front Desk', 'Limpieza', 'Administración', 'Spa', 'Mantenimiento',
              'Seguridad', 'Restaurante', 'Cocina', 'Servicios']
-    
+
+    # hire_date between 2015 and 2025-11-30
+    start_date = date(2015, 1, 1)
+    hire_days = (date(2025, 11, 30) - start_date).days
+
     for i in range(count):
-        full_name = fake.name()
-        staff_role = random.choice(roles)
-        area = random.choice(areas)
-        
-        # hire_date between 2015 and 2025-11-30
-        start_date = date(2015, 1, 1)
-        end_date = date(2025, 11, 30)
-        hire_date = fake.date_between(start_date=start_date, end_date=end_date)
-        
+        hire_date = start_date + timedelta(days=rng.randint(0, hire_days))
         # 95% active, 5% inactive
-        active = 1 if random.random() < 0.95 else 0
-        
-        staff.append(f"({staff_id}, '{sql_escape(full_name)}', '{staff_role}', '{area}', '{hire_date}', {active})")
-        staff_id += 1
-    
-    return staff
+        active = 1 if rng.random() < 0.95 else 0
+        writers['staff'].write((first_id + i, fake.name(), rng.choice(roles), rng.choice(areas), hire_date, active))
 
 # ============================================================================
 # 5. GENERATE SERVICES
 # ============================================================================
-def generate_services(count=995):
+def generate_services(rng, writers, first_id, count, seed):
     """Generate hotel services"""
-    services = []
-    service_id = EXISTING_SERVICES + 1
-    
     # Service categories with templates
     service_templates = {
-        'SPA': ['Masaje sueco', 'Masaje piedras calientes', 'Facial rejuvenecedor', 
-                'Aromaterapia', 'Reflexología', 'Tratamiento corporal', 'Sauna', 
+        'SPA': ['Masaje sueco', 'Masaje piedras calientes', 'Facial rejuvenecedor',
+                'Aromaterapia', 'Reflexología', 'Tratamiento corporal', 'Sauna',
                 'Jacuzzi privado', 'Manicure', 'Pedicure'],
         'ROOM': ['Servicio de habitación', 'Limpieza extra', 'Amenidades premium',
                  'Almohadas adicionales', 'Toallas extra', 'Mini bar premium'],
-        'FOOD': ['Desayuno continental', 'Comida buffet', 'Cena gourmet', 
+        'FOOD': ['Desayuno continental', 'Comida buffet', 'Cena gourmet',
                  'Room service 24h', 'Champagne', 'Vino premium', 'Coctel especial',
                  'Pastel personalizado', 'Canasta de frutas', 'Chocolates gourmet'],
         'TRANS': ['Transporte aeropuerto', 'Taxi al centro', 'Renta de auto',
@@ -231,375 +294,299 @@ def generate_services(count=995):
                 'Buceo', 'Snorkel', 'Equitación', 'Golf', 'Tenis'],
         'LAUND': ['Lavandería express', 'Planchado', 'Tintorería', 'Lavado en seco']
     }
-    
+
     # Flatten all services
-    all_services = []
-    for category, items in service_templates.items():
-        for item in items:
-            all_services.append((category, item))
-    
+    all_services = [(category, item) for category, items in service_templates.items() for item in items]
+
     # Generate more services by adding variations
     while len(all_services) < count:
-        category = random.choice(list(service_templates.keys()))
-        base_name = random.choice(service_templates[category])
-        variation = random.choice(['Premium', 'Deluxe', 'Ejecutivo', 'VIP', 'Especial'])
+        category = rng.choice(list(service_templates.keys()))
+        base_name = rng.choice(service_templates[category])
+        variation = rng.choice(['Premium', 'Deluxe', 'Ejecutivo', 'VIP', 'Especial'])
         all_services.append((category, f"{base_name} {variation}"))
-    
-    random.shuffle(all_services)
-    
+
+    rng.shuffle(all_services)
+
+    used_service_codes = set(EXISTING_SERVICE_CODES)
     for i in range(count):
         category, name = all_services[i]
-        
-        # Generate unique service code
+
+        # Generate unique service code (the whole table is a single chunk)
         while True:
-            code_num = random.randint(1, 999)
-            service_code = f"{category}-{code_num:03d}"
+            service_code = f"{category}-{rng.randint(1, 999):03d}"
             if service_code not in used_service_codes:
                 used_service_codes.add(service_code)
                 break
-        
-        description = fake.sentence(nb_words=10)
-        price = round(random.uniform(50, 3000), 2)
-        
+
+        price = round(rng.uniform(50, 3000), 2)
         # 90% active, 10% inactive
-        status = 'activo' if random.random() < 0.9 else 'inactivo'
-        
-        services.append(f"({service_id}, '{service_code}', '{sql_escape(name)}', '{sql_escape(description)}', {price}, '{status}')")
-        service_id += 1
-    
-    return services
+        status = 'activo' if rng.random() < 0.9 else 'inactivo'
+        writers['services'].write((first_id + i, service_code, name, fake.sentence(nb_words=10), price, status))
 
 # ============================================================================
-# 6. GENERATE RESERVATIONS
+# 6. GENERATE RESERVATIONS (with their rooms, services and invoices)
 # ============================================================================
-def generate_reservations(count=995):
-    """Generate reservations following hotel business logic"""
-    reservations = []
-    reservation_id = EXISTING_RESERVATIONS + 1
-    
-    # Available clients (7 to 1006)
-    client_ids = list(range(7, 1007))
-    
-    # Available rooms (9 to 1008)
-    room_ids = list(range(9, 1009))
-    
-    # Track room availability by date
-    room_bookings = {}  # {room_id: [(checkin, checkout), ...]}
-    
-    # Today's date for status logic
-    today = date(2025, 12, 1)
-    
-    # Date range for reservations
-    start_range = date(2024, 1, 1)
-    end_range = date(2026, 12, 31)
-    
+class RoomCalendar:
+    """Bookings of one room as sorted, non-overlapping intervals: O(log n) conflict check"""
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def book(self, checkin, checkout):
+        """Add the stay if it doesn't overlap another one. Returns False on conflict"""
+        i = bisect.bisect_left(self.starts, checkin)
+        if i > 0 and self.ends[i - 1] > checkin:
+            return False
+        if i < len(self.starts) and self.starts[i] < checkout:
+            return False
+        self.starts.insert(i, checkin)
+        self.ends.insert(i, checkout)
+        return True
+
+def generate_reservations(rng, writers, first_id, count, first_room_id, room_count, first_room_index,
+                          client_count, service_count, seed):
+    """Generate reservations following hotel business logic.
+
+    Each chunk owns a disjoint slice of the rooms, so room conflicts only need to be checked
+    against this chunk's bookings. Services and invoices are generated with the reservation,
+    from its real stay dates and status."""
+    room_prices = generate_rooms(rng, writers['rooms'], first_room_id, room_count, first_room_index)
+    room_ids = list(room_prices)
+    calendars = {}
+
+    first_client = EXISTING_CLIENTS + 1
+    first_service = EXISTING_SERVICES + 1
+    window_days = (RESERVATION_END - RESERVATION_START).days
+
+    reservation_id = first_id
     attempts = 0
     max_attempts = count * 10
-    
-    while len(reservations) < count and attempts < max_attempts:
+    while reservation_id < first_id + count and attempts < max_attempts and room_ids:
         attempts += 1
-        
-        client_id = random.choice(client_ids)
-        room_id = random.choice(room_ids)
-        
+
+        client_id = first_client + rng.randrange(client_count)
+        room_id = rng.choice(room_ids)
+
         # Generate check-in and check-out dates with TIME
         # Check-in: 14:00 - 23:00
-        checkin_date_base = fake.date_between(start_date=start_range, end_date=end_range)
-        checkin_time = time(random.randint(14, 23), random.randint(0, 59), 0)
-        checkin_date = datetime.combine(checkin_date_base, checkin_time)
-        
+        checkin_day = RESERVATION_START + timedelta(days=rng.randint(0, window_days))
+        checkin_date = datetime.combine(checkin_day, time(rng.randint(14, 23), rng.randint(0, 59), 0))
+
         # Stay duration: 1-14 nights
-        nights = random.randint(1, 14)
-        
+        nights = rng.randint(1, 14)
+
         # Check-out: 07:00 - 12:00
-        checkout_date_base = checkin_date_base + timedelta(days=nights)
-        checkout_time = time(random.randint(7, 12), random.randint(0, 59), 0)
-        checkout_date = datetime.combine(checkout_date_base, checkout_time)
-        
-        # Check if room is available for these dates
-        if room_id not in room_bookings:
-            room_bookings[room_id] = []
-        
-        # Check for conflicts
-        conflict = False
-        for booked_checkin, booked_checkout in room_bookings[room_id]:
-            # Check if dates overlap
-            if not (checkout_date <= booked_checkin or checkin_date >= booked_checkout):
-                conflict = True
-                break
-        
-        if conflict:
+        checkout_day = checkin_day + timedelta(days=nights)
+        checkout_date = datetime.combine(checkout_day, time(rng.randint(7, 12), rng.randint(0, 59), 0))
+
+        calendar = calendars.get(room_id)
+        if calendar is None:
+            calendar = calendars[room_id] = RoomCalendar()
+        if not calendar.book(checkin_date, checkout_date):
             continue  # Try another reservation
-        
-        # No conflict, proceed with reservation
-        room_bookings[room_id].append((checkin_date, checkout_date))
-        
-        # Generate unique reservation code
-        while True:
-            res_code = generate_reservation_code()
-            if res_code not in used_reservation_codes:
-                used_reservation_codes.add(res_code)
-                break
-        
-        # Guest details
-        guest_name = sql_escape(fake.name())
-        guest_email = fake.email()
-        guest_phone = fake.numerify(text='##########')
-        
-        # Calculate total (will use average room price)
-        # For simplicity, use random price based on room type
-        room_type_prices = {
-            'sencilla': random.uniform(500, 1200),
-            'doble': random.uniform(1000, 2000),
-            'suite': random.uniform(2000, 5000)
-        }
-        # Randomly pick a room type for calculation
-        room_type = random.choice(['sencilla', 'doble', 'suite'])
-        room_price = round(random.choice(list(room_type_prices.values())), 2)
-        total = round(room_price * nights, 2)
-        
+
+        total = round(room_prices[room_id] * nights, 2)
+
         # Determine status based on dates
-        if checkout_date < today:
+        if checkout_date < TODAY:
             # Past reservation
-            status_options = ['checkout', 'checkout', 'checkout', 'checkout', 
-                            'cancelada', 'facturada']
-            status = random.choice(status_options)
-        elif checkin_date <= today <= checkout_date:
+            status = rng.choice(['checkout', 'checkout', 'checkout', 'checkout', 'cancelada', 'facturada'])
+        elif checkin_date <= TODAY <= checkout_date:
             # Current stay
             status = 'checkin'
-        elif checkin_date > today:
-            # Future reservation
-            status_options = ['reservada', 'reservada', 'confirmada', 'confirmada', 'cancelada']
-            status = random.choice(status_options)
         else:
-            status = 'reservada'
-        
-        reservations.append(
-            f"({reservation_id}, '{res_code}', {client_id}, {room_id}, '{guest_name}', "
-            f"'{guest_email}', '{guest_phone}', '{checkin_date}', '{checkout_date}', "
-            f"{total}, '{status}')"
-        )
-        reservation_id += 1
-    
-    return reservations, room_bookings
+            # Future reservation
+            status = rng.choice(['reservada', 'reservada', 'confirmada', 'confirmada', 'cancelada'])
 
-# ============================================================================
-# 7. GENERATE RESERVATION SERVICES
-# ============================================================================
-def generate_reservation_services(reservation_count, room_bookings):
-    """Generate services for reservations"""
-    services_list = []
-    service_id = 1
-    
-    # Only generate for active reservations (not cancelada)
-    # Reservation IDs: 6 to (6 + reservation_count - 1)
-    
-    for res_id in range(6, 6 + reservation_count):
-        # Determine if this reservation is cancelled (need to track statuses)
-        # For simplicity, assume 20% are cancelled
-        if random.random() < 0.2:
-            continue  # Skip cancelled reservations
-        
-        # Get reservation details (we need to reconstruct checkin/checkout)
-        # Since we don't have direct access, we'll generate realistic service dates
-        
-        # Random checkin/checkout for service date calculation
-        checkin = fake.date_between(start_date=date(2024, 1, 1), end_date=date(2026, 12, 31))
-        nights = random.randint(1, 14)
-        checkout = checkin + timedelta(days=nights)
-        
-        # Add 2-5 services per reservation on average to ensure > 1000 total
-        num_services = random.randint(2, 5)
-        
-        for _ in range(num_services):
-            service_ref_id = random.randint(6, 1000)  # Random service ID
-            quantity = random.randint(1, 5)
-            unit_price = round(random.uniform(50, 3000), 2)
-            
-            # Service date between checkin and checkout
-            service_date = fake.date_between(start_date=checkin, end_date=checkout)
-            
-            services_list.append(
-                f"({service_id}, {res_id}, {service_ref_id}, {quantity}, {unit_price}, '{service_date}')"
+        writers['reservations'].write((
+            reservation_id, unique_code('R', reservation_id), client_id, room_id, fake.name(),
+            fake.free_email(), phone_number(rng), checkin_date, checkout_date, total, status,
+        ))
+
+        # Services for active reservations (not cancelada): 2-5, dated during the stay
+        services_total = 0
+        if status != 'cancelada':
+            for _ in range(rng.randint(2, 5)):
+                quantity = rng.randint(1, 5)
+                unit_price = round(rng.uniform(50, 3000), 2)
+                service_date = checkin_day + timedelta(days=rng.randint(0, nights))
+                writers['reservation_services'].write(
+                    (reservation_id, first_service + rng.randrange(service_count), quantity, unit_price, service_date)
+                )
+                services_total += quantity * unit_price
+
+        # Invoices for facturada reservations
+        if status == 'facturada':
+            method = rng.choice(['tarjeta', 'tarjeta', 'efectivo', 'transferencia'])
+            writers['invoices'].write(
+                (unique_code('I', reservation_id), reservation_id, round(total + services_total, 2), method, checkout_day)
             )
-            service_id += 1
-    
-    return services_list
 
-# ============================================================================
-# 8. GENERATE INVOICES
-# ============================================================================
-def generate_invoices():
-    """Generate invoices for facturada reservations"""
-    invoices = []
-    invoice_id = 1
-    
-    # Generate invoices for approximately 10% of reservations (~120 invoices)
-    # These correspond to reservations with status='facturada'
-    facturada_count = 120
-    
-    # Random reservation IDs that are facturada
-    reservation_ids = random.sample(range(6, 1001), facturada_count)
-    
-    for res_id in reservation_ids:
-        # Generate unique invoice code
-        while True:
-            inv_code = generate_invoice_code()
-            if inv_code not in used_invoice_codes:
-                used_invoice_codes.add(inv_code)
-                break
-        
-        # Total (random realistic amount)
-        total = round(random.uniform(1000, 15000), 2)
-        
-        # Payment method
-        method = random.choice(['tarjeta', 'tarjeta', 'efectivo', 'transferencia'])
-        
-        # Invoice date (recent past)
-        invoice_date = fake.date_between(start_date=date(2024, 1, 1), end_date=date(2025, 12, 1))
-        
-        invoices.append(
-            f"({invoice_id}, '{inv_code}', {res_id}, {total}, '{method}', '{invoice_date}')"
-        )
-        invoice_id += 1
-    
-    return invoices
+        reservation_id += 1
+
+GENERATORS = {
+    'users': generate_users,
+    'clients': generate_clients,
+    'staff': generate_staff,
+    'services': generate_services,
+    'reservations': generate_reservations,
+}
 
 # ============================================================================
 # MAIN GENERATION FUNCTION
 # ============================================================================
-def main():
-    print("Generating hotel database records...")
-    print("=" * 70)
-    
-    # Generate all data
-    print("1. Generating USERS...")
-    users, max_user_id = generate_users(1200)
-    
-    print("2. Generating CLIENTS...")
-    clients = generate_clients(1200, max_user_id)
-    
-    print("3. Generating ROOMS...")
-    rooms = generate_rooms(1200)
-    
-    print("4. Generating STAFF...")
-    staff = generate_staff(1000)
-    
-    print("5. Generating SERVICES...")
-    services = generate_services(1000)
-    
-    print("6. Generating RESERVATIONS...")
-    reservations, room_bookings = generate_reservations(1200)
-    
-    print("7. Generating RESERVATION_SERVICES...")
-    reservation_services = generate_reservation_services(len(reservations), room_bookings)
-    
-    print("8. Generating INVOICES...")
-    invoices = generate_invoices()
-    
-    # Write to SQL file
-    output_file = "hotel_data_inserts.sql"
-    
+def plan_chunks(reservation_count, chunk_rows):
+    """Pool tasks as (kind, chunk, params)"""
+    # Clients and rooms grow with the reservations: a room holds ~25 stays in the
+    # 3-year booking window before the conflict check starts rejecting most attempts.
+    client_count = max(1200, reservation_count // 5)
+    room_count = max(1200, reservation_count // 25)
+
+    tasks = [
+        ('users', 0, {'first_id': EXISTING_USERS + 1, 'count': USER_COUNT}),
+        ('staff', 0, {'first_id': EXISTING_STAFF + 1, 'count': STAFF_COUNT}),
+        ('services', 0, {'first_id': EXISTING_SERVICES + 1, 'count': SERVICE_COUNT}),
+    ]
+    for chunk, first_index in enumerate(range(0, client_count, chunk_rows)):
+        tasks.append(('clients', chunk, {
+            'first_id': EXISTING_CLIENTS + 1 + first_index, 'count': min(chunk_rows, client_count - first_index),
+            'first_index': first_index, 'total': client_count,
+        }))
+
+    chunks = max(1, -(-reservation_count // chunk_rows))
+    first_reservation = first_room = 0
+    for chunk in range(chunks):
+        rooms = split_evenly(room_count, chunks, chunk)
+        tasks.append(('reservations', chunk, {
+            'first_id': EXISTING_RESERVATIONS + 1 + first_reservation,
+            'count': split_evenly(reservation_count, chunks, chunk),
+            'first_room_id': EXISTING_ROOMS + 1 + first_room, 'room_count': rooms, 'first_room_index': first_room,
+            'client_count': client_count, 'service_count': SERVICE_COUNT,
+        }))
+        first_reservation += split_evenly(reservation_count, chunks, chunk)
+        first_room += rooms
+    return tasks
+
+def run_tasks(tasks, directory, fmt, seed, workers):
+    """Run the tasks (in a process pool unless workers == 1). Returns {table: {chunk: rows}}"""
+    counts = {table: {} for table in TABLE_COLUMNS}
+    started = timer.perf_counter()
+
+    def done(kind, chunk, result):
+        for table, rows in result.items():
+            counts[table][chunk] = rows
+        print(f"  {kind} chunk {chunk}: {sum(result.values())} rows ({timer.perf_counter() - started:.1f}s)")
+
+    if workers == 1:
+        for kind, chunk, params in tasks:
+            done(kind, chunk, run_chunk(kind, chunk, directory, fmt, seed, params))
+        return counts
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_chunk, kind, chunk, directory, fmt, seed, params): (kind, chunk)
+                   for kind, chunk, params in tasks}
+        for future in as_completed(futures):
+            done(*futures[future], future.result())
+    return counts
+
+def chunk_files(directory, table, chunks, fmt):
+    return [os.path.join(directory, f"{table}-{chunk:05d}.{fmt}") for chunk, rows in sorted(chunks.items()) if rows]
+
+def write_sql(output_file, directory, counts, reservation_count, seed):
+    """Concatenate the .sql part files, in load order, into a single script"""
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write("/* ========================================\n")
         f.write("   HOTEL DATABASE - GENERATED DATA\n")
-        f.write("   FECHA: 01 DE DICIEMBRE DEL 2025 Y SON LAS 3:44\n")
+        # No generation date: the same --scale and --seed give a byte-identical file
+        f.write(f"   --scale {reservation_count} --seed {seed}\n")
         f.write("   ========================================*/\n\n")
         f.write("USE gestion_hotelera;\n\n")
-        
+
         # Disable constraints temporarily for faster inserts
         f.write("SET FOREIGN_KEY_CHECKS=0;\n")
         f.write("SET UNIQUE_CHECKS=0;\n")
         f.write("SET AUTOCOMMIT=0;\n\n")
-        
-        # USERS
-        f.write("-- ============================================\n")
-        f.write("-- USERS (996 new records)\n")
-        f.write("-- ============================================\n")
-        f.write("INSERT INTO users (user_id, email, password_hash, user_role) VALUES\n")
-        f.write(",\n".join(users))
-        f.write(";\n\n")
-        
-        # CLIENTS
-        f.write("-- ============================================\n")
-        f.write("-- CLIENTS (994 new records)\n")
-        f.write("-- ============================================\n")
-        f.write("INSERT INTO clients (client_id, user_id, full_name, email, phone, address) VALUES\n")
-        f.write(",\n".join(clients))
-        f.write(";\n\n")
-        
-        # ROOMS
-        f.write("-- ============================================\n")
-        f.write("-- ROOMS (992 new records)\n")
-        f.write("-- ============================================\n")
-        f.write("INSERT INTO rooms (room_id, room_num, room_type, capacity, price, status) VALUES\n")
-        f.write(",\n".join(rooms))
-        f.write(";\n\n")
-        
-        # STAFF
-        f.write("-- ============================================\n")
-        f.write("-- STAFF (996 new records)\n")
-        f.write("-- ============================================\n")
-        f.write("INSERT INTO staff (staff_id, full_name, staff_role, area, hire_date, active) VALUES\n")
-        f.write(",\n".join(staff))
-        f.write(";\n\n")
-        
-        # SERVICES
-        f.write("-- ============================================\n")
-        f.write("-- SERVICES (995 new records)\n")
-        f.write("-- ============================================\n")
-        f.write("INSERT INTO services (service_id, service_code, name, description, price, status) VALUES\n")
-        f.write(",\n".join(services))
-        f.write(";\n\n")
-        
-        # RESERVATIONS
-        f.write("-- ============================================\n")
-        f.write("-- RESERVATIONS (995 new records)\n")
-        f.write("-- ============================================\n")
-        f.write("INSERT INTO reservations (reservation_id, reservation_code, client_id, room_id, guest_name, guest_email, guest_phone, checkin_date, checkout_date, total, status) VALUES\n")
-        f.write(",\n".join(reservations))
-        f.write(";\n\n")
-        
-        # RESERVATION SERVICES
-        f.write("-- ============================================\n")
-        f.write("-- RESERVATION_SERVICES\n")
-        f.write("-- ============================================\n")
-        if reservation_services:
-            f.write("INSERT INTO reservation_services (reservation_service_id, reservation_id, service_id, quantity, unit_price, service_date) VALUES\n")
-            f.write(",\n".join(reservation_services))
-            f.write(";\n\n")
-        
-        # INVOICES
-        f.write("-- ============================================\n")
-        f.write("-- INVOICES\n")
-        f.write("-- ============================================\n")
-        if invoices:
-            f.write("INSERT INTO invoices (invoice_id, invoice_code, reservation_id, total, method, invoice_date) VALUES\n")
-            f.write(",\n".join(invoices))
-            f.write(";\n\n")
-        
+
+        for table, chunks in counts.items():
+            f.write("-- ============================================\n")
+            f.write(f"-- {table.upper()} ({sum(chunks.values())} new records)\n")
+            f.write("-- ============================================\n")
+            for path in chunk_files(directory, table, chunks, 'sql'):
+                with open(path, encoding='utf-8') as part:
+                    shutil.copyfileobj(part, f)
+            f.write("\n")
+
         # Re-enable constraints
         f.write("COMMIT;\n")
         f.write("SET FOREIGN_KEY_CHECKS=1;\n")
         f.write("SET UNIQUE_CHECKS=1;\n")
         f.write("SET AUTOCOMMIT=1;\n\n")
-        
+
         f.write("-- ============================================\n")
         f.write("-- GENERATION COMPLETE\n")
         f.write("-- ============================================\n")
-    
-    print(f"\n[OK] SQL file generated: {output_file}")
+
+def write_csv_loader(directory, counts):
+    """load_data.sql: LOAD DATA statements for the CSV part files (run from 'directory')"""
+    path = os.path.join(directory, "load_data.sql")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("USE gestion_hotelera;\n\n")
+        f.write("SET FOREIGN_KEY_CHECKS=0;\n")
+        f.write("SET UNIQUE_CHECKS=0;\n\n")
+        for table, chunks in counts.items():
+            for part in chunk_files(directory, table, chunks, 'csv'):
+                f.write(f"LOAD DATA LOCAL INFILE '{os.path.basename(part)}' INTO TABLE {table}\n")
+                f.write("  CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"'\n")
+                f.write(f"  LINES TERMINATED BY '\\n' IGNORE 1 LINES ({', '.join(TABLE_COLUMNS[table])});\n")
+        f.write("\nSET FOREIGN_KEY_CHECKS=1;\n")
+        f.write("SET UNIQUE_CHECKS=1;\n")
+    return path
+
+def main(reservation_count=1200, output_file="hotel_data_inserts.sql", seed=12345, fmt='sql',
+         workers=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    workers = max(1, workers or os.cpu_count() or 1)
+    tasks = plan_chunks(reservation_count, max(1, chunk_rows))
+
+    print("Generating hotel database records...")
+    print("=" * 70)
+    print(f"{reservation_count} reservations in {len(tasks)} chunks, {workers} workers, seed {seed}")
+
+    if fmt == 'csv':
+        os.makedirs(output_file, exist_ok=True)
+        counts = run_tasks(tasks, output_file, fmt, seed, workers)
+        loader = write_csv_loader(output_file, counts)
+        print(f"\n[OK] CSV files generated in: {output_file}")
+        print(f"Load them from that directory with: mysql --local-infile=1 -u root -p < {os.path.basename(loader)}")
+    else:
+        # Part files go next to the output so the final concatenation stays on the same disk
+        parts_dir = tempfile.mkdtemp(prefix=".hotel_chunks_", dir=os.path.dirname(os.path.abspath(output_file)))
+        try:
+            counts = run_tasks(tasks, parts_dir, fmt, seed, workers)
+            write_sql(output_file, parts_dir, counts, reservation_count, seed)
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+        print(f"\n[OK] SQL file generated: {output_file}")
+
     print("\nRecord counts:")
-    print(f"  - Users: {len(users)}")
-    print(f"  - Clients: {len(clients)}")
-    print(f"  - Rooms: {len(rooms)}")
-    print(f"  - Staff: {len(staff)}")
-    print(f"  - Services: {len(services)}")
-    print(f"  - Reservations: {len(reservations)}")
-    print(f"  - Reservation Services: {len(reservation_services)}")
-    print(f"  - Invoices: {len(invoices)}")
+    for table, chunks in counts.items():
+        print(f"  - {table}: {sum(chunks.values())}")
     print("\n" + "=" * 70)
     print("DONE! Execute the SQL file in your MySQL database.")
+    return counts
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate synthetic hotel data as SQL inserts or CSV files")
+    parser.add_argument("--scale", "--reservations", dest="scale", type=int, default=1200,
+                        help="number of reservations to generate (clients and rooms grow with it)")
+    parser.add_argument("--seed", type=int, default=12345, help="same seed, same data (for any --workers)")
+    parser.add_argument("--format", choices=("sql", "csv"), default="sql",
+                        help="sql: a single script; csv: one file per table chunk plus load_data.sql")
+    parser.add_argument("--output", default=None,
+                        help="SQL file (default hotel_data_inserts.sql) or CSV directory (default hotel_data_csv)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_ROWS, help="rows per chunk")
+    args = parser.parse_args()
+    output = args.output or ("hotel_data_csv" if args.format == 'csv' else "hotel_data_inserts.sql")
+    main(args.scale, output, args.seed, args.format, args.workers, args.chunk_size)
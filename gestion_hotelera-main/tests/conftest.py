@@ -0,0 +1,71 @@
+"""
+Pruebas de la API contra el backend SQLite embebido (sin servidor MySQL).
+
+La configuración de la app se lee de variables de entorno al importarla, por eso se
+fijan aquí antes de importar app.
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web")
+_TMP_DIR = tempfile.mkdtemp(prefix="gestion_hotelera_tests_")
+
+os.environ.update(
+    DB_BACKEND="sqlite",
+    SQLITE_PATH=":memory:",
+    CACHE_BUS="local",
+    LOG_LEVEL="WARNING",
+    PROFILE_SAMPLE_RATE="0",
+    RESPONSE_CACHE_PATH=os.path.join(_TMP_DIR, "responses.sqlite3"),
+    METRICS_DIR=os.path.join(_TMP_DIR, "metrics"),
+    PROFILES_DIR=os.path.join(_TMP_DIR, "profiles"),
+    REPORT_JOBS_DIR=os.path.join(_TMP_DIR, "jobs"),
+)
+sys.path.insert(0, WEB_DIR)
+
+ADMIN = {"X-User-Role": "admin"}
+RECEPCION = {"X-User-Role": "recepcion"}
+
+_room_numbers = itertools.count(9001)
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+@pytest.fixture
+def make_room(client):
+    def make(price=1000, **fields):
+        payload = {"room_num": next(_room_numbers), "room_type": "doble", "capacity": 2,
+                   "price": price, **fields}
+        response = client.post("/api/rooms", headers=ADMIN, json=payload)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["room_id"]
+    return make
+
+@pytest.fixture
+def make_client_record(client):
+    def make(full_name="Cliente Prueba"):
+        response = client.post("/api/clients", headers=ADMIN,
+                               json={"full_name": full_name, "email": "cliente@prueba.com", "phone": "5550000000"})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["id"]
+    return make
+
+@pytest.fixture
+def make_reservation(client, make_room, make_client_record):
+    def make(checkin="2030-01-10", checkout="2030-01-12", room_id=None, client_id=None, guest_name="Huésped Prueba"):
+        payload = {"client_id": client_id or make_client_record(), "room_id": room_id or make_room(),
+                   "guest_name": guest_name, "checkin_date": checkin, "checkout_date": checkout}
+        response = client.post("/api/reservations", headers=RECEPCION, json=payload)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return make
@@ -0,0 +1,50 @@
+import os
+
+from conftest import ADMIN
+
+def occupancy(client, day):
+    return client.get(f"/api/reports/occupancy?start_date=2031-01-{day:02d}&end_date=2031-02-01", headers=ADMIN)
+
+def test_report_slots_are_shared_by_all_workers(client, app_module, monkeypatch):
+    limiter = app_module.heavy_reports
+    monkeypatch.setattr(limiter, "queue_seconds", 0.1)
+    ready_r, ready_w = os.pipe()
+    done_r, done_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:   # otro worker con todos los huecos ocupados; muere sin liberarlos
+        try:
+            tokens = [limiter.acquire() for _ in range(limiter.slots)]
+            os.write(ready_w, b"1" if all(tokens) else b"0")
+            os.read(done_r, 1)
+        finally:
+            os._exit(0)
+    try:
+        assert os.read(ready_r, 1) == b"1"
+        rejected = limiter.rejected
+        response = occupancy(client, 1)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(app_module.REPORT_RETRY_AFTER)
+        assert response.get_json()["retry_after"] == app_module.REPORT_RETRY_AFTER
+        assert limiter.rejected == rejected + 1
+    finally:
+        os.write(done_w, b"1")
+        os.waitpid(pid, 0)
+
+    assert occupancy(client, 2).status_code == 200
+
+def test_slots_are_released_after_the_report(client, app_module, monkeypatch):
+    limiter = app_module.heavy_reports
+    monkeypatch.setattr(limiter, "queue_seconds", 0.1)
+    for day in range(3, 3 + limiter.slots + 2):
+        assert occupancy(client, day).status_code == 200
+    assert limiter.active == 0
+
+    tokens = [limiter.acquire() for _ in range(limiter.slots)]
+    try:
+        assert limiter.acquire() is None
+    finally:
+        for token in tokens:
+            limiter.release(token)
+    token = limiter.acquire()
+    assert token is not None
+    limiter.release(token)
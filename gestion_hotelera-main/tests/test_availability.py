@@ -0,0 +1,55 @@
+from datetime import date
+
+from conftest import ADMIN, RECEPCION
+
+def d(text):
+    return date.fromisoformat(text)
+
+def test_index_with_overlapping_legacy_rows(app_module):
+    index = app_module.AvailabilityIndex()
+    index._loaded_at = 0   # cargado (vacío)
+    # Datos heredados: una estancia larga y otra solapada dentro de ella en la misma habitación
+    index.add(1, 7, d("2030-03-01"), d("2030-03-20"))
+    index.add(2, 7, d("2030-03-05"), d("2030-03-07"))
+
+    assert index.find_conflict(7, d("2030-03-10"), d("2030-03-12")) == 1
+    assert index.find_conflict(7, d("2030-03-20"), d("2030-03-22")) is None
+
+    # Quitar la reserva corta no libera las noches que sigue ocupando la larga
+    index.remove(2)
+    assert index.find_conflict(7, d("2030-03-05"), d("2030-03-06")) == 1
+    index._rooms = [{"room_id": 7, "room_num": 107, "room_type": "doble", "capacity": 2, "status": "disponible"}]
+    assert index.available_rooms(d("2030-03-05"), d("2030-03-06")) == []
+
+    index.remove(1)
+    assert index.find_conflict(7, d("2030-03-05"), d("2030-03-06")) is None
+    assert [room["room_id"] for room in index.available_rooms(d("2030-03-05"), d("2030-03-06"))] == [7]
+
+def test_create_and_cancel_reservation(client, app_module, make_room, make_client_record):
+    room_id = make_room()
+    client_id = make_client_record()
+    payload = {"client_id": client_id, "room_id": room_id, "guest_name": "Huésped",
+               "checkin_date": "2030-02-10", "checkout_date": "2030-02-12"}
+    created = client.post("/api/reservations", headers=RECEPCION, json=payload)
+    assert created.status_code == 201
+    reservation_id = created.get_json()["reservation_id"]
+
+    # Mismo rango y rangos que se tocan: choque solo si comparten alguna noche
+    assert client.post("/api/reservations", headers=RECEPCION, json=payload).status_code == 409
+    before = dict(payload, checkin_date="2030-02-08", checkout_date="2030-02-10")
+    assert client.post("/api/reservations", headers=RECEPCION, json=before).status_code == 201
+
+    assert client.put(f"/api/reservations/{reservation_id}/cancel", headers=ADMIN).status_code == 200
+    assert not app_module.availability.contains(reservation_id)
+    assert client.post("/api/reservations", headers=RECEPCION, json=payload).status_code == 201
+
+def test_sql_check_catches_conflicts_missing_from_index(client, app_module, make_room, make_client_record):
+    room_id = make_room()
+    payload = {"client_id": make_client_record(), "room_id": room_id, "guest_name": "Huésped",
+               "checkin_date": "2030-04-10", "checkout_date": "2030-04-12"}
+    assert client.post("/api/reservations", headers=RECEPCION, json=payload).status_code == 201
+    # Índice desfasado (p. ej. otro worker): la verificación en SQL sigue rechazando el choque
+    app_module.availability._starts.pop(room_id)
+    app_module.availability._intervals.pop(room_id)
+    overlap = dict(payload, checkin_date="2030-04-11", checkout_date="2030-04-13")
+    assert client.post("/api/reservations", headers=RECEPCION, json=overlap).status_code == 409
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from conftest import RECEPCION
+
+def available(client, checkin, checkout, **filters):
+    query = "".join(f"&{key}={value}" for key, value in filters.items())
+    response = client.get(f"/api/rooms/available?checkin={checkin}&checkout={checkout}{query}")
+    assert response.status_code == 200, response.get_json()
+    return [room["room_id"] for room in response.get_json()["data"]]
+
+def expected(app_module, checkin, checkout, room_type=None, capacity=None):
+    """La misma pregunta con una consulta de solapamiento directa."""
+    placeholders = ", ".join(["%s"] * len(app_module.ACTIVE_RESERVATION_STATUSES))
+    sql = f"""
+        SELECT ro.room_id FROM rooms ro
+        WHERE ro.status != 'mantenimiento'
+          AND NOT EXISTS (SELECT 1 FROM reservations r
+                          WHERE r.room_id = ro.room_id AND r.status IN ({placeholders})
+                            AND DATE(r.checkin_date) < %s AND DATE(r.checkout_date) > %s)
+    """
+    params = [*app_module.ACTIVE_RESERVATION_STATUSES, str(checkout), str(checkin)]
+    if room_type:
+        sql += " AND ro.room_type = %s"
+        params.append(room_type)
+    if capacity:
+        sql += " AND ro.capacity >= %s"
+        params.append(capacity)
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql + " ORDER BY ro.room_num", tuple(params))
+            return [row["room_id"] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+def assert_matches_sql(client, app_module, checkin, checkout, **filters):
+    assert available(client, checkin, checkout, **filters) == expected(app_module, checkin, checkout, **filters)
+
+def set_room_status(app_module, room_id, status):
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE rooms SET status = %s WHERE room_id = %s", (status, room_id))
+    finally:
+        conn.close()
+    app_module.availability.invalidate()
+
+RANGES = [("2031-03-01", "2031-03-05"), ("2031-03-04", "2031-03-06"), ("2031-03-05", "2031-03-08"),
+          ("2031-03-10", "2031-03-11"), ("2031-02-20", "2031-04-01")]
+
+def test_available_rooms_match_an_overlap_query(client, app_module, make_room, make_reservation):
+    suite = make_room(room_type="suite", capacity=4)
+    doble = make_room(room_type="doble", capacity=2)
+    sencilla = make_room(room_type="sencilla", capacity=1)
+    maintenance = make_room(room_type="suite", capacity=6)
+    set_room_status(app_module, maintenance, "mantenimiento")
+
+    make_reservation(checkin="2031-03-01", checkout="2031-03-05", room_id=suite)
+    make_reservation(checkin="2031-03-05", checkout="2031-03-07", room_id=doble)   # contigua a un rango
+    cancelled = make_reservation(checkin="2031-03-01", checkout="2031-03-20", room_id=sencilla)
+    assert client.put(f"/api/reservations/{cancelled['reservation_id']}/cancel", headers=RECEPCION).status_code == 200
+
+    for checkin, checkout in RANGES:
+        assert_matches_sql(client, app_module, checkin, checkout)
+        assert_matches_sql(client, app_module, checkin, checkout, room_type="suite")
+        assert_matches_sql(client, app_module, checkin, checkout, capacity=3)
+        assert_matches_sql(client, app_module, checkin, checkout, room_type="doble", capacity=2)
+
+    ids = available(client, "2031-03-02", "2031-03-03")
+    assert suite not in ids and maintenance not in ids
+    assert doble in ids and sencilla in ids
+    assert doble in available(client, "2031-03-03", "2031-03-05")
+
+def test_reservation_before_the_bitmap_origin_shifts_it(client, app_module, make_room, make_reservation):
+    room_id = make_room()
+    available(client, "2031-05-01", "2031-05-02")   # carga el índice
+    origin = app_module.availability._origin
+    checkin = origin - timedelta(days=30)
+    assert checkin > origin.today()
+    checkout = checkin + timedelta(days=3)
+
+    make_reservation(checkin=str(checkin), checkout=str(checkout), room_id=room_id)
+    assert app_module.availability._origin == checkin
+    assert room_id not in available(client, checkin, checkout)
+    for start, end in [(checkin - timedelta(days=2), checkin), (checkin + timedelta(days=1), checkin + timedelta(days=2)),
+                       (origin, origin + timedelta(days=5)), (checkout, checkout + timedelta(days=1))]:
+        assert_matches_sql(client, app_module, start, end)
+
+def test_invalid_ranges_are_rejected(client):
+    assert client.get("/api/rooms/available?checkin=2031-03-05&checkout=2031-03-05").status_code == 400
+    assert client.get("/api/rooms/available?checkin=2031-03-05").status_code == 400
+    assert client.get("/api/rooms/available?checkin=2031-03-05&checkout=2031-03-07&capacity=x").status_code == 400
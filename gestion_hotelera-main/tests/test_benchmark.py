@@ -0,0 +1,61 @@
+import json
+import os
+import random
+import subprocess
+import sys
+
+from conftest import ADMIN, WEB_DIR
+
+import benchmark
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def commit(self):
+        pass
+
+def test_mysql_load_targets_the_benchmark_database():
+    conn = RecordingConnection()
+    assert benchmark.execute_sql_script(conn, benchmark.SCHEMA_FILE) == len(conn.statements)
+    database_statements = [s for s in conn.statements if s.upper().startswith(("CREATE DATABASE", "USE"))]
+    assert database_statements
+    assert all(f"`{benchmark.BENCH_DB_NAME}`" in s for s in database_statements)
+
+def test_workload_runs_every_operation(client, app_module, make_reservation):
+    cancelled = make_reservation(checkin="2030-06-10", checkout="2030-06-12")
+    assert client.put(f"/api/reservations/{cancelled['reservation_id']}/cancel", headers=ADMIN).status_code == 200
+    make_reservation(checkin="2030-06-10", checkout="2030-06-12")
+
+    workload = benchmark.Workload(app_module, seed=1)
+    rng = random.Random(1)
+    for operation, _ in benchmark.MIX:
+        response = workload.run(client, operation, rng)
+        try:
+            response.get_data()
+            assert response.status_code < 500, operation
+        finally:
+            response.close()
+    assert app_module.db_pool._in_use == 0
+
+def test_benchmark_cli_against_sqlite(tmp_path):
+    output = tmp_path / "results.json"
+    subprocess.run([sys.executable, os.path.join(WEB_DIR, "benchmark.py"), "--backend", "sqlite", "--scales", "1k",
+                    "--requests", "200", "--warmup", "0", "--concurrency", "2", "--output", str(output)],
+                   check=True, cwd=tmp_path, stdout=subprocess.DEVNULL)
+    scale = json.loads(output.read_text(encoding="utf-8"))["scales"]["1k"]
+    assert scale["requests"] == 200
+    assert scale["errors"] == 0
+    assert "export_report" in scale["endpoints"]
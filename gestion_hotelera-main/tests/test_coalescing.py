@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+import uuid
+
+from flask import jsonify
+
+from conftest import ADMIN
+
+def slow_view(log_path, seconds=0.3):
+    def view():
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write("x")
+        time.sleep(seconds)
+        return jsonify(ok=True)
+    view.__name__ = f"vista_{uuid.uuid4().hex}"
+    return view
+
+def test_identical_requests_in_different_workers_compute_once(app_module, tmp_path):
+    log_path = tmp_path / "executions"
+    view = app_module.shared_cache(ttl=30, tables=("rooms",))(slow_view(log_path))
+    url = f"/prueba/lease?n={uuid.uuid4().hex}"
+
+    pids = []
+    for _ in range(4):
+        pid = os.fork()
+        if pid == 0:   # un "worker" de gunicorn
+            code = 1
+            try:
+                with app_module.app.test_request_context(url, headers=ADMIN):
+                    response = view()
+                    code = 0 if response.status_code == 200 and response.get_json() == {"ok": True} else 1
+            finally:
+                os._exit(code)
+        pids.append(pid)
+    assert [os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) for pid in pids] == [0] * 4
+    assert log_path.read_text() == "x"
+
+def test_waiters_compute_when_the_leader_does_not_store(app_module, tmp_path):
+    log_path = tmp_path / "executions"
+    cache = app_module.response_cache
+    key = f"prueba|{uuid.uuid4().hex}"
+    owner = cache.lease(key, 30)
+    assert owner is not None
+    assert cache.lease(key, 30) is None
+    threading.Timer(0.1, cache.release_lease, (key, owner)).start()
+    started = time.monotonic()
+    assert cache.wait(key, 5) is None
+    assert time.monotonic() - started < 2
+    assert cache.lease(key, 30) is not None
+
+def test_identical_requests_in_one_worker_share_the_execution(app_module, tmp_path):
+    log_path = tmp_path / "executions"
+    view = app_module.coalesce_requests(slow_view(log_path))
+    url = f"/prueba/coalesce?n={uuid.uuid4().hex}"
+    saved = app_module.single_flight.stats()["saved"]
+    barrier = threading.Barrier(4)
+    statuses = []
+
+    def request():
+        with app_module.app.test_request_context(url, headers=ADMIN):
+            barrier.wait()
+            statuses.append(view().status_code)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 4
+    assert log_path.read_text() == "x"
+    assert app_module.single_flight.stats()["saved"] == saved + 3
@@ -0,0 +1,39 @@
+from conftest import ADMIN
+
+def total(client, query=""):
+    body = client.get(f"/api/clients?per_page=1{query}", headers=ADMIN).get_json()
+    return body["total"], body["total_estimated"]
+
+def test_repeated_listing_is_counted_once(client, app_module, make_client_record):
+    make_client_record()
+    cache = app_module.count_cache
+    first = total(client)
+    hits, misses = cache.hits, cache.misses
+    assert total(client) == first
+    assert (cache.hits, cache.misses) == (hits + 1, misses)
+
+def test_write_to_a_counted_table_invalidates_the_count(client, app_module, make_client_record):
+    before, _ = total(client)
+    total(client)
+    make_client_record()
+    misses = app_module.count_cache.misses
+    assert total(client) == (before + 1, False)
+    assert app_module.count_cache.misses == misses + 1
+
+def test_write_to_another_table_keeps_the_count(client, app_module, make_room):
+    total(client)
+    make_room()
+    hits = app_module.count_cache.hits
+    total(client)
+    assert app_module.count_cache.hits == hits + 1
+
+def test_estimate_is_used_only_for_unfiltered_listings(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "estimate_table_rows", lambda cursor, table: 12345 if table == "clients" else None)
+    assert total(client, "&count=estimate") == (12345, True)
+    exact, estimated = total(client, "&count=estimate&q=Cliente")
+    assert not estimated and exact < 12345
+    assert total(client)[1] is False
+
+def test_estimate_falls_back_to_an_exact_count(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "estimate_table_rows", lambda cursor, table: None)
+    assert total(client, "&count=estimate") == total(client)
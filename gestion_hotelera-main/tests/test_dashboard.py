@@ -0,0 +1,56 @@
+import contextlib
+import uuid
+
+import pymysql
+
+from conftest import ADMIN
+
+def counters(app_module):
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            return app_module.dashboard_counters.snapshot(cur)
+    finally:
+        conn.close()
+
+def register(client, email):
+    return client.post("/api/register", json={"email": email, "password": "secreta", "full_name": "Cliente Nuevo"})
+
+def test_writes_apply_deltas_without_reloading(client, app_module, make_room):
+    before = counters(app_module)
+    reloads = app_module.dashboard_counters.reloads
+
+    assert register(client, f"{uuid.uuid4().hex[:10]}@prueba.com").status_code == 201
+    assert client.post("/api/clients", headers=ADMIN, json={"full_name": "Cliente Admin"}).status_code == 201
+    make_room()
+
+    after = counters(app_module)
+    assert app_module.dashboard_counters.reloads == reloads
+    assert after["total_clients"] == before["total_clients"] + 2
+    assert after["total_rooms"] == before["total_rooms"] + 1
+    assert after["available_rooms"] == before["available_rooms"] + 1
+
+    # Los deltas coinciden con lo que hay en la BD
+    app_module.dashboard_counters.invalidate()
+    assert counters(app_module) == after
+
+def test_failed_commit_leaves_the_counter_unchanged(client, app_module, monkeypatch):
+    @contextlib.contextmanager
+    def failing_commit(conn):
+        conn.begin()
+        with conn.cursor() as cur:
+            yield cur
+        conn.rollback()
+        raise pymysql.err.OperationalError(1213, "Deadlock found when trying to get lock")
+
+    before = counters(app_module)
+    monkeypatch.setattr(app_module, "transaction", failing_commit)
+    assert register(client, f"{uuid.uuid4().hex[:10]}@prueba.com").status_code == 500
+    assert counters(app_module)["total_clients"] == before["total_clients"]
+
+def test_duplicate_registration_does_not_count(client, app_module):
+    email = f"{uuid.uuid4().hex[:10]}@prueba.com"
+    assert register(client, email).status_code == 201
+    before = counters(app_module)
+    assert register(client, email).status_code == 400
+    assert counters(app_module)["total_clients"] == before["total_clients"]
@@ -0,0 +1,62 @@
+import threading
+
+from conftest import RECEPCION
+
+class BlockingStore:
+    """LocalVersionStore cuyo primer bump espera a que la prueba lo libere."""
+    def __init__(self, app_module):
+        self.inner = app_module.LocalVersionStore()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def bump(self, tables):
+        self.calls += 1
+        if self.calls == 1:
+            self.entered.set()
+            self.release.wait(5)
+        self.inner.bump(tables)
+
+    def read(self):
+        return self.inner.read()
+
+def test_only_successful_writes_publish(client, app_module, make_room, make_client_record):
+    bus = app_module.invalidation_bus
+    invalid = {"client_id": make_client_record(), "room_id": make_room(), "guest_name": "Huésped",
+               "checkin_date": "2030-05-10", "checkout_date": "2030-05-09"}
+    published = bus.published
+    assert client.post("/api/reservations", headers=RECEPCION, json=invalid).status_code == 400
+    assert bus.published == published
+
+    valid = dict(invalid, checkout_date="2030-05-12")
+    assert client.post("/api/reservations", headers=RECEPCION, json=valid).status_code == 201
+    assert bus.published == published + 1
+
+def test_publish_does_not_hold_the_lock_during_the_store_write(app_module):
+    store = BlockingStore(app_module)
+    bus = app_module.InvalidationBus(store, poll_seconds=0)
+    assert bus.poll(force=True) == ()   # fija la referencia
+
+    slow = threading.Thread(target=bus.publish, args=(("rooms",),))
+    slow.start()
+    assert store.entered.wait(5)
+    # Otro escritor no espera al primero, y un sondeo no corre con un incremento a medias
+    bus.publish(("clients",))
+    assert bus.published == 1
+    assert bus.poll(force=True) == ()
+    assert bus.polls == 1
+    store.release.set()
+    slow.join(5)
+
+    assert bus.published == 2
+    assert bus.poll(force=True) == ()   # ambos incrementos son propios
+    assert bus.polls == 2
+
+def test_remote_changes_are_detected(app_module):
+    store = app_module.LocalVersionStore()
+    mine = app_module.InvalidationBus(store, poll_seconds=0)
+    other = app_module.InvalidationBus(store, poll_seconds=0)
+    mine.poll(force=True)
+    mine.publish(("rooms",))
+    other.publish(("reservations",))
+    assert mine.poll(force=True) == ("reservations",)
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ADMIN
+
+REMOTE = {"REMOTE_ADDR": "10.0.0.5"}
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def test_dead_worker_files_are_merged_once_and_removed(client, app_module):
+    directory = app_module.metrics.directory
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{dead_pid()}-muerto.json")
+    snapshot = {"pid": int(os.path.basename(path).split("-")[0]), "started": 0,
+                "counters": [["hotel_db_queries_total", [["route", "/prueba/muerto"]], 7]],
+                "gauges": [["hotel_http_requests_in_flight", [], 3]], "histograms": []}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+
+    series = 'hotel_db_queries_total{route="/prueba/muerto"} 7'
+    for _ in range(2):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert series in response.get_data(as_text=True)
+        assert not os.path.exists(path)
+    assert len([n for n in os.listdir(directory) if n.startswith(f"{os.getpid()}-")]) == 1
+
+def test_metrics_require_admin_outside_the_allowlist(client):
+    assert client.get("/metrics", environ_base=REMOTE).status_code == 403
+    assert client.get("/metrics", environ_base=REMOTE, headers=ADMIN).status_code == 200
@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from conftest import ADMIN, RECEPCION
+
+def walk_offset(client, url, key, per_page=3):
+    ids, page = [], 1
+    while True:
+        body = client.get(f"{url}{'&' if '?' in url else '?'}per_page={per_page}&page={page}", headers=ADMIN).get_json()
+        ids += [row[key] for row in body["data"]]
+        if page >= body["pages"]:
+            return ids, body["total"]
+        page += 1
+
+def walk_cursor(client, url, key, per_page=3):
+    ids, after = [], None
+    while True:
+        query = f"per_page={per_page}" + (f"&after={after}" if after else "")
+        body = client.get(f"{url}{'&' if '?' in url else '?'}{query}", headers=ADMIN).get_json()
+        ids += [row[key] for row in body["data"]]
+        after = body["next_cursor"]
+        if after is None:
+            return ids
+
+def assert_same_pages(client, url, key):
+    by_offset, total = walk_offset(client, url, key)
+    by_cursor = walk_cursor(client, url, key)
+    assert len(by_offset) == total
+    assert len(set(by_cursor)) == len(by_cursor)
+    assert by_cursor == by_offset
+
+@pytest.fixture
+def billed_reservations(client, make_reservation):
+    """Reservas con servicios del mismo día (empates en service_date) y facturadas el mismo día."""
+    code = f"PAG-{uuid.uuid4().hex[:6]}"
+    service_id = client.post("/api/services", headers=ADMIN,
+                             json={"service_code": code, "name": "Toallas extra", "price": 50}).get_json()["service_id"]
+    ids = []
+    for day in range(1, 8):
+        reservation_id = make_reservation(checkin=f"2030-08-{day:02d}", checkout="2030-08-20")["reservation_id"]
+        for _ in range(2):
+            response = client.post(f"/api/reservations/{reservation_id}/services", headers=RECEPCION,
+                                   json={"service_id": service_id, "quantity": 1, "service_date": "2030-08-17"})
+            assert response.status_code == 201, response.get_json()
+        for status in ("checkin", "checkout"):
+            response = client.put(f"/api/reservations/{reservation_id}", headers=RECEPCION, json={"status": status})
+            assert response.status_code == 200, response.get_json()
+        response = client.post("/api/invoices", headers=ADMIN,
+                               json={"reservation_id": reservation_id, "total": 1000, "method": "tarjeta"})
+        assert response.status_code == 201, response.get_json()
+        ids.append(reservation_id)
+    return ids
+
+def test_reservations_cursor_matches_offset(client, billed_reservations):
+    assert_same_pages(client, "/api/reservations", "reservation_id")
+
+def test_reservation_services_cursor_matches_offset_with_date_ties(client, billed_reservations):
+    assert_same_pages(client, "/api/reservation_services", "reservation_service_id")
+
+def test_invoices_cursor_matches_offset_with_date_ties(client, billed_reservations):
+    assert_same_pages(client, "/api/invoices", "invoice_id")
+
+def test_catalog_cursor_matches_offset(client, make_room, billed_reservations):
+    for _ in range(4):
+        make_room()
+    assert_same_pages(client, "/api/rooms", "room_id")
+    assert_same_pages(client, "/api/services", "service_id")
+
+def test_invalid_cursor_is_a_bad_request(client):
+    response = client.get("/api/reservations?after=@@@", headers=ADMIN)
+    assert response.status_code == 400
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from pymysql.constants import SERVER_STATUS
+
+class FakeRaw:
+    """Conexión física falsa: registra lo que el pool le hace."""
+    def __init__(self):
+        self.open = True
+        self.server_status = 0
+        self.calls = []
+
+    def rollback(self):
+        self.calls.append("rollback")
+        self.server_status = 0
+
+    def ping(self, reconnect=False):
+        self.calls.append("ping")
+
+    def close(self):
+        self.calls.append("close")
+        self.open = False
+
+    def _force_close(self):
+        self.calls.append("force_close")
+        self.open = False
+
+@pytest.fixture
+def pool(app_module):
+    def make(**options):
+        opened = []
+        def connect():
+            opened.append(FakeRaw())
+            return opened[-1]
+        pool = app_module.ConnectionPool(connect, **{"min_size": 0, "max_size": 2, "timeout": 0.05, **options})
+        pool.opened = opened
+        return pool
+    return make
+
+def test_checkout_release_reuses_the_connection(pool):
+    p = pool()
+    conn = p.acquire()
+    assert p.stats()["in_use"] == 1
+    conn.close()
+    assert p.stats()["in_use"] == 0 and p.stats()["idle"] == 1
+    p.acquire().close()
+    assert len(p.opened) == 1
+    assert p.stats()["checkouts"] == 2
+
+def test_release_rolls_back_an_open_transaction(pool):
+    p = pool()
+    conn = p.acquire()
+    raw = p.opened[0]
+    raw.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+    conn.close()
+    assert raw.calls == ["rollback"]
+
+def test_discarded_connection_is_not_reused(pool):
+    p = pool()
+    conn = p.acquire()
+    conn.discard()
+    conn.close()
+    assert p.stats()["discarded"] == 1 and p.stats()["size"] == 0
+    p.acquire().close()
+    assert len(p.opened) == 2
+
+def test_connection_is_recycled_after_recycle_uses(pool):
+    p = pool(recycle_uses=2)
+    for _ in range(3):
+        p.acquire().close()
+    assert len(p.opened) == 2
+    assert p.opened[0].calls == ["close"]
+    assert p.stats()["recycled"] == 1
+
+def test_checkout_times_out_when_pool_is_exhausted(pool, app_module):
+    p = pool(max_size=1)
+    conn = p.acquire()
+    with pytest.raises(app_module.PoolTimeout):
+        p.acquire()
+    conn.close()
+    assert p.stats()["timeouts"] == 1
+
+def test_connections_inherited_across_fork_are_closed_without_touching_the_session(pool, monkeypatch):
+    p = pool()
+    idle = p.acquire()
+    busy = p.acquire()
+    idle.close()
+    idle_raw, busy_raw = p.opened
+    busy_raw.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    child_pid = os.getpid() + 1
+    monkeypatch.setattr(os, "getpid", lambda: child_pid)
+    busy.close()        # sacada antes del "fork", devuelta en el hijo
+    assert busy_raw.calls == ["force_close"]
+
+    p.acquire().close()     # el hijo abre su propia conexión
+    assert idle_raw.calls == ["force_close"]
+    stats = p.stats()
+    assert stats["inherited_closed"] == 2 and stats["in_use"] == 0 and stats["size"] == 1
+    assert len(p.opened) == 3
+
+def test_cursor_round_trip(app_module):
+    values = ["2030-01-10 14:00:00", 42, "Núñez, José"]
+    token = app_module.encode_cursor(values)
+    assert "=" not in token and "/" not in token and "+" not in token
+    assert app_module.decode_cursor(token) == values
+
+@pytest.mark.parametrize("token", ["@@@", "e30"])   # e30: base64 de "{}", no es una lista
+def test_invalid_cursor_is_rejected(app_module, token):
+    with pytest.raises(ValueError):
+        app_module.decode_cursor(token)
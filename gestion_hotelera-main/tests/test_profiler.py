@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import ADMIN, RECEPCION
+
+PROFILE = dict(ADMIN, **{"X-Profile": "1"})
+
+@pytest.fixture
+def profiler(app_module, tmp_path, monkeypatch):
+    profiler = app_module.profiler
+    monkeypatch.setattr(profiler, "directory", str(tmp_path))
+    return profiler
+
+def test_admin_request_with_header_is_profiled(client, profiler):
+    captured = profiler.captured
+    assert client.get("/api/rooms?per_page=5", headers=PROFILE).status_code == 200
+    assert profiler.captured == captured + 1
+
+    (summary,) = client.get("/api/admin/profiles", headers=ADMIN).get_json()
+    assert summary["route"] == "api_get_rooms" and summary["status"] == 200
+    assert summary["path"] == "/api/rooms?per_page=5"
+    assert "top_functions" not in summary
+
+    capture = client.get(f"/api/admin/profiles/{summary['profile_id']}", headers=ADMIN).get_json()
+    assert len(capture["top_functions"]) <= profiler.top_n
+    assert any("api_get_rooms" in row["function"] for row in capture["top_functions"])
+    assert capture["queries"] == len(capture["sql"])
+
+    response = client.get(capture["collapsed"], headers=ADMIN)
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    for line in response.get_data(as_text=True).splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+def test_only_admins_can_force_a_profile(client, profiler):
+    captured = profiler.captured
+    assert client.get("/api/rooms", headers=dict(RECEPCION, **{"X-Profile": "1"})).status_code == 200
+    assert client.get("/api/rooms", headers={"X-Profile": "1"}).status_code == 200
+    assert client.get("/api/rooms", headers=ADMIN).status_code == 200
+    assert profiler.captured == captured
+    assert profiler.list() == []
+
+def test_one_profile_at_a_time(client, profiler):
+    captured = profiler.captured
+    with profiler._busy:
+        assert client.get("/api/rooms", headers=PROFILE).status_code == 200
+    assert profiler.captured == captured
+    assert client.get("/api/rooms", headers=PROFILE).status_code == 200
+    assert profiler.captured == captured + 1
+
+def test_old_profiles_are_pruned(client, profiler, monkeypatch):
+    monkeypatch.setattr(profiler, "keep", 2)
+    for page in (1, 2, 3):
+        assert client.get(f"/api/rooms?page={page}", headers=PROFILE).status_code == 200
+        time.sleep(0.01)   # created_at distinto
+    paths = [capture["path"] for capture in profiler.list()]
+    assert paths == ["/api/rooms?page=3", "/api/rooms?page=2"]
+    assert len(os.listdir(profiler.directory)) == 4   # .json y .collapsed de cada uno
+
+def test_profile_endpoints_require_admin(client, profiler):
+    client.get("/api/rooms", headers=PROFILE)
+    profile_id = profiler.list()[0]["profile_id"]
+    for url in ("/api/admin/profiles", f"/api/admin/profiles/{profile_id}", f"/api/admin/profiles/{profile_id}/collapsed"):
+        assert client.get(url, headers=ADMIN).status_code == 200
+        assert client.get(url, headers=RECEPCION).status_code == 403
+        assert client.get(url, headers={"X-User-Role": "cliente"}).status_code == 403
+        assert client.get(url).status_code == 403
+
+def test_unknown_or_malformed_ids_are_not_found(client, profiler):
+    for profile_id in ("0123456789abcdef", "no-es-un-id", "..%2F..%2Fapp", "0123456789ABCDEF"):
+        assert client.get(f"/api/admin/profiles/{profile_id}", headers=ADMIN).status_code == 404
+        assert client.get(f"/api/admin/profiles/{profile_id}/collapsed", headers=ADMIN).status_code == 404
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_stack_sampler_collects_collapsed_stacks(app_module):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,))
+    worker.start()
+    sampler = app_module.StackSampler(worker.ident, 0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    assert sum(sampler.stacks.values()) > 0
+    stack = sampler.stacks.most_common(1)[0][0]
+    frames = stack.split(";")
+    assert frames[-1].startswith("busy_loop (test_profiler.py:")
+    assert frames[0].startswith("_bootstrap (threading.py:")
@@ -0,0 +1,82 @@
+import json
+import logging
+
+import pytest
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+    def events(self, name):
+        return [entry for entry in map(json.loads, self.lines) if entry["event"] == name]
+
+@pytest.fixture
+def log(app_module):
+    handler = ListHandler()
+    level = app_module.logger.level
+    app_module.logger.addHandler(handler)
+    app_module.logger.setLevel(logging.INFO)   # conftest deja solo WARNING
+    yield handler
+    app_module.logger.removeHandler(handler)
+    app_module.logger.setLevel(level)
+
+def test_slow_queries_are_logged_without_their_values(client, app_module, log, monkeypatch):
+    monkeypatch.setattr(app_module, "SLOW_QUERY_MS", 0)
+    secret = "clave-muy-secreta-123"
+    response = client.post("/api/login", data={"email": "nadie@hotel.com", "password": secret})
+    assert response.status_code == 401
+
+    slow = log.events("slow_query")
+    assert slow
+    login = next(entry for entry in slow if "FROM users" in entry["sql"])
+    assert login["route"] == "api_login"
+    assert login["sql"] == "SELECT user_id, user_role FROM users WHERE email=? AND password_hash=SHA2(...)"
+    assert login["params"] == ["<str:15>", f"<str:{len(secret)}>"]
+    assert login["ms"] >= 0
+    assert not any(secret in line or "nadie@hotel.com" in line for line in log.lines)
+
+    request_entry = log.events("request")[-1]
+    assert request_entry["route"] == "api_login" and request_entry["status"] == 401
+    assert request_entry["queries"] >= 1 and "statements" not in request_entry
+
+def test_fast_queries_are_not_logged(client, app_module, log, monkeypatch):
+    monkeypatch.setattr(app_module, "SLOW_QUERY_MS", 60_000)
+    assert client.post("/api/login", data={"email": "nadie@hotel.com", "password": "x"}).status_code == 401
+    assert log.events("slow_query") == []
+    assert log.events("request")[-1]["queries"] >= 1
+
+def test_debug_request_log_lists_normalized_statements(client, app_module, log, monkeypatch):
+    monkeypatch.setattr(app_module, "SLOW_QUERY_MS", 60_000)
+    app_module.logger.setLevel(logging.DEBUG)
+    client.post("/api/login", data={"email": "nadie@hotel.com", "password": "otra-clave"})
+    statements = log.events("request")[-1]["statements"]
+    assert "SELECT user_id, user_role FROM users WHERE email=? AND password_hash=SHA2(...)" in [sql for sql, _, _ in statements]
+    assert "otra-clave" not in "".join(log.lines)
+
+class FailingCursor:
+    rowcount = -1
+
+    def execute(self, query, args=None):
+        raise RuntimeError("conexión perdida")
+
+def test_failed_statements_are_still_timed(app_module, log, monkeypatch):
+    monkeypatch.setattr(app_module, "SLOW_QUERY_MS", 0)
+    cur = app_module.InstrumentedCursor(FailingCursor())
+    with pytest.raises(RuntimeError):
+        cur.execute("DELETE FROM clients WHERE email = 'a@b.com' AND client_id IN (%s, %s)", (1, 2))
+    (entry,) = log.events("slow_query")
+    assert entry["sql"] == "DELETE FROM clients WHERE email = ? AND client_id IN (...)"
+    assert entry["params"] == ["<int>", "<int>"]
+    assert entry["rows"] is None
+    assert "a@b.com" not in log.lines[0]
+
+def test_redact_params(app_module):
+    redact = app_module.redact_params
+    assert redact(None) is None
+    assert redact(("secreto", 5, 2.5, None, b"\x00\x01")) == ["<str:7>", "<int>", "<float>", "<NoneType>", "<bytes:2>"]
+    assert redact({"email": "a@b.com", "id": 3}) == ["<str:7>", "<int>"]
+    assert redact("solo") == ["<str:4>"]
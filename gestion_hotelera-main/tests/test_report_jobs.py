@@ -0,0 +1,42 @@
+import time
+
+from conftest import ADMIN, RECEPCION
+
+def wait_for_job(client, job_id, headers=ADMIN, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/reports/jobs/{job_id}", headers=headers).get_json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"el trabajo {job_id} no terminó")
+
+def test_export_job_is_admin_only(client, app_module, make_reservation):
+    make_reservation()
+    admitted = app_module.heavy_reports.admitted
+
+    response = client.post("/api/reports/jobs", headers=ADMIN, json={"report": "reservations"})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()["job_id"])
+    assert job["status"] == "done"
+    assert job["role"] == "admin"
+    # Los trabajos no ocupan los huecos de los reportes síncronos
+    assert app_module.heavy_reports.admitted == admitted
+
+    job_id = job["job_id"]
+    assert client.get(f"/api/reports/jobs/{job_id}", headers=RECEPCION).status_code == 403
+    assert client.get(f"/api/reports/jobs/{job_id}/download", headers=RECEPCION).status_code == 403
+    download = client.get(f"/api/reports/jobs/{job_id}/download", headers=ADMIN)
+    assert download.status_code == 200
+    assert download.get_data(as_text=True).startswith("Codigo,Cliente")
+    download.close()
+
+def test_occupancy_job_is_readable_by_recepcion(client):
+    response = client.post("/api/reports/jobs", headers=RECEPCION,
+                           json={"report": "occupancy", "start_date": "2030-01-01", "end_date": "2030-01-31"})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()["job_id"], headers=RECEPCION)
+    assert job["status"] == "done"
+    download = client.get(f"/api/reports/jobs/{job['job_id']}/download", headers=RECEPCION)
+    assert download.status_code == 200
+    download.close()
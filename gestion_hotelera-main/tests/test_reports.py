@@ -0,0 +1,37 @@
+from conftest import ADMIN
+
+def test_export_head_returns_connection_to_pool(client, app_module, make_reservation):
+    reservation = make_reservation()
+    pool = app_module.db_pool
+
+    response = client.head("/api/reports/export?type=reservations", headers=ADMIN)
+    assert response.status_code == 200
+    response.close()
+    assert pool._in_use == 0
+
+    response = client.get("/api/reports/export?type=reservations", headers=ADMIN)
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    response.close()
+    assert body.startswith("Codigo,Cliente,Habitacion")
+    assert reservation["reservation_code"] in body
+    assert pool._in_use == 0
+
+def test_occupancy_csv_is_streamed(app_module):
+    url = "/api/reports/occupancy/csv?start_date=2030-01-01&end_date=2030-01-03"
+    with app_module.app.test_request_context(url, headers=ADMIN):
+        response = app_module.api_report_occupancy_csv()
+        try:
+            assert response.is_streamed
+            assert "X-Coalesced" not in response.headers
+            body = "".join(response.response)
+        finally:
+            response.close()
+    assert body.splitlines()[0] == "Fecha,Habitaciones Ocupadas,Total Habitaciones,Ocupacion (%)"
+    assert len(body.splitlines()) == 4
+
+def test_streamed_export_has_no_statement_timeout(app_module):
+    with app_module.app.test_request_context("/api/reports/export?type=reservations", headers=ADMIN):
+        assert app_module.statement_timeout_ms() == 0
+    with app_module.app.test_request_context("/api/reports/occupancy", headers=ADMIN):
+        assert app_module.statement_timeout_ms() > 0
@@ -0,0 +1,107 @@
+import uuid
+
+import pytest
+
+from conftest import ADMIN, RECEPCION
+
+ELIGIBLE = "/api/reservations/eligible_for_invoice"
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def cache(app_module, tmp_path):
+    return app_module.SharedResponseCache(str(tmp_path / "responses.sqlite3"), max_bytes=250)
+
+def eligible(client):
+    response = client.get(ELIGIBLE, headers=ADMIN)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+def test_writes_invalidate_tagged_responses(client, make_reservation):
+    reservation_id = make_reservation(checkin="2030-10-01", checkout="2030-10-03")["reservation_id"]
+    assert eligible(client).headers["X-Cache"] == "MISS"
+    assert eligible(client).headers["X-Cache"] == "HIT"
+
+    # Una escritura en una tabla que la respuesta no lee no la invalida
+    response = client.post("/api/services", headers=ADMIN,
+                           json={"service_code": f"RC-{uuid.uuid4().hex[:6]}", "name": "Spa", "price": 10})
+    assert response.status_code == 201, response.get_json()
+    assert eligible(client).headers["X-Cache"] == "HIT"
+
+    for status in ("checkin", "checkout"):
+        assert client.put(f"/api/reservations/{reservation_id}", headers=RECEPCION,
+                          json={"status": status}).status_code == 200
+    response = eligible(client)
+    assert response.headers["X-Cache"] == "MISS"
+    assert reservation_id in [row["reservation_id"] for row in response.get_json()]
+
+def test_remote_write_reaches_subscribers_and_versions(app_module):
+    bus = app_module.InvalidationBus(app_module.LocalVersionStore(), poll_seconds=0)
+    other = app_module.InvalidationBus(bus.store, poll_seconds=0)
+    calls = []
+    bus.subscribe(("rooms",), lambda: calls.append("rooms"))
+    bus.subscribe(("invoices",), lambda: calls.append("invoices"))
+    bus.poll(force=True)
+
+    before = app_module.table_versions(("rooms", "invoices"))
+    other.publish(("rooms",))
+    assert bus.poll(force=True) == ("rooms",)
+    assert calls == ["rooms"]
+    assert app_module.table_versions(("rooms", "invoices")) == (before[0] + 1, before[1])
+
+    bus.publish(("invoices",))   # los cambios propios ya se aplicaron al escribir
+    assert bus.poll(force=True) == ()
+    assert calls == ["rooms"]
+
+def test_put_after_an_invalidation_is_rejected(cache):
+    versions = cache.tag_versions(("rooms",))
+    assert cache.put("a", b"x" * 10, "application/json", 60, ("rooms",), versions)
+    assert cache.get("a") == (b"x" * 10, "application/json")
+
+    stale = cache.tag_versions(("rooms", "clients"))
+    cache.invalidate(("rooms",))
+    assert cache.get("a") is None
+    # Calculado antes de la escritura: no se guarda
+    assert not cache.put("b", b"y" * 10, "application/json", 60, ("rooms", "clients"), stale)
+    assert cache.get("b") is None
+    assert cache.put("b", b"y" * 10, "application/json", 60, ("rooms", "clients"), cache.tag_versions(("rooms", "clients")))
+
+    # Solo se borran las entradas con las etiquetas escritas
+    cache.put("c", b"z" * 10, "application/json", 60, ("invoices",), cache.tag_versions(("invoices",)))
+    cache.invalidate(("clients",))
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["invalidations"] == 2
+
+def test_lru_eviction_keeps_the_cache_under_max_bytes(app_module, cache, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app_module.time, "time", clock)
+    body = b"x" * 100
+
+    def put(key):
+        return cache.put(key, body, "application/json", 60, ("rooms",), cache.tag_versions(("rooms",)))
+
+    assert put("a")
+    clock.now += 2
+    assert put("b")
+    clock.now += 2
+    assert cache.get("a") is not None   # "a" pasa a ser la más reciente
+    clock.now += 2
+    assert put("c")                      # 300 bytes > 250: sale "b", la menos usada
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 200 <= stats["max_bytes"]
+
+    assert not cache.put("huge", b"x" * 251, "application/json", 60, ("rooms",), cache.tag_versions(("rooms",)))
+
+    clock.now += 61                      # las caducadas salen antes que las vigentes
+    assert put("d")
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,49 @@
+from conftest import ADMIN, RECEPCION
+
+def as_client(client_id):
+    return {"X-User-Role": "cliente", "X-Client-Id": str(client_id)}
+
+def test_per_page_above_the_endpoint_limit_is_rejected(client):
+    response = client.get("/api/reservations?per_page=101", headers=RECEPCION)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["limit"] == 100
+    assert body["export"] == "/api/reports/export?type=reservations"
+    assert "after" in body["error"]
+    assert client.get("/api/reservations?per_page=100", headers=RECEPCION).status_code == 200
+
+def test_per_page_uses_the_global_limit_elsewhere(client, app_module):
+    response = client.get(f"/api/clients?per_page={app_module.MAX_PER_PAGE + 1}", headers=ADMIN)
+    assert response.status_code == 400
+    assert response.get_json()["limit"] == app_module.MAX_PER_PAGE
+
+def test_client_listings_are_bounded_by_the_row_limit(client, app_module, make_reservation, make_client_record,
+                                                      monkeypatch):
+    client_id = make_client_record()
+    service_id = client.post("/api/services", headers=ADMIN,
+                             json={"service_code": f"LIM-{client_id}", "name": "Lavandería", "price": 80}).get_json()["service_id"]
+    for day in (1, 5, 9):
+        reservation = make_reservation(checkin=f"2030-09-{day:02d}", checkout=f"2030-09-{day + 2:02d}", client_id=client_id)
+        assert client.post(f"/api/reservations/{reservation['reservation_id']}/services", headers=RECEPCION,
+                           json={"service_id": service_id, "service_date": f"2030-09-{day:02d}"}).status_code == 201
+
+    for url in ("/api/my_reservations", "/api/my_reservation_services"):
+        monkeypatch.setattr(app_module, "RESPONSE_MAX_ROWS", 3)
+        response = client.get(url, headers=as_client(client_id))
+        assert response.status_code == 200 and len(response.get_json()) == 3
+
+        monkeypatch.setattr(app_module, "RESPONSE_MAX_ROWS", 2)
+        response = client.get(url, headers=as_client(client_id))
+        assert response.status_code == 400
+        assert response.get_json()["limit"] == 2
+
+def test_oversized_json_is_replaced_by_a_400(client, app_module, make_reservation, monkeypatch):
+    for day in (1, 5):
+        make_reservation(checkin=f"2030-10-{day:02d}", checkout=f"2030-10-{day + 2:02d}")
+    monkeypatch.setattr(app_module, "RESPONSE_MAX_BYTES", 300)
+    response = client.get("/api/reservations?per_page=20", headers=RECEPCION)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["limit"] == 300
+    assert body["export"] == "/api/reports/export?type=reservations"
+    assert response.headers["Content-Type"] == "application/json; charset=utf-8"
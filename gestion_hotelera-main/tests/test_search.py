@@ -0,0 +1,31 @@
+import pytest
+
+@pytest.fixture
+def fulltext_mode(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "SEARCH_MODE", "fulltext")
+    return app_module.build_search_clause
+
+def test_short_terms_fall_back_to_substring(fulltext_mode):
+    clause, params = fulltext_mode("jo", fulltext=["r.guest_name"], prefix=["r.reservation_code"])
+    assert "MATCH" not in clause
+    assert params == ["%jo%", "%jo%"]
+
+def test_indexable_terms_use_fulltext_and_code_prefix(fulltext_mode):
+    clause, params = fulltext_mode("juan", fulltext=["r.guest_name"], prefix=["r.reservation_code"])
+    assert clause == "(MATCH(r.guest_name) AGAINST (%s IN BOOLEAN MODE) OR r.reservation_code LIKE %s)"
+    assert params == ["+juan*", "juan%"]
+
+def test_contains_columns_always_match_substrings(fulltext_mode):
+    clause, params = fulltext_mode("1234", contains=["invoice_id", "reservation_id"])
+    assert params == ["%1234%", "%1234%"]
+
+def test_like_mode_searches_substrings(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "SEARCH_MODE", "like")
+    clause, params = app_module.build_search_clause("Pérez", fulltext=["full_name, email"], prefix=["phone"])
+    assert clause == "(full_name LIKE %s OR email LIKE %s OR phone LIKE %s)"
+    assert params == ["%Perez%"] * 3
+
+def test_reservation_search_matches_inside_the_name(client, make_reservation):
+    reservation = make_reservation(guest_name="Maximiliano Ortega")
+    data = client.get("/api/reservations?q=milian", headers={"X-User-Role": "recepcion"}).get_json()["data"]
+    assert reservation["reservation_id"] in [row["reservation_id"] for row in data]
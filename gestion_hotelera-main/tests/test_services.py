@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from conftest import ADMIN, RECEPCION
+
+def test_billing_uses_current_price_not_catalog_copy(client, app_module, make_reservation):
+    created = client.post("/api/services", headers=ADMIN,
+                          json={"service_code": "SPA-PRUEBA", "name": "Masaje", "price": 300})
+    assert created.status_code == 201
+    service_id = created.get_json()["service_id"]
+
+    # El listado carga el catálogo en memoria con el precio anterior
+    listing = client.get("/api/services", headers=ADMIN).get_json()
+    assert any(row["service_id"] == service_id for row in listing["data"])
+
+    # Cambio de precio hecho fuera de la API: el catálogo no se entera
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE services SET price = 450 WHERE service_id = %s", (service_id,))
+    finally:
+        conn.close()
+
+    reservation = make_reservation(checkin="2030-06-10", checkout="2030-06-12")
+    response = client.post(f"/api/reservations/{reservation['reservation_id']}/services", headers=RECEPCION,
+                           json={"service_id": service_id, "quantity": 2, "service_date": "2030-06-11"})
+    assert response.status_code == 201
+
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT unit_price FROM reservation_services WHERE reservation_service_id = %s",
+                        (response.get_json()["id"],))
+            assert cur.fetchone()["unit_price"] == Decimal("450.00")
+    finally:
+        conn.close()
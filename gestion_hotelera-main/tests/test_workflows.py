@@ -0,0 +1,188 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pymysql
+import pytest
+
+from conftest import ADMIN, RECEPCION, WEB_DIR
+
+DB_INIT_DIR = os.path.join(WEB_DIR, "..", "db_init")
+
+def count(app_module, sql, *params):
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) AS n FROM {sql}", params)
+            return cur.fetchone()["n"]
+    finally:
+        conn.close()
+
+def room_status(app_module, room_id):
+    conn = app_module.get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status FROM rooms WHERE room_id = %s", (room_id,))
+            return cur.fetchone()["status"]
+    finally:
+        conn.close()
+
+def add_service(client, reservation_id, service_date):
+    code = f"WF-{uuid.uuid4().hex[:6]}"
+    service_id = client.post("/api/services", headers=ADMIN,
+                             json={"service_code": code, "name": "Desayuno", "price": 80}).get_json()["service_id"]
+    response = client.post(f"/api/reservations/{reservation_id}/services", headers=RECEPCION,
+                           json={"service_id": service_id, "quantity": 1, "service_date": service_date})
+    assert response.status_code == 201, response.get_json()
+
+def set_status(client, reservation_id, status):
+    response = client.put(f"/api/reservations/{reservation_id}", headers=RECEPCION, json={"status": status})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def invoice(client, reservation_id):
+    return client.post("/api/invoices", headers=ADMIN,
+                       json={"reservation_id": reservation_id, "total": 1500, "method": "tarjeta"})
+
+# --- Resultados de los flujos (ruta en Python; SQLite no tiene procedimientos) ---
+
+def test_checkin_and_checkout_update_reservation_and_room(client, app_module, make_room, make_reservation):
+    room_id = make_room()
+    reservation_id = make_reservation(checkin="2030-09-01", checkout="2030-09-03", room_id=room_id)["reservation_id"]
+
+    body = set_status(client, reservation_id, "checkin")
+    assert body["reservation"] == {"reservation_id": reservation_id, "status": "checkin"}
+    assert body["room"]["room_id"] == room_id and body["room"]["status"] == "ocupada"
+    assert room_status(app_module, room_id) == "ocupada"
+
+    body = set_status(client, reservation_id, "checkout")
+    assert body["reservation"]["status"] == "checkout" and body["room"]["status"] == "disponible"
+    assert room_status(app_module, room_id) == "disponible"
+
+    assert client.put("/api/reservations/999999", headers=RECEPCION, json={"status": "checkin"}).status_code == 404
+
+def test_invoice_only_after_checkout_and_only_once(client, app_module, make_reservation):
+    reservation_id = make_reservation(checkin="2030-09-05", checkout="2030-09-07")["reservation_id"]
+    assert invoice(client, reservation_id).status_code == 400
+    assert count(app_module, "invoices WHERE reservation_id = %s", reservation_id) == 0
+
+    set_status(client, reservation_id, "checkin")
+    set_status(client, reservation_id, "checkout")
+    response = invoice(client, reservation_id)
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()["invoice_id"]
+    assert count(app_module, "invoices WHERE reservation_id = %s", reservation_id) == 1
+    assert count(app_module, "reservations WHERE reservation_id = %s AND status = 'facturada'", reservation_id) == 1
+
+    assert invoice(client, reservation_id).status_code == 400
+    assert count(app_module, "invoices WHERE reservation_id = %s", reservation_id) == 1
+    assert invoice(client, 999999).status_code == 404
+
+def test_delete_reservation_removes_services_and_invoices(client, app_module, make_reservation):
+    reservation_id = make_reservation(checkin="2030-09-10", checkout="2030-09-12")["reservation_id"]
+    add_service(client, reservation_id, "2030-09-11")
+    set_status(client, reservation_id, "checkin")
+    set_status(client, reservation_id, "checkout")
+    assert invoice(client, reservation_id).status_code == 201
+
+    assert client.delete(f"/api/reservations/{reservation_id}", headers=ADMIN).status_code == 200
+    for table in ("reservations", "reservation_services", "invoices"):
+        assert count(app_module, f"{table} WHERE reservation_id = %s", reservation_id) == 0
+    assert client.delete(f"/api/reservations/{reservation_id}", headers=ADMIN).status_code == 404
+
+def test_delete_client_cascades_to_reservations(client, app_module, make_client_record, make_reservation):
+    client_id = make_client_record("Cliente Cascada")
+    kept = make_reservation(checkin="2030-09-15", checkout="2030-09-17")["reservation_id"]
+    ids = [make_reservation(checkin=f"2030-09-{day}", checkout=f"2030-09-{day + 2}", client_id=client_id)["reservation_id"]
+           for day in (15, 20)]
+    add_service(client, ids[0], "2030-09-16")
+
+    response = client.delete(f"/api/clients/{client_id}", headers=ADMIN)
+    assert response.status_code == 200, response.get_json()
+    assert sorted(response.get_json()["deleted_reservations"]) == sorted(ids)
+    assert count(app_module, "clients WHERE client_id = %s", client_id) == 0
+    assert count(app_module, "reservations WHERE client_id = %s", client_id) == 0
+    assert count(app_module, f"reservation_services WHERE reservation_id IN ({ids[0]}, {ids[1]})") == 0
+    assert count(app_module, "reservations WHERE reservation_id = %s", kept) == 1
+    assert client.delete(f"/api/clients/{client_id}", headers=ADMIN).status_code == 404
+
+# --- CALL a los procedimientos ---
+
+class ProcedureCursor:
+    """Cursor que responde a CALL con los resultados que devolvería el procedimiento."""
+    def __init__(self, *result_sets, error=None):
+        self.result_sets = list(result_sets)
+        self.error = error
+        self.executed = []
+
+    def execute(self, query, args=None):
+        self.executed.append((query, args))
+        if self.error:
+            raise self.error
+
+    def fetchone(self):
+        return self.result_sets[0][0] if self.result_sets[0] else None
+
+    def fetchall(self):
+        return self.result_sets[0]
+
+    def nextset(self):
+        self.result_sets.pop(0)
+        return bool(self.result_sets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class ProcedureConn:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+def test_workflows_use_the_procedure_results(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "_workflow_procedures", True)
+    row = {"reservation_id": 7, "status": "checkin", "room_id": 3, "room_num": 301, "room_status": "ocupada"}
+    cur = ProcedureCursor([row])
+    assert app_module.set_reservation_status(ProcedureConn(cur), 7, "checkin") == row
+    assert cur.executed == [("CALL sp_set_reservation_status(%s, %s)", (7, "checkin"))]
+
+    invoice_row = dict(row, invoice_id=12, previous_status="checkout", status="facturada")
+    assert app_module.create_invoice(ProcedureConn(ProcedureCursor([invoice_row])), 7, 100, "tarjeta") == invoice_row
+    assert app_module.delete_reservation_cascade(ProcedureConn(ProcedureCursor([{"deleted": 1}])), 7) is True
+    assert app_module.delete_reservation_cascade(ProcedureConn(ProcedureCursor([{"deleted": 0}])), 7) is False
+
+    # sp_delete_client devuelve dos resultados: las reservas borradas y client_deleted
+    cur = ProcedureCursor([{"reservation_id": 7}, {"reservation_id": 8}], [{"client_deleted": 1}])
+    assert app_module.delete_client_cascade(ProcedureConn(cur), 4) == ([7, 8], True)
+    assert cur.executed == [("CALL sp_delete_client(%s)", (4,))]
+
+def test_missing_procedure_falls_back_once(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "_workflow_procedures", True)
+    cur = ProcedureCursor(error=pymysql.err.OperationalError(app_module.ER_SP_DOES_NOT_EXIST, "does not exist"))
+    assert app_module.call_workflow(cur, "sp_delete_reservation", 1) is False
+    assert app_module._workflow_procedures is False
+    assert app_module.call_workflow(cur, "sp_delete_reservation", 1) is False
+    assert len(cur.executed) == 1
+
+    monkeypatch.setattr(app_module, "_workflow_procedures", True)
+    cur = ProcedureCursor(error=pymysql.err.OperationalError(1213, "Deadlock found"))
+    with pytest.raises(pymysql.err.OperationalError):   # los demás errores se propagan
+        app_module.call_workflow(cur, "sp_delete_reservation", 1)
+    assert app_module._workflow_procedures is True
+
+# --- Una sola fuente para los procedimientos ---
+
+def test_migration_is_generated_from_the_schema():
+    result = subprocess.run([sys.executable, os.path.join(DB_INIT_DIR, "build_workflow_procedures.py"), "--check"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout
+
+    with open(os.path.join(DB_INIT_DIR, "add_workflow_procedures.sql"), encoding="utf-8") as f:
+        migration = f.read()
+    for procedure in ("sp_set_reservation_status", "sp_create_invoice", "sp_delete_reservation", "sp_delete_client"):
+        assert migration.count(f"CREATE PROCEDURE {procedure}(") == 1
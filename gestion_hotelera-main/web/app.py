@@ -1,9 +1,15 @@
 # app.py - CÓDIGO CORREGIDO Y COMPLETO
-from flask import Flask, request, render_template, jsonify, redirect, abort, make_response
-import os, hashlib, re, csv, io, uuid, unicodedata
+from flask import Flask, request, render_template, jsonify, redirect, abort, make_response, Response, has_request_context, send_file, g
+import os, hashlib, re, csv, io, uuid, unicodedata, time, threading, collections, bisect, json, base64, contextlib
+import sqlite3, tempfile, logging, random, sys, cProfile, pstats
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSDictCursor
+from pymysql.constants import SERVER_STATUS
+from sqlite_backend import SQLiteDatabase
 from datetime import date, datetime, timedelta
+from decimal import Decimal
 
 # --- CONFIGURACIÓN ---
 app = Flask(__name__, template_folder="templates", static_folder="static")
@@ -16,17 +22,93 @@ DB_USER = os.environ.get("DB_USER", "root")
 DB_PASS = os.environ.get("DB_PASS", "") 
 DB_NAME = os.environ.get("DB_NAME", "gestion_hotelera")
 
+# DB_BACKEND=sqlite: base SQLite embebida (ver sqlite_backend.py) en lugar del servidor MySQL,
+# para pruebas y benchmarks sin servidor. SQLITE_PATH es ':memory:' o un archivo; si la base
+# está vacía se cargan los scripts de SQLITE_SCRIPTS (separados por comas) traducidos de MySQL.
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", ":memory:")
+SQLITE_SCRIPTS = os.environ.get("SQLITE_SCRIPTS", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "db_init", "Hotel_BD.sql")).split(",")
+
 # Tipos de roles soportados
 ROLES = ['admin', 'cliente', 'spa', 'recepcion']
 
+# Tablas que modifica cada endpoint de escritura (POST/PUT/DELETE). Al terminar la petición
+# se marcan como modificadas para invalidar las cachés que dependen de ellas.
+WRITE_TABLES = {
+    'api_register': ('users', 'clients'),
+    'api_login': ('clients',),  # auto-creación del perfil de cliente
+    'api_create_client': ('clients',),
+    'api_update_client': ('clients',),
+    'api_delete_client': ('clients', 'reservations', 'reservation_services', 'invoices'),
+    'api_create_room': ('rooms',),
+    'api_update_room': ('rooms',),
+    'api_delete_room': ('rooms',),
+    'api_create_staff': ('staff',),
+    'api_update_staff': ('staff',),
+    'api_delete_staff': ('staff',),
+    'api_create_service': ('services',),
+    'api_update_service': ('services',),
+    'api_delete_service': ('services',),
+    'api_create_reservation': ('reservations',),
+    'api_update_reservation': ('reservations', 'rooms'),
+    'api_delete_reservation': ('reservations', 'reservation_services', 'invoices'),
+    'api_add_reservation_service': ('reservation_services', 'reservations'),
+    'api_update_reservation_service': ('reservation_services', 'reservations'),
+    'api_delete_reservation_service': ('reservation_services', 'reservations'),
+    'api_cancel_reservation': ('reservations',),
+    'manage_invoices': ('invoices', 'reservations'),
+}
+
 # FORZAR UTF-8 EN TODAS LAS RESPUESTAS JSON
 @app.after_request
 def after_request(response):
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and request.endpoint in WRITE_TABLES:
+        # Un 4xx no cambió nada; un 5xx pudo dejar cambios a medias: se invalida solo aquí, sin publicar
+        if 200 <= response.status_code < 300:
+            mark_tables_changed(*WRITE_TABLES[request.endpoint])
+        elif response.status_code >= 500:
+            mark_tables_changed(*WRITE_TABLES[request.endpoint], publish=False)
     if response.content_type and 'application/json' in response.content_type:
+        if not response.is_streamed and (response.content_length or 0) > RESPONSE_MAX_BYTES:
+            response = make_response(ResponseTooLarge(
+                f"La respuesta supera el máximo de {RESPONSE_MAX_BYTES} bytes; reduzca per_page o filtre con q=.",
+                RESPONSE_MAX_BYTES).response())
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    log_request(response)
+    finish_profile(response)
     return response
 
-def get_conn():
+# --- POOL DE CONEXIONES ---
+# Cada worker mantiene un pool acotado de conexiones físicas a MySQL. get_conn()
+# entrega una conexión del pool y conn.close() la devuelve en lugar de cerrarla,
+# así que las rutas existentes no necesitan cambios.
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))              # segundos esperando una conexión libre
+DB_POOL_RECYCLE_USES = int(os.environ.get("DB_POOL_RECYCLE_USES", 1000))     # reciclar tras N usos
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get("DB_POOL_RECYCLE_SECONDS", 3600))  # reciclar tras N segundos de vida
+DB_POOL_PING_IDLE = float(os.environ.get("DB_POOL_PING_IDLE", 30))          # ping solo si estuvo inactiva más de N segundos
+
+# Límite de tiempo de los SELECT (max_execution_time de MySQL, en ms; 0 = sin límite) según la
+# ruta que pide la conexión: los reportes tienen más margen, el resto de rutas muy poco.
+# El export en streaming no tiene límite: max_execution_time cuenta mientras se envían las filas
+# y, cuando salta, el 200 y los encabezados del CSV ya salieron, así que el cliente recibiría un
+# archivo cortado sin ningún error. Lo acotan el control de admisión (heavy_report) y el cliente:
+# si corta la descarga, la conexión se descarta.
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 10000))
+ROUTE_STATEMENT_TIMEOUTS_MS = {
+    'api_export_report': int(os.environ.get("EXPORT_STATEMENT_TIMEOUT_MS", 0)),
+    'api_report_occupancy': int(os.environ.get("REPORT_STATEMENT_TIMEOUT_MS", 30000)),
+    'api_report_occupancy_csv': int(os.environ.get("REPORT_STATEMENT_TIMEOUT_MS", 30000)),
+}
+ER_UNKNOWN_SYSTEM_VARIABLE = 1193
+
+sqlite_db = SQLiteDatabase(SQLITE_PATH, SQLITE_SCRIPTS) if DB_BACKEND == 'sqlite' else None
+
+def _connect_raw():
+    if sqlite_db is not None:
+        return sqlite_db.connect()
     conn = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASS,
                            database=DB_NAME, port=DB_PORT, cursorclass=DictCursor,
                            autocommit=True,
@@ -34,11 +116,815 @@ def get_conn():
                            use_unicode=True)      # Y este
 
     #  PASO CRÍTICO: Forzar el juego de caracteres después de la conexión
+    #  (una sola vez por conexión física, no por petición)
     with conn.cursor() as cur:
         cur.execute("SET NAMES 'utf8mb4'")
         
     return conn
 
+class PoolTimeout(Exception):
+    pass
+
+class _PoolEntry:
+    __slots__ = ("raw", "pid", "created_at", "last_used", "uses", "statement_timeout")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.pid = os.getpid()          # proceso que abrió la conexión
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.statement_timeout = None   # max_execution_time fijado en la sesión (ms)
+
+class PooledConnection:
+    """
+    Envoltorio de una conexión del pool. Delega todo en la conexión pymysql,
+    excepto close(), que la devuelve al pool.
+    """
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise pymysql.err.InterfaceError("La conexión ya fue devuelta al pool.")
+        return getattr(entry.raw, name)
+
+    def close(self):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._entry.raw.cursor(*args, **kwargs))
+
+    def set_statement_timeout(self, timeout_ms):
+        # Solo se envía SET cuando cambia respecto al valor que ya tiene la sesión
+        entry = self._entry
+        if entry.statement_timeout == timeout_ms:
+            return
+        with entry.raw.cursor() as cur:
+            cur.execute("SET SESSION max_execution_time = %s", (timeout_ms,))
+        entry.statement_timeout = timeout_ms
+
+    def discard(self):
+        # Cierra la conexión física; al devolverla, el pool la descarta en vez de reutilizarla
+        entry = self.__dict__.get('_entry')
+        if entry is not None:
+            try:
+                entry.raw.close()
+            except Exception:
+                pass
+
+class ConnectionPool:
+    """
+    Pool de conexiones acotado y seguro entre hilos.
+    - min_size conexiones se abren en el primer uso; nunca más de max_size.
+    - Al entregar una conexión se recicla si superó recycle_uses / recycle_seconds
+      y se verifica con ping si estuvo inactiva más de ping_idle segundos.
+    - Al devolverla se hace rollback de cualquier transacción abierta.
+    - Tras un fork, el hijo cierra sin enviar nada las conexiones heredadas del padre.
+    """
+    def __init__(self, connect, min_size=1, max_size=10, timeout=10.0,
+                 recycle_uses=1000, recycle_seconds=3600, ping_idle=30.0):
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.recycle_uses = recycle_uses
+        self.recycle_seconds = recycle_seconds
+        self.ping_idle = ping_idle
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        # Tras un fork (gunicorn) las conexiones del padre no se comparten.
+        self._pid = os.getpid()
+        self._idle = collections.deque()
+        self._size = 0
+        self._in_use = 0
+        self._warmed = False
+        self._stats = {
+            "checkouts": 0, "waits": 0, "wait_time_total": 0.0, "wait_time_max": 0.0,
+            "timeouts": 0, "created": 0, "recycled": 0, "discarded": 0, "inherited_closed": 0,
+        }
+
+    def _new_entry(self):
+        entry = _PoolEntry(self._connect())
+        with self._cond:
+            self._stats["created"] += 1
+        return entry
+
+    def _close_raw(self, entry):
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def _close_inherited(self, entry):
+        # El socket de una conexión heredada del padre es el mismo que sigue usando el padre:
+        # close() enviaría COM_QUIT y cerraría su sesión. Solo se cierra el descriptor local.
+        try:
+            getattr(entry.raw, '_force_close', entry.raw.close)()
+        except Exception:
+            pass
+
+    def _after_fork(self):
+        # Con el lock tomado: el hijo empieza con un pool vacío y cierra las libres heredadas
+        inherited = self._idle
+        self._reset_state()
+        for entry in inherited:
+            self._close_inherited(entry)
+        self._stats["inherited_closed"] += len(inherited)
+
+    def _warm_up(self):
+        # Se ejecuta con el lock tomado; abre las conexiones mínimas fuera de él.
+        self._warmed = True
+        missing = self.min_size - self._size
+        if missing <= 0:
+            return
+        self._size += missing
+        self._cond.release()
+        opened = []
+        try:
+            for _ in range(missing):
+                try:
+                    opened.append(self._new_entry())
+                except Exception:
+                    break
+        finally:
+            self._cond.acquire()
+        self._size -= missing - len(opened)
+        self._idle.extend(opened)
+
+    def _validate(self, entry):
+        now = time.monotonic()
+        if entry.uses >= self.recycle_uses or now - entry.created_at >= self.recycle_seconds:
+            self._close_raw(entry)
+            with self._cond:
+                self._stats["recycled"] += 1
+            return self._new_entry()
+        if not entry.raw.open or now - entry.last_used >= self.ping_idle:
+            try:
+                entry.raw.ping(reconnect=False)
+            except Exception:
+                self._close_raw(entry)
+                with self._cond:
+                    self._stats["discarded"] += 1
+                return self._new_entry()
+        return entry
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            if self._pid != os.getpid():
+                self._after_fork()
+            if not self._warmed:
+                self._warm_up()
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO: reutiliza la conexión más "caliente"
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No hay conexiones libres en el pool (máximo {self.max_size}).")
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            entry = self._new_entry() if entry is None else self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        wait_time = time.monotonic() - start
+        entry.uses += 1
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait_time
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+        return PooledConnection(self, entry)
+
+    def release(self, entry):
+        if entry.pid != os.getpid():
+            # Se sacó del pool antes del fork y se devuelve en el hijo: el pool del hijo nunca
+            # la contó (no se toca _in_use) y un ROLLBACK actuaría sobre la sesión del padre.
+            # Se cierra la copia del descriptor para que el hijo no lo filtre.
+            self._close_inherited(entry)
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._after_fork()
+                self._stats["inherited_closed"] += 1
+            return
+        raw = entry.raw
+        healthy = raw.open
+        if healthy and raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                raw.rollback()
+            except Exception:
+                healthy = False
+        if not healthy:
+            self._close_raw(entry)
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+                self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        checkouts = data["checkouts"]
+        data["wait_time_avg"] = data["wait_time_total"] / checkouts if checkouts else 0.0
+        return data
+
+db_pool = ConnectionPool(_connect_raw, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX,
+                         timeout=DB_POOL_TIMEOUT, recycle_uses=DB_POOL_RECYCLE_USES,
+                         recycle_seconds=DB_POOL_RECYCLE_SECONDS, ping_idle=DB_POOL_PING_IDLE)
+
+_statement_timeouts_supported = True
+
+def statement_timeout_ms():
+    endpoint = request.endpoint if has_request_context() else None
+    return ROUTE_STATEMENT_TIMEOUTS_MS.get(endpoint, DB_STATEMENT_TIMEOUT_MS)
+
+def get_conn(statement_timeout=None):
+    """Conexión del pool con el límite de tiempo de la ruta actual (o statement_timeout, en ms)."""
+    global _statement_timeouts_supported
+    conn = db_pool.acquire()
+    if _statement_timeouts_supported:
+        try:
+            conn.set_statement_timeout(statement_timeout_ms() if statement_timeout is None else statement_timeout)
+        except pymysql.err.MySQLError as e:
+            if not (e.args and e.args[0] == ER_UNKNOWN_SYSTEM_VARIABLE):
+                conn.close()
+                raise
+            print("⚠️ El servidor no admite max_execution_time; consultas sin límite de tiempo.")
+            _statement_timeouts_supported = False
+    return conn
+
+@contextlib.contextmanager
+def transaction(conn):
+    """
+    Unidad de trabajo para rutas con varias escrituras: todas las sentencias del bloque
+    se confirman con un único COMMIT (un solo flush del redo log) o se deshacen juntas
+    si algo falla. Un 'return' dentro del bloque confirma lo hecho hasta ese punto.
+    Las escrituras de una sola sentencia siguen en autocommit (BEGIN/COMMIT serían
+    dos viajes extra sin ningún ahorro).
+    """
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+# --- INSTRUMENTACIÓN SQL POR PETICIÓN ---
+# Los cursores que entrega el pool miden cada sentencia (texto normalizado, duración y filas).
+# Al final de cada petición se escribe UNA línea JSON en el log 'gestion_hotelera' con la
+# ruta, el estado y el tiempo total en BD; las sentencias más lentas que SLOW_QUERY_MS se
+# registran aparte con sus parámetros ocultos (solo tipo y longitud).
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 500))
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+logger = logging.getLogger("gestion_hotelera")
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+logger.setLevel(LOG_LEVEL)
+
+_SQL_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_SQL_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def normalize_sql(sql):
+    """Forma canónica de una sentencia: literales y parámetros como '?', listas IN como '(...)'."""
+    text = " ".join(sql.split())
+    text = _SQL_STRING_RE.sub("?", text).replace("%s", "?")
+    text = _SQL_NUMBER_RE.sub("?", text)
+    return _SQL_LIST_RE.sub("(...)", text)
+
+def redact_params(params):
+    """Parámetros sin sus valores: solo tipo (y longitud para textos)."""
+    if params is None:
+        return None
+    values = params.values() if isinstance(params, dict) else params if isinstance(params, (list, tuple)) else (params,)
+    return [f"<{type(v).__name__}:{len(v)}>" if isinstance(v, (str, bytes)) else f"<{type(v).__name__}>"
+            for v in values]
+
+def record_query(sql, params, elapsed, rows):
+    ms = elapsed * 1000
+    normalized = None
+    if has_request_context():
+        stats = g.get('sql_stats')
+        if stats is not None:
+            normalized = normalize_sql(sql)
+            stats['queries'] += 1
+            stats['db_ms'] += ms
+            stats['rows'] += rows or 0
+            stats['statements'].append((normalized, round(ms, 2), rows))
+    if ms >= SLOW_QUERY_MS:
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "route": request.endpoint if has_request_context() else threading.current_thread().name,
+            "ms": round(ms, 2),
+            "rows": rows,
+            "sql": normalized or normalize_sql(sql),
+            "params": redact_params(params),
+        }, default=str))
+
+class InstrumentedCursor:
+    """Cursor pymysql que registra cada execute(); el resto se delega sin cambios."""
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, sql, params):
+        started = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            # En un cursor del servidor (SSDictCursor) las filas aún no se conocen
+            rows = None if isinstance(self._cursor, pymysql.cursors.SSCursor) else self._cursor.rowcount
+            record_query(sql, params, time.perf_counter() - started, rows if rows is None or rows >= 0 else None)
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+@app.before_request
+def start_request_stats():
+    g.request_started = time.perf_counter()
+    g.sql_stats = {"queries": 0, "db_ms": 0.0, "rows": 0, "statements": []}
+    metrics.request_started()
+
+def log_request(response):
+    stats = g.get('sql_stats')
+    if stats is None:
+        return
+    entry = {
+        "event": "request",
+        "method": request.method,
+        "route": request.endpoint,
+        "path": request.path,
+        "status": response.status_code,
+        "ms": round((time.perf_counter() - g.request_started) * 1000, 2),
+        "db_ms": round(stats['db_ms'], 2),
+        "queries": stats['queries'],
+        "rows": stats['rows'],
+    }
+    if logger.isEnabledFor(logging.DEBUG):
+        entry["statements"] = stats['statements']
+    logger.info(json.dumps(entry, default=str))
+    metrics.request_finished(entry)
+
+# --- MÉTRICAS (/metrics, formato de texto de Prometheus) ---
+# Cada worker acumula sus contadores e histogramas en memoria y los vuelca (como mucho una vez
+# por METRICS_FLUSH_SECONDS) a un archivo propio en METRICS_DIR; /metrics suma los archivos de
+# todos los workers. Los archivos de workers terminados los absorbe el worker que atiende el
+# siguiente /metrics (contadores e histogramas no retroceden y el directorio no crece); los gauges
+# (en curso, pool) solo cuentan procesos vivos. /metrics solo responde a un admin o a las
+# direcciones de METRICS_ALLOW (separadas por comas; solo localhost por defecto).
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(tempfile.gettempdir(), "gestion_hotelera_metrics"))
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1))
+METRICS_ALLOW = {addr.strip() for addr in os.environ.get("METRICS_ALLOW", "127.0.0.1,::1").split(",") if addr.strip()}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    "hotel_http_requests_total": ("counter", "Peticiones HTTP atendidas por ruta, método y estado."),
+    "hotel_http_request_duration_seconds": ("histogram", "Duración de las peticiones HTTP por ruta."),
+    "hotel_http_request_db_seconds": ("histogram", "Tiempo en la base de datos por petición y ruta."),
+    "hotel_db_queries_total": ("counter", "Sentencias SQL ejecutadas por ruta."),
+    "hotel_http_requests_in_flight": ("gauge", "Peticiones en curso."),
+    "hotel_db_pool_connections": ("gauge", "Conexiones del pool por estado."),
+    "hotel_db_pool_checkouts_total": ("counter", "Conexiones entregadas por el pool."),
+    "hotel_db_pool_waits_total": ("counter", "Entregas que tuvieron que esperar una conexión libre."),
+    "hotel_db_pool_timeouts_total": ("counter", "Esperas de conexión que agotaron DB_POOL_TIMEOUT."),
+    "hotel_cache_hits_total": ("counter", "Aciertos de caché por caché."),
+    "hotel_cache_misses_total": ("counter", "Fallos de caché por caché."),
+    "hotel_cache_hit_ratio": ("gauge", "Proporción de aciertos por caché (todos los workers)."),
+    "hotel_single_flight_saved_total": ("counter", "Ejecuciones evitadas por la coalescencia de peticiones."),
+    "hotel_heavy_reports_rejected_total": ("counter", "Reportes rechazados con 503 por el control de admisión."),
+}
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _metric_labels(labels):
+    if not labels:
+        return ""
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+class Metrics:
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._started = time.time()
+        # El pid se recicla: el nombre lleva además un sufijo propio de este proceso
+        self._path = os.path.join(self.directory, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        self._counters = collections.Counter()   # (nombre, etiquetas) -> valor
+        self._histograms = {}                     # (nombre, etiquetas) -> [cubetas..., suma, cuenta]
+        self._in_flight = 0
+        self._next_flush = 0
+
+    def _check_pid(self):
+        if self._pid != os.getpid():   # tras el fork, cada worker empieza de cero
+            self._reset_state()
+
+    def request_started(self):
+        with self._lock:
+            self._check_pid()
+            self._in_flight += 1
+        g.metrics_in_flight = True
+
+    def request_ended(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _observe(self, name, labels, value):
+        hist = self._histograms.get((name, labels))
+        if hist is None:
+            hist = self._histograms[(name, labels)] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                hist[i] += 1
+        hist[-2] += value
+        hist[-1] += 1
+
+    def request_finished(self, entry):
+        route = (("route", entry['route'] or "unmatched"),)
+        with self._lock:
+            self._check_pid()
+            self._counters[("hotel_http_requests_total",
+                            route + (("method", entry['method']), ("status", str(entry['status']))))] += 1
+            self._counters[("hotel_db_queries_total", route)] += entry['queries']
+            self._observe("hotel_http_request_duration_seconds", route, entry['ms'] / 1000)
+            self._observe("hotel_http_request_db_seconds", route, entry['db_ms'] / 1000)
+        self.flush()
+
+    def _snapshot(self):
+        """Estado de este worker, incluidos los contadores que llevan otros componentes."""
+        pool = db_pool.stats()
+        counters = [[name, labels, value] for (name, labels), value in self._counters.items()]
+        counters += [
+            ["hotel_db_pool_checkouts_total", (), pool["checkouts"]],
+            ["hotel_db_pool_waits_total", (), pool["waits"]],
+            ["hotel_db_pool_timeouts_total", (), pool["timeouts"]],
+            ["hotel_single_flight_saved_total", (), single_flight.stats()["saved"]],
+            ["hotel_heavy_reports_rejected_total", (), heavy_reports.stats()["rejected"]],
+        ]
+        for cache, stats in (("count", count_cache.stats()), ("rooms_catalog", rooms_catalog.stats()),
+                             ("services_catalog", services_catalog.stats())):
+            counters.append(["hotel_cache_hits_total", (("cache", cache),), stats["hits"]])
+            counters.append(["hotel_cache_misses_total", (("cache", cache),), stats["misses"]])
+        gauges = [
+            ["hotel_http_requests_in_flight", (), self._in_flight],
+            ["hotel_db_pool_connections", (("state", "in_use"),), pool["in_use"]],
+            ["hotel_db_pool_connections", (("state", "idle"),), pool["idle"]],
+        ]
+        histograms = [[name, labels, values] for (name, labels), values in self._histograms.items()]
+        return {"pid": self._pid, "started": self._started, "counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def flush(self, force=False):
+        with self._lock:
+            self._check_pid()
+            if not force and time.monotonic() < self._next_flush:
+                return
+            self._next_flush = time.monotonic() + self.flush_seconds
+            snapshot = self._snapshot()
+            path = self._path
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error al volcar métricas: {e}")
+
+    def _load(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _retire_dead(self):
+        """Suma a este worker los contadores de los workers que ya no existen y borra sus archivos."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith('.json')]
+        except OSError:
+            return
+        snapshots = {}
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path != self._path:
+                snapshot = self._load(path)
+                if snapshot is not None:
+                    snapshots[path] = snapshot
+        newest = {}
+        for snapshot in snapshots.values():
+            newest[snapshot["pid"]] = max(newest.get(snapshot["pid"], 0), snapshot.get("started", 0))
+        for path, snapshot in snapshots.items():
+            pid = snapshot["pid"]
+            # Vivo = el pid existe y este es su archivo más reciente (si no, el pid se reutilizó)
+            if pid != self._pid and pid_alive(pid) and snapshot.get("started", 0) >= newest[pid]:
+                continue
+            # El rename es atómico: si otro worker ya lo reclamó, no se suma dos veces
+            claimed = f"{path}.{self._pid}.claimed"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with self._lock:
+                for metric, labels, value in snapshot["counters"]:
+                    self._counters[(metric, tuple(map(tuple, labels)))] += value
+                for metric, labels, values in snapshot["histograms"]:
+                    key = (metric, tuple(map(tuple, labels)))
+                    total = self._histograms.setdefault(key, [0] * len(values))
+                    for i, value in enumerate(values):
+                        total[i] += value
+            try:
+                os.remove(claimed)
+            except OSError as e:
+                print(f"Error al borrar métricas de un worker terminado: {e}")
+
+    def collect(self):
+        """Suma los archivos de todos los workers y devuelve el texto para Prometheus."""
+        with self._lock:
+            self._check_pid()
+        self._retire_dead()
+        self.flush(force=True)
+        counters, gauges = collections.Counter(), collections.Counter()
+        histograms = {}
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith('.json')]
+        except OSError:
+            names = []
+        for name in names:
+            snapshot = self._load(os.path.join(self.directory, name))
+            if snapshot is None:
+                continue
+            for metric, labels, value in snapshot["counters"]:
+                counters[(metric, tuple(map(tuple, labels)))] += value
+            if pid_alive(snapshot["pid"]):
+                for metric, labels, value in snapshot["gauges"]:
+                    gauges[(metric, tuple(map(tuple, labels)))] += value
+            for metric, labels, values in snapshot["histograms"]:
+                key = (metric, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+
+        # Proporción de aciertos: de los contadores ya sumados y de la caché de respuestas (compartida)
+        for (metric, labels), hits in list(counters.items()):
+            if metric == "hotel_cache_hits_total":
+                lookups = hits + counters.get(("hotel_cache_misses_total", labels), 0)
+                if lookups:
+                    gauges[("hotel_cache_hit_ratio", labels)] = hits / lookups
+        responses = response_cache.stats()
+        if responses.get("hit_ratio") is not None:
+            gauges[("hotel_cache_hit_ratio", (("cache", "responses"),))] = responses["hit_ratio"]
+
+        series = collections.defaultdict(list)
+        for (metric, labels), value in sorted(counters.items()):
+            series[metric].append(f"{metric}{_metric_labels(labels)} {value}")
+        for (metric, labels), value in sorted(gauges.items()):
+            series[metric].append(f"{metric}{_metric_labels(labels)} {value}")
+        for (metric, labels), values in sorted(histograms.items()):
+            for bound, count in zip(LATENCY_BUCKETS, values):
+                series[metric].append(f"{metric}_bucket{_metric_labels(labels + (('le', str(bound)),))} {count}")
+            series[metric].append(f"{metric}_bucket{_metric_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+            series[metric].append(f"{metric}_sum{_metric_labels(labels)} {values[-2]}")
+            series[metric].append(f"{metric}_count{_metric_labels(labels)} {values[-1]}")
+
+        lines = []
+        for metric in sorted(series):
+            kind, help_text = METRIC_HELP.get(metric, ("untyped", ""))
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(series[metric])
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics(METRICS_DIR, METRICS_FLUSH_SECONDS)
+
+@app.teardown_request
+def end_request_metrics(exc):
+    if g.pop('metrics_in_flight', False):
+        metrics.request_ended()
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    if request.remote_addr not in METRICS_ALLOW and request.headers.get('X-User-Role') != 'admin':
+        return jsonify({"error": "Acceso no autorizado"}), 403
+    return Response(metrics.collect(), mimetype="text/plain; version=0.0.4")
+
+# --- PERFILADOR BAJO DEMANDA ---
+# Una petición se perfila si un admin envía 'X-Profile: 1' o si cae en el muestreo
+# (PROFILE_SAMPLE_RATE, p. ej. 0.01). Se guarda el top-N de funciones por tiempo acumulado
+# (cProfile), las pilas colapsadas de un muestreador de pilas (para flamegraph.pl/speedscope)
+# y las sentencias SQL de la petición. Solo un perfil a la vez por worker: si ya hay uno en
+# curso la petición se atiende sin perfilar, así que el costo queda acotado.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILES_DIR = os.environ.get("PROFILES_DIR", os.path.join(tempfile.gettempdir(), "gestion_hotelera_profiles"))
+PROFILES_KEEP = int(os.environ.get("PROFILES_KEEP", 50))
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", 30))
+PROFILE_SAMPLE_INTERVAL = 0.005   # segundos entre muestras de la pila
+PROFILE_ID_RE = re.compile(r'[0-9a-f]{16}')
+
+class StackSampler(threading.Thread):
+    """Cuenta las pilas de un hilo cada 'interval' segundos, en formato colapsado."""
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class Profiler:
+    def __init__(self, directory, keep, top_n):
+        self.directory = directory
+        self.keep = keep
+        self.top_n = top_n
+        self._busy = threading.Lock()
+        self.captured = 0
+
+    def wants(self):
+        forced = request.headers.get('X-Profile') == '1' and request.headers.get('X-User-Role') == 'admin'
+        return forced or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+    def start(self):
+        if not self._busy.acquire(blocking=False):
+            return
+        try:
+            profile = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+            sampler.start()
+            profile.enable()
+        except Exception as e:   # p. ej. otro perfilador activo en el proceso
+            self._busy.release()
+            print(f"No se pudo iniciar el perfilador: {e}")
+            return
+        g.profile = (profile, sampler, time.perf_counter())
+
+    def finish(self, response):
+        profile, sampler, started = g.pop('profile')
+        try:
+            profile.disable()
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._save(profile, sampler, response, elapsed_ms)
+        finally:
+            self._busy.release()
+
+    def _top_functions(self, profile):
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]
+        return [{"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls,
+                 "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+                for (filename, line, name), (_, calls, tottime, cumtime, _) in rows]
+
+    def _save(self, profile, sampler, response, elapsed_ms):
+        profile_id = uuid.uuid4().hex[:16]
+        sql = g.get('sql_stats') or {}
+        capture = {
+            "profile_id": profile_id,
+            "created_at": time.time(),
+            "pid": os.getpid(),
+            "method": request.method,
+            "route": request.endpoint,
+            "path": request.full_path.rstrip('?'),
+            "status": response.status_code,
+            "ms": round(elapsed_ms, 2),
+            "db_ms": round(sql.get('db_ms', 0.0), 2),
+            "queries": sql.get('queries', 0),
+            "samples": sum(sampler.stacks.values()),
+            "top_functions": self._top_functions(profile),
+            "sql": sql.get('statements', []),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path(profile_id, 'collapsed'), 'w', encoding='utf-8') as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+            with open(self.path(profile_id, 'json'), 'w', encoding='utf-8') as f:
+                json.dump(capture, f, default=str)
+            self.captured += 1
+            self._prune()
+        except OSError as e:
+            print(f"Error al guardar el perfil: {e}")
+
+    def path(self, profile_id, ext):
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def _prune(self):
+        captures = self.list()
+        for capture in captures[self.keep:]:
+            for ext in ('json', 'collapsed'):
+                try:
+                    os.remove(self.path(capture['profile_id'], ext))
+                except OSError:
+                    pass
+
+    def load(self, profile_id):
+        if not PROFILE_ID_RE.fullmatch(profile_id or ''):
+            return None
+        try:
+            with open(self.path(profile_id, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        """Capturas guardadas, la más reciente primero."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        captures = [self.load(name[:-5]) for name in names if name.endswith('.json')]
+        return sorted((c for c in captures if c), key=lambda c: c['created_at'], reverse=True)
+
+profiler = Profiler(PROFILES_DIR, PROFILES_KEEP, PROFILE_TOP_N)
+
+@app.before_request
+def start_profile():
+    if profiler.wants():
+        profiler.start()
+
+def finish_profile(response):
+    if g.get('profile') is not None:
+        profiler.finish(response)
+
 def remove_accents(input_str):
     if not isinstance(input_str, str):
         return input_str
@@ -63,7 +949,7 @@ def api_register():
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
+        with transaction(conn) as cur:
             # 1. Verificar si el usuario ya existe
             cur.execute("SELECT user_id FROM users WHERE email = %s", (email,))
             if cur.fetchone():
@@ -78,7 +964,9 @@ def api_register():
                         (user_id, full_name, email, phone))
             client_id = cur.lastrowid
 
-            return jsonify({"message": "Registro exitoso", "client_id": client_id}), 201
+        # Tras el COMMIT: si la transacción se deshace, el contador no cambia
+        dashboard_counters.apply(total_clients=1)
+        return jsonify({"message": "Registro exitoso", "client_id": client_id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -146,6 +1034,7 @@ def api_login():
     password = request.form.get('password')
     
     conn = None
+    created_client = False
     try:
         conn = get_conn()
         with conn.cursor() as cur:
@@ -170,10 +1059,12 @@ def api_login():
                         cur.execute("INSERT INTO clients (user_id, full_name, email) VALUES (%s, %s, %s)", 
                                     (user['user_id'], 'Usuario Cliente', email))
                         response['client_id'] = cur.lastrowid
-
-                return jsonify(response)
+                        created_client = True
             else:
                 return jsonify({'error': 'Credenciales inválidas.'}), 401
+        if created_client:
+            dashboard_counters.apply(total_clients=1)
+        return jsonify(response)
     except Exception as e:
         print(f"Error durante el login: {e}")
         return jsonify({'error': 'Error interno del servidor.'}), 500
@@ -182,55 +1073,966 @@ def api_login():
 
 
 # --- UTILIDADES DE PAGINACIÓN ---
-def get_paginated_query(cursor, table_name, search_fields, search_query, page, per_page, extra_where="", extra_params=None, order_by="id DESC"):
+# Dos modos:
+#  - OFFSET (?page=N): compatible con las pantallas actuales.
+#  - Cursor (?after=<token>): keyset/seek sobre las columnas del ORDER BY; la página
+#    5000 cuesta lo mismo que la 1 porque MySQL no tiene que recorrer y descartar filas.
+# Cada respuesta incluye "next_cursor" (None en la última página).
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Cursor de paginación inválido.")
+    if not isinstance(values, list):
+        raise ValueError("Cursor de paginación inválido.")
+    return values
+
+# --- LÍMITES DE TAMAÑO DE RESPUESTA ---
+# Ningún listado materializa más filas de las que se pueden servir: per_page tiene un máximo
+# por endpoint, los listados sin paginar un máximo de filas y toda respuesta JSON un máximo
+# de bytes. Quien necesite más datos recibe un error que indica el camino correcto:
+# paginar con el cursor (?after=) o descargar el CSV en streaming de /api/reports/export.
+MAX_PER_PAGE = int(os.environ.get("MAX_PER_PAGE", 200))
+PER_PAGE_LIMITS = {
+    # Listados con JOINs de 3-4 tablas
+    'api_get_reservations': 100,
+    'api_get_reservation_services': 100,
+}
+RESPONSE_MAX_ROWS = int(os.environ.get("RESPONSE_MAX_ROWS", 1000))                 # listados sin paginar
+RESPONSE_MAX_BYTES = int(os.environ.get("RESPONSE_MAX_BYTES", 4 * 1024 * 1024))    # cuerpo JSON
+EXPORT_PATHS = {
+    'api_get_reservations': '/api/reports/export?type=reservations',
+    'api_get_reservation_services': '/api/reports/export?type=services',
+    'manage_invoices': '/api/reports/export?type=invoices_clients',
+    'api_get_eligible_reservations': '/api/reports/export?type=reservations',
+}
+
+class ResponseTooLarge(ValueError):
+    """La petición pide más datos de los que una respuesta puede llevar."""
+    def __init__(self, message, limit):
+        endpoint = request.endpoint if has_request_context() else None
+        self.limit = limit
+        self.export = EXPORT_PATHS.get(endpoint)
+        hint = f" Para descargarlo todo use {self.export}." if self.export else ""
+        super().__init__(message + hint)
+
+    def response(self):
+        return jsonify({"error": str(self), "limit": self.limit, "export": self.export}), 400
+
+@app.errorhandler(ResponseTooLarge)
+def handle_response_too_large(e):
+    return e.response()
+
+def max_per_page():
+    endpoint = request.endpoint if has_request_context() else None
+    return min(PER_PAGE_LIMITS.get(endpoint, MAX_PER_PAGE), MAX_PER_PAGE)
+
+def fetch_limited(cursor, max_rows=None):
+    """fetchall() acotado: lanza ResponseTooLarge en lugar de materializar un resultado enorme."""
+    max_rows = max_rows or RESPONSE_MAX_ROWS
+    rows = cursor.fetchmany(max_rows + 1)
+    if len(rows) > max_rows:
+        raise ResponseTooLarge(f"El resultado supera el máximo de {max_rows} filas por respuesta.", max_rows)
+    return rows
+
+def get_page_args(args):
+    """Lee page, per_page y after de la query string. Lanza ValueError si son inválidos."""
+    try:
+        page = max(1, int(args.get('page', 1)))
+        per_page = max(1, int(args.get('per_page', 10)))
+    except ValueError:
+        raise ValueError("page y per_page deben ser números enteros.")
+    limit = max_per_page()
+    if per_page > limit:
+        raise ResponseTooLarge(f"per_page no puede superar {limit} en este listado; "
+                               "recorra las páginas con ?after=<next_cursor>.", limit)
+    after = args.get('after')
+    return page, per_page, decode_cursor(after) if after else None
+
+def parse_order_by(order_by):
+    """'rs.service_date DESC, rs.reservation_service_id DESC' -> [(expr, clave_en_fila, dirección), ...]"""
+    order = []
+    for part in order_by.split(','):
+        tokens = part.split()
+        expr = tokens[0]
+        direction = tokens[1].upper() if len(tokens) > 1 else 'ASC'
+        order.append((expr, expr.split('.')[-1], direction))
+    return order
+
+def keyset_clause(order, after):
+    """Condición 'fila posterior al cursor' para un ORDER BY de varias columnas (direcciones mixtas)."""
+    if len(after) != len(order):
+        raise ValueError("Cursor de paginación inválido.")
+    alternatives = []
+    params = []
+    for i, (expr, _, direction) in enumerate(order):
+        terms = [f"{prev_expr} = %s" for prev_expr, _, _ in order[:i]]
+        terms.append(f"{expr} {'<' if direction == 'DESC' else '>'} %s")
+        params.extend(after[:i + 1])
+        alternatives.append("(" + " AND ".join(terms) + ")")
+    return "(" + " OR ".join(alternatives) + ")", params
+
+# --- BÚSQUEDA (parámetro q=) ---
+# Modo 'fulltext': columnas de texto con índice FULLTEXT (MATCH ... AGAINST en modo booleano,
+# cada palabra como prefijo: "jua per" -> "+jua* +per*"); códigos y números por prefijo
+# (LIKE 'term%'), que sí aprovecha los índices B-tree. Las palabras más cortas que
+# innodb_ft_min_token_size no están en el índice: si el término no tiene ninguna indexable
+# se busca como antes, LIKE '%term%' en todas las columnas (texto y códigos).
+# Modo 'like': el comportamiento original, LIKE '%term%' en todas las columnas.
+# Las columnas 'contains' se buscan siempre con LIKE '%term%' en ambos modos.
+# La búsqueda ignora acentos: el término pasa por remove_accents y las columnas usan utf8mb4_unicode_ci.
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "like" if DB_BACKEND == 'sqlite' else "fulltext")
+FULLTEXT_MIN_TOKEN = int(os.environ.get("FULLTEXT_MIN_TOKEN", 3))
+
+def escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def build_search_clause(query, fulltext=(), prefix=(), contains=()):
+    """
+    fulltext: grupos de columnas cubiertos por un índice FULLTEXT, p. ej. "full_name, email, address".
+    prefix: columnas buscadas por prefijo (códigos, números, enums).
+    contains: columnas buscadas siempre por subcadena.
+    Retorna (cláusula, params); (None, []) si no hay nada que buscar.
+    """
+    text = remove_accents(query or '').strip()
+    if not text:
+        return None, []
+
+    terms = []
+    params = []
+    substring = f"%{escape_like(text)}%"
+    words = [w for w in re.findall(r'\w+', text.lower()) if len(w) >= FULLTEXT_MIN_TOKEN]
+    if SEARCH_MODE == 'fulltext' and words:
+        boolean_query = ' '.join(f'+{w}*' for w in words)
+        for group in fulltext:
+            terms.append(f"MATCH({group}) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(boolean_query)
+        like_columns = [(col, f"{escape_like(text)}%") for col in prefix]
+    else:
+        # Modo LIKE o término sin palabras indexables: subcadena en todas las columnas
+        text_columns = [col.strip() for group in fulltext for col in group.split(',')]
+        like_columns = [(col, substring) for col in text_columns + list(prefix)]
+    like_columns += [(col, substring) for col in contains]
+
+    for col, pattern in like_columns:
+        terms.append(f"{col} LIKE %s")
+        params.append(pattern)
+    return "(" + " OR ".join(terms) + ")", params
+
+# --- CACHÉ DE CONTEOS (COUNT(*)) ---
+# Cada tabla tiene un número de versión que se incrementa con cada escritura. Una entrada
+# de caché guarda las versiones de las tablas que leyó: si alguna cambió, la entrada ya
+# no es válida. Con ?count=estimate un listado sin filtros usa las estadísticas de
+# information_schema en lugar de contar.
+COUNT_CACHE_TTL = int(os.environ.get("COUNT_CACHE_TTL", 60))            # segundos
+COUNT_CACHE_MAX_ENTRIES = int(os.environ.get("COUNT_CACHE_MAX_ENTRIES", 1000))
+
+_table_versions = collections.defaultdict(int)
+_table_versions_lock = threading.Lock()
+
+def table_versions(tables):
+    with _table_versions_lock:
+        return tuple(_table_versions[t] for t in tables)
+
+def bump_table_versions(*tables):
+    """Invalida las cachés de este worker que dependen de las tablas."""
+    with _table_versions_lock:
+        for table in tables:
+            _table_versions[table] += 1
+
+def mark_tables_changed(*tables, publish=True):
+    """Escritura hecha por este worker: invalida aquí y lo anuncia a los demás workers."""
+    bump_table_versions(*tables)
+    response_cache.invalidate(tables)
+    if publish:
+        invalidation_bus.publish(tables)
+
+def tables_in(from_sql):
+    """Tablas mencionadas en un FROM/JOIN ('FROM reservations r JOIN clients c ...')."""
+    return tuple(dict.fromkeys(re.findall(r'\b(?:FROM|JOIN)\s+(\w+)', from_sql, flags=re.IGNORECASE)))
+
+class CountCache:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()  # key -> (versiones, total, expira)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tables, key):
+        versions = table_versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == versions and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, tables, key, total, versions):
+        with self._lock:
+            self._entries[key] = (versions, total, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+count_cache = CountCache(COUNT_CACHE_TTL, COUNT_CACHE_MAX_ENTRIES)
+
+def estimate_table_rows(cursor, table_name):
+    # Estimación de InnoDB (puede desviarse algunos %); None si no está disponible
+    cursor.execute("""
+        SELECT TABLE_ROWS AS total FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table_name,))
+    row = cursor.fetchone()
+    return row['total'] if row and row['total'] is not None else None
+
+def count_rows(cursor, from_sql, where_clauses, params):
+    """
+    COUNT(*) de un listado, servido desde la caché mientras ninguna de sus tablas cambie.
+    Retorna (total, es_estimado).
+    """
+    tables = tables_in(from_sql)
+    where_str = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    count_mode = request.args.get('count') if has_request_context() else None
+    if count_mode == 'estimate' and not where_clauses and len(tables) == 1:
+        estimate = estimate_table_rows(cursor, tables[0])
+        if estimate is not None:
+            return estimate, True
+
+    count_sql = " ".join(f"SELECT COUNT(*) as total {from_sql} {where_str}".split())
+    key = (count_sql, tuple(params))
+    total = count_cache.get(tables, key)
+    if total is None:
+        versions = table_versions(tables)  # antes de contar: una escritura concurrente invalida el resultado
+        cursor.execute(count_sql, tuple(params))
+        total = cursor.fetchone()['total']
+        count_cache.put(tables, key, total, versions)
+    return total, False
+
+def run_paginated_query(cursor, select_sql, from_sql, where_clauses, params, order_by, page, per_page, after=None, count_from_sql=None):
+    """
+    Ejecuta el conteo y la página de datos de un listado.
+    select_sql: columnas; from_sql: FROM con sus JOINs; where_clauses/params: filtros;
+    order_by: debe identificar cada fila de forma única (necesario para el modo cursor).
+    count_from_sql: FROM alternativo (con menos JOINs) para el conteo, si aplica.
+    """
+    order = parse_order_by(order_by)
+
+    # 1. Contar total de registros (para la paginación), con caché
+    total_records, estimated = count_rows(cursor, count_from_sql or from_sql, where_clauses, params)
+    total_pages = (total_records + per_page - 1) // per_page
+
+    # 2. Obtener datos paginados
+    data_clauses = list(where_clauses)
+    data_params = list(params)
+    if after is not None:
+        clause, clause_params = keyset_clause(order, after)
+        data_clauses.append(clause)
+        data_params.extend(clause_params)
+        offset = 0
+    else:
+        offset = (page - 1) * per_page
+    data_where = " WHERE " + " AND ".join(data_clauses) if data_clauses else ""
+
+    if offset:
+        data_sql = f"SELECT {select_sql} {from_sql} {data_where} ORDER BY {order_by} LIMIT %s OFFSET %s"
+        data_params.extend([per_page, offset])
+    else:
+        data_sql = f"SELECT {select_sql} {from_sql} {data_where} ORDER BY {order_by} LIMIT %s"
+        data_params.append(per_page)
+    cursor.execute(data_sql, tuple(data_params))
+    results = cursor.fetchall()
+
+    next_cursor = None
+    if len(results) == per_page:
+        last = results[-1]
+        next_cursor = encode_cursor([last[key] for _, key, _ in order])
+
+    return {
+        "data": results,
+        "total": total_records,
+        "page": page,
+        "per_page": per_page,
+        "pages": total_pages,
+        "total_estimated": estimated,
+        "next_cursor": next_cursor
+    }
+
+def get_paginated_query(cursor, table_name, search_fields, search_query, page, per_page, extra_where="", extra_params=None, order_by="id DESC", after=None, fulltext_fields=()):
     """
     Construye y ejecuta una consulta paginada con búsqueda.
+    search_fields se buscan por prefijo; fulltext_fields son grupos con índice FULLTEXT.
     Retorna un diccionario con data y metadatos de paginación.
     """
     if extra_params is None:
         extra_params = []
     
-    offset = (page - 1) * per_page
     params = []
     where_clauses = []
 
     # 1. Filtro de búsqueda (Search)
-    if search_query:
-        search_terms = []
-        for field in search_fields:
-            search_terms.append(f"{field} LIKE %s")
-            params.append(f"%{search_query}%")
-        if search_terms:
-            where_clauses.append(f"({' OR '.join(search_terms)})")
+    search_clause, search_params = build_search_clause(search_query, fulltext=fulltext_fields, prefix=search_fields)
+    if search_clause:
+        where_clauses.append(search_clause)
+        params.extend(search_params)
     
     # 2. Filtros extra
     if extra_where:
         where_clauses.append(extra_where)
         params.extend(extra_params)
 
-    where_str = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-
-    # 3. Contar total de registros (para la paginación)
-    count_sql = f"SELECT COUNT(*) as total FROM {table_name} {where_str}"
-    cursor.execute(count_sql, tuple(params))
-    total_records = cursor.fetchone()['total']
-    total_pages = (total_records + per_page - 1) // per_page
-
-    # 4. Obtener datos paginados
-    data_sql = f"SELECT * FROM {table_name} {where_str} ORDER BY {order_by} LIMIT %s OFFSET %s"
-    params.append(per_page)
-    params.append(offset)
-    
-    cursor.execute(data_sql, tuple(params))
-    results = cursor.fetchall()
+    return run_paginated_query(cursor, "*", f"FROM {table_name}", where_clauses, params,
+                               order_by, page, per_page, after=after)
+
+# --- CATÁLOGOS EN MEMORIA (habitaciones y servicios) ---
+# Tablas pequeñas que cambian poco y se leen en cada carga de página. Se guarda una copia
+# completa junto con la versión de la tabla (mark_tables_changed, aplicado por after_request
+# a las rutas de WRITE_TABLES): cualquier escritura en la tabla la invalida. Solo sirve los
+# listados sin búsqueda de texto; el precio que se cobra se lee siempre de la BD.
+CATALOG_TTL = int(os.environ.get("CATALOG_TTL", 300))   # segundos (cambios hechos fuera de la API)
+
+class CatalogCache:
+    def __init__(self, table, order_key, ttl):
+        self.table = table
+        self.order_key = order_key    # orden de los listados (ASC, valores únicos)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rows = None
+        self._version = None
+        self._expires = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _snapshot(self):
+        version = table_versions((self.table,))
+        with self._lock:
+            if self._rows is not None and self._version == version and self._expires > time.monotonic():
+                self.hits += 1
+                return self._rows
+            self.misses += 1
+
+        # La versión se tomó antes de leer: una escritura concurrente deja la copia ya caducada
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT * FROM {self.table} ORDER BY {self.order_key} ASC")
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            self._rows = rows
+            self._version = version
+            self._expires = time.monotonic() + self.ttl
+            self.loads += 1
+        return rows
+
+    def paginate(self, page, per_page, after=None, **filters):
+        """Mismo formato (y cursores) que run_paginated_query, filtrando por igualdad de columnas."""
+        rows = self._snapshot()
+        filters = {col: str(value) for col, value in filters.items() if value}
+        matching = [row for row in rows if all(str(row[col]) == value for col, value in filters.items())]
+        total_records = len(matching)
+        if after is not None:
+            # Mismo criterio que keyset_clause: filas con clave mayor que la del cursor
+            try:
+                data = [row for row in matching if row[self.order_key] > after[0]][:per_page]
+            except (TypeError, IndexError):
+                raise ValueError("Cursor de paginación inválido.")
+        else:
+            data = matching[(page - 1) * per_page:page * per_page]
+        next_cursor = encode_cursor([data[-1][self.order_key]]) if len(data) == per_page else None
+        return {
+            "data": data,
+            "total": total_records,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total_records + per_page - 1) // per_page,
+            "total_estimated": False,
+            "next_cursor": next_cursor
+        }
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+
+    def stats(self):
+        with self._lock:
+            return {"loaded": self._rows is not None, "rows": len(self._rows or ()),
+                    "hits": self.hits, "misses": self.misses, "loads": self.loads}
+
+rooms_catalog = CatalogCache('rooms', 'room_num', CATALOG_TTL)
+services_catalog = CatalogCache('services', 'service_id', CATALOG_TTL)
+
+# --- BUS DE INVALIDACIÓN ENTRE WORKERS ---
+# Con varios workers de gunicorn, cada uno tiene sus propias cachés. Cada escritura incrementa
+# la versión de sus tablas en un almacén compartido (tabla cache_versions); cada worker lo
+# consulta como mucho una vez cada CACHE_BUS_POLL_SECONDS (al llegar una petición) y, para
+# las tablas cuya versión cambió por escrituras de OTRO worker, invalida solo lo que depende
+# de ellas. CACHE_BUS=local usa un almacén en memoria (un solo proceso, pruebas); off lo desactiva.
+CACHE_BUS = os.environ.get("CACHE_BUS", "mysql")
+CACHE_BUS_POLL_SECONDS = float(os.environ.get("CACHE_BUS_POLL_SECONDS", 1))
+ER_NO_SUCH_TABLE = 1146
+
+class LocalVersionStore:
+    """Sustituto en memoria de la tabla cache_versions."""
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def read(self):
+        with self._lock:
+            return dict(self._versions)
+
+class MySQLVersionStore:
+    def bump(self, tables):
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                values = ", ".join(["(%s, 1)"] * len(tables))
+                cur.execute(f"INSERT INTO cache_versions (table_name, version) VALUES {values} "
+                            "ON DUPLICATE KEY UPDATE version = version + 1", tuple(tables))
+        finally:
+            conn.close()
+
+    def read(self):
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT table_name, version FROM cache_versions")
+                return {row['table_name']: row['version'] for row in cur.fetchall()}
+        finally:
+            conn.close()
+
+class InvalidationBus:
+    def __init__(self, store, poll_seconds):
+        self.store = store
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._seen = None                        # versiones leídas en el último sondeo
+        self._own = collections.Counter()        # incrementos propios aún no vistos en un sondeo
+        self._in_flight = 0                      # publicaciones con el incremento en curso
+        self._next_poll = 0
+        self._subscribers = []                   # [(tablas, callback)]
+        self.published = 0
+        self.polls = 0
+        self.remote_changes = 0
+        self.errors = 0
+
+    def subscribe(self, tables, callback):
+        """callback() se llama cuando otro worker modifica alguna de las tablas."""
+        self._subscribers.append((frozenset(tables), callback))
+
+    def publish(self, tables):
+        if self.store is None or not tables:
+            return
+        # El viaje a la BD va fuera del lock (los escritores no se serializan). Mientras haya
+        # publicaciones en curso no se sondea: un sondeo nunca ve un incremento propio sin contarlo.
+        with self._lock:
+            self._in_flight += 1
+        try:
+            self.store.bump(tables)
+        except Exception as e:
+            with self._lock:
+                self._in_flight -= 1
+                self._failed(e)
+            return
+        with self._lock:
+            self._in_flight -= 1
+            self._own.update(tables)
+            self.published += 1
+
+    def poll(self, force=False):
+        """Aplica los cambios de otros workers. Retorna las tablas afectadas."""
+        if self.store is None or (not force and time.monotonic() < self._next_poll):
+            return ()
+        # Si otro hilo ya está sondeando o publicando, este sondeo no hace falta
+        if not self._lock.acquire(blocking=force):
+            return ()
+        try:
+            if self._in_flight:
+                return ()   # se reintenta en la próxima petición
+            self._next_poll = time.monotonic() + self.poll_seconds
+            try:
+                versions = self.store.read()
+            except Exception as e:
+                self._failed(e)
+                return ()
+            previous, self._seen = self._seen, versions
+            own, self._own = self._own, collections.Counter()
+            self.polls += 1
+        finally:
+            self._lock.release()
+        if previous is None:
+            return ()  # primer sondeo: solo fija la referencia
+        changed = tuple(table for table, version in versions.items()
+                        if version - previous.get(table, 0) > own.get(table, 0))
+        if changed:
+            self.remote_changes += len(changed)
+            bump_table_versions(*changed)
+            for tables, callback in self._subscribers:
+                if tables.intersection(changed):
+                    callback()
+        return changed
+
+    def _failed(self, e):
+        # Sin tabla cache_versions (base anterior): cada worker sigue con sus propias invalidaciones
+        if isinstance(e, pymysql.err.MySQLError) and e.args and e.args[0] == ER_NO_SUCH_TABLE:
+            print("⚠️ Tabla cache_versions no encontrada (ver db_init/add_cache_versions.sql); bus de invalidación desactivado.")
+            self.store = None
+        else:
+            self.errors += 1
+            print(f"Error en el bus de invalidación: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"backend": CACHE_BUS if self.store is not None else "off",
+                    "published": self.published, "polls": self.polls,
+                    "remote_changes": self.remote_changes, "errors": self.errors}
+
+_version_stores = {"mysql": MySQLVersionStore, "local": LocalVersionStore}
+invalidation_bus = InvalidationBus(
+    _version_stores[CACHE_BUS]() if CACHE_BUS in _version_stores else None, CACHE_BUS_POLL_SECONDS)
+
+@app.before_request
+def poll_invalidation_bus():
+    invalidation_bus.poll()
+
+# --- CACHÉ DE RESPUESTAS COMPARTIDA ENTRE WORKERS ---
+# GET costosos e idénticos (dashboard, ocupación, reservas por facturar) se calculan una vez
+# para todos los workers: la respuesta se guarda en un archivo SQLite local (RESPONSE_CACHE_PATH,
+# en memoria compartida si /dev/shm existe) con TTL, etiquetas por tabla y expulsión LRU por
+# tamaño. Una escritura borra las entradas etiquetadas con sus tablas (mark_tables_changed);
+# cada etiqueta tiene una versión para no guardar un resultado calculado antes de esa escritura.
+# Ante un fallo, el primer worker toma una reserva (lease) de la clave en el mismo archivo y los
+# demás esperan su resultado en vez de repetir la consulta; la reserva caduca a los
+# RESPONSE_CACHE_LEASE_SECONDS por si quien la tomó muere a mitad del cálculo.
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "on") != "off"
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "gestion_hotelera_responses.sqlite3"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+RESPONSE_CACHE_FLUSH_SECONDS = 1.0   # cada cuánto se vuelcan los contadores de este worker
+RESPONSE_CACHE_LEASE_SECONDS = float(os.environ.get("RESPONSE_CACHE_LEASE_SECONDS", 30))
+
+class SharedResponseCache:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, body BLOB NOT NULL, mimetype TEXT NOT NULL,
+            size INTEGER NOT NULL, expires REAL NOT NULL, last_used REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (last_used);
+        CREATE TABLE IF NOT EXISTS entry_tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key));
+        CREATE INDEX IF NOT EXISTS idx_entry_tags_key ON entry_tags (key);
+        CREATE TABLE IF NOT EXISTS tag_versions (tag TEXT PRIMARY KEY, version INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS slots (name TEXT NOT NULL, owner TEXT NOT NULL, pid INTEGER NOT NULL,
+            PRIMARY KEY (name, owner));
+    """
+    COUNTERS = ('hits', 'misses', 'stores', 'evictions', 'invalidations', 'coalesced')
+
+    def __init__(self, path, max_bytes, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = collections.Counter()   # contadores aún no volcados al archivo
+        self._next_flush = 0
+        self._slot_owners = (os.getpid(), set())   # huecos que ocupa este proceso
+        self.errors = 0
+
+    def _db(self):
+        # Una conexión por hilo y por proceso (no se heredan a través del fork de gunicorn)
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")   # es una caché: se puede perder
+            db.executescript(self.SCHEMA)
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _failed(self, e):
+        self.errors += 1
+        print(f"Error en la caché de respuestas: {e}")
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._pending[name] += n
+            if time.monotonic() < self._next_flush:
+                return
+            pending, self._pending = self._pending, collections.Counter()
+            self._next_flush = time.monotonic() + RESPONSE_CACHE_FLUSH_SECONDS
+        self._flush(pending)
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        try:
+            self._db().executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", pending.items())
+        except sqlite3.Error as e:
+            self._failed(e)
+
+    def get(self, key):
+        """(body, mimetype) o None."""
+        now = time.time()
+        try:
+            db = self._db()
+            row = db.execute("SELECT body, mimetype, expires, last_used FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and row[2] > now:
+                if now - row[3] > 1:   # LRU aproximado: no escribir en cada acierto
+                    db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+                self._count('hits')
+                return row[0], row[1]
+        except sqlite3.Error as e:
+            self._failed(e)
+        self._count('misses')
+        return None
+
+    def lease(self, key, seconds):
+        """Reserva el cálculo de 'key'. Retorna el dueño (para release_lease) o None si ya lo tiene otro."""
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        now = time.time()
+        try:
+            cur = self._db().execute(
+                "INSERT INTO leases (key, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE leases.expires <= ?", (key, owner, now + seconds, now))
+        except sqlite3.Error as e:
+            self._failed(e)
+            return owner   # sin reserva posible, cada uno calcula lo suyo
+        return owner if cur.rowcount else None
+
+    def release_lease(self, key, owner):
+        try:
+            self._db().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+        except sqlite3.Error as e:
+            self._failed(e)
+
+    def wait(self, key, timeout):
+        """
+        Espera el resultado que otro worker está calculando para 'key'. (body, mimetype) o None si
+        soltó la reserva sin guardarlo (error, o una escritura lo dejó obsoleto) o se agotó 'timeout'.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            now = time.time()
+            try:
+                db = self._db()
+                row = db.execute("SELECT body, mimetype FROM entries WHERE key = ? AND expires > ?", (key, now)).fetchone()
+                if row:
+                    self._count('coalesced')
+                    return row[0], row[1]
+                if not db.execute("SELECT 1 FROM leases WHERE key = ? AND expires > ?", (key, now)).fetchone():
+                    return None
+            except sqlite3.Error as e:
+                self._failed(e)
+                return None
+        return None
+
+    def claim_slot(self, name, slots, owner):
+        """
+        Ocupa uno de los 'slots' huecos de 'name', compartidos por todos los workers. True o False
+        según haya hueco; None si el archivo no está disponible.
+        """
+        pid = os.getpid()
+        with self._lock:
+            if self._slot_owners[0] != pid:
+                self._slot_owners = (pid, set())
+            mine = set(self._slot_owners[1])
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                holders = db.execute("SELECT owner, pid FROM slots WHERE name = ?", (name,)).fetchall()
+                # Huecos de workers que murieron sin liberarlos (o de un proceso anterior con este pid)
+                stale = [(name, holder) for holder, holder_pid in holders
+                         if (holder not in mine if holder_pid == pid else not pid_alive(holder_pid))]
+                db.executemany("DELETE FROM slots WHERE name = ? AND owner = ?", stale)
+                claimed = len(holders) - len(stale) < slots
+                if claimed:
+                    db.execute("INSERT INTO slots (name, owner, pid) VALUES (?, ?, ?)", (name, owner, pid))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._failed(e)
+            return None
+        if claimed:
+            with self._lock:
+                self._slot_owners[1].add(owner)
+        return claimed
+
+    def free_slot(self, name, owner):
+        with self._lock:
+            self._slot_owners[1].discard(owner)
+        try:
+            self._db().execute("DELETE FROM slots WHERE name = ? AND owner = ?", (name, owner))
+        except sqlite3.Error as e:
+            self._failed(e)
+
+    def tag_versions(self, tags):
+        try:
+            placeholders = ','.join('?' * len(tags))
+            rows = self._db().execute(f"SELECT tag, version FROM tag_versions WHERE tag IN ({placeholders})", tuple(tags))
+            versions = dict(rows.fetchall())
+        except sqlite3.Error as e:
+            self._failed(e)
+            return None
+        return tuple(versions.get(tag, 0) for tag in tags)
+
+    def put(self, key, body, mimetype, ttl, tags, versions):
+        """Guarda la respuesta si ninguna de sus tablas cambió desde 'versions'."""
+        if versions is None or len(body) > self.max_bytes:
+            return False
+        now = time.time()
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if self.tag_versions(tags) != versions:
+                    db.execute("ROLLBACK")
+                    return False
+                db.execute("INSERT OR REPLACE INTO entries (key, body, mimetype, size, expires, last_used) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", (key, body, mimetype, len(body), now + ttl, now))
+                db.execute("DELETE FROM entry_tags WHERE key = ?", (key,))
+                db.executemany("INSERT INTO entry_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+                evicted = self._evict(db, now)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._failed(e)
+            return False
+        self._count('stores')
+        if evicted:
+            self._count('evictions', evicted)
+        return True
+
+    def _evict(self, db, now):
+        """Borra las caducadas y, si se supera max_bytes, las menos usadas. Retorna cuántas expulsó."""
+        db.execute("DELETE FROM entry_tags WHERE key IN (SELECT key FROM entries WHERE expires <= ?)", (now,))
+        db.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        used = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = 0
+        if used > self.max_bytes:
+            for key, size in db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                db.execute("DELETE FROM entry_tags WHERE key = ?", (key,))
+                evicted += 1
+                used -= size
+                if used <= self.max_bytes:
+                    break
+        return evicted
+
+    def invalidate(self, tags):
+        if not self.enabled or not tags:
+            return
+        placeholders = ','.join('?' * len(tags))
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany("INSERT INTO tag_versions (tag, version) VALUES (?, 1) "
+                               "ON CONFLICT(tag) DO UPDATE SET version = version + 1", [(tag,) for tag in tags])
+                keys = f"SELECT key FROM entry_tags WHERE tag IN ({placeholders})"
+                removed = db.execute(f"DELETE FROM entries WHERE key IN ({keys})", tuple(tags)).rowcount
+                db.execute(f"DELETE FROM entry_tags WHERE key IN ({keys})", tuple(tags))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._failed(e)
+            return
+        if removed:
+            self._count('invalidations', removed)
+
+    def stats(self):
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            pending, self._pending = self._pending, collections.Counter()
+        self._flush(pending)
+        try:
+            db = self._db()
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            entries, used = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except sqlite3.Error as e:
+            self._failed(e)
+            return {"enabled": self.enabled, "errors": self.errors}
+        stats = {name: counters.get(name, 0) for name in self.COUNTERS}
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            "enabled": self.enabled,
+            "hit_ratio": round(stats['hits'] / lookups, 4) if lookups else None,
+            "entries": entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "errors": self.errors,
+        })
+        return stats
+
+response_cache = SharedResponseCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_BYTES, enabled=RESPONSE_CACHE)
+
+def response_cache_key():
+    """Ruta + query string normalizada + rol (y cliente) + día: las respuestas dependen de todo ello."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return "|".join((request.path, query, request.headers.get('X-User-Role', ''),
+                     request.headers.get('X-Client-Id', ''), date.today().isoformat()))
+
+def shared_cache(ttl, tables):
+    """
+    Decorador para GET de solo lectura: sirve la respuesta desde la caché compartida o la
+    calcula y la guarda etiquetada con 'tables'. Si otro worker ya la está calculando, espera
+    su resultado. Va debajo de @require_role.
+    """
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled:
+                return f(*args, **kwargs)
+            key = response_cache_key()
+            cached = response_cache.get(key)
+            owner = None
+            if cached is None:
+                owner = response_cache.lease(key, RESPONSE_CACHE_LEASE_SECONDS)
+                if owner is None:
+                    cached = response_cache.wait(key, RESPONSE_CACHE_LEASE_SECONDS)
+            if cached is not None:
+                response = Response(cached[0], mimetype=cached[1])
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            try:
+                versions = response_cache.tag_versions(tables)
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    response_cache.put(key, response.get_data(), response.mimetype, ttl, tables, versions)
+            finally:
+                if owner is not None:
+                    response_cache.release_lease(key, owner)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
 
-    return {
-        "data": results,
-        "total": total_records,
-        "page": page,
-        "per_page": per_page,
-        "pages": total_pages
-    }
+# --- COALESCENCIA DE PETICIONES IDÉNTICAS (single-flight) ---
+# Si llegan N peticiones idénticas (misma clave que la caché de respuestas) mientras una
+# se está calculando, solo esa va a la BD; las demás esperan y reciben una copia del
+# resultado. Es por worker (hilos de gunicorn gthread); entre workers lo resuelve la reserva de
+# la caché compartida en las rutas con @shared_cache.
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.environ.get("SINGLE_FLIGHT_WAIT_SECONDS", 30))
+SINGLE_FLIGHT_MAX_KEYS = 1000   # claves con contadores (las menos recientes se descartan)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self, wait_seconds, max_keys):
+        self.wait_seconds = wait_seconds
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._flights = {}                        # clave -> _Flight en curso
+        self._stats = collections.OrderedDict()   # clave -> {"executions", "saved"}
+
+    def _counter(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {"executions": 0, "saved": 0}
+            while len(self._stats) > self.max_keys:
+                self._stats.popitem(last=False)
+        self._stats.move_to_end(key)
+        return stats
+
+    def do(self, key, fn):
+        """Ejecuta fn() una sola vez por clave en curso. Retorna (resultado, compartido)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counter(key)["executions"] += 1
+
+        if not leader:
+            if flight.done.wait(self.wait_seconds):
+                if flight.error is not None:
+                    raise flight.error
+                with self._lock:
+                    self._counter(key)["saved"] += 1
+                return flight.result, True
+            # El cálculo en curso tarda demasiado: no encadenar más esperas, calcular aparte
+            with self._lock:
+                self._counter(key)["executions"] += 1
+            return fn(), False
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            keys = {key: dict(stats) for key, stats in self._stats.items()}
+            in_flight = len(self._flights)
+        return {"in_flight": in_flight, "saved": sum(k["saved"] for k in keys.values()), "keys": keys}
+
+single_flight = SingleFlight(SINGLE_FLIGHT_WAIT_SECONDS, SINGLE_FLIGHT_MAX_KEYS)
+
+def coalesce_requests(f):
+    """
+    Decorador para GET de solo lectura: peticiones idénticas concurrentes comparten un único cálculo.
+    El resultado compartido es el cuerpo completo, así que no sirve para respuestas en streaming.
+    """
+    def wrapper(*args, **kwargs):
+        def compute():
+            response = make_response(f(*args, **kwargs))
+            try:
+                if response.is_streamed:
+                    raise TypeError(f"coalesce_requests no admite respuestas en streaming ({f.__name__})")
+                return response.get_data(), response.status_code, list(response.headers.items())
+            finally:
+                response.close()   # ejecuta los call_on_close (p. ej. liberar el hueco de heavy_report)
+        (body, status, headers), shared = single_flight.do(response_cache_key(), compute)
+        response = Response(body, status=status, headers=headers)
+        if shared:
+            response.headers['X-Coalesced'] = '1'
+        return response
+    wrapper.__name__ = f.__name__
+    return wrapper
 
 # ====================================================================
 #                          ENDPOINTS CRUD
@@ -240,8 +2042,12 @@ def get_paginated_query(cursor, table_name, search_fields, search_query, page, p
 @app.route("/api/clients", methods=["GET"])
 @require_role(['admin', 'recepcion'])
 def api_get_clients():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page, after = get_page_args(request.args)
+    except ResponseTooLarge as e:
+        return e.response()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     search = request.args.get('q', '')
 
     conn = None
@@ -251,11 +2057,13 @@ def api_get_clients():
             result = get_paginated_query(
                 cur, 
                 table_name="clients", 
-                search_fields=["full_name", "email", "phone", "address"], 
+                search_fields=["phone"], 
+                fulltext_fields=["full_name, email, address"],
                 search_query=search, 
                 page=page, 
                 per_page=per_page,
-                order_by="client_id DESC"
+                order_by="client_id DESC",
+                after=after
             )
             return jsonify(result)
     except Exception as e:
@@ -279,7 +2087,9 @@ def api_create_client():
 
             cur.execute("INSERT INTO clients (full_name, email, phone, address) VALUES (%s, %s, %s, %s)",
                         (data['full_name'], data.get('email'), data.get('phone'), data.get('address')))
-            return jsonify({"message": "Cliente creado exitosamente", "id": cur.lastrowid}), 201
+            client_id = cur.lastrowid
+        dashboard_counters.apply(total_clients=1)
+        return jsonify({"message": "Cliente creado exitosamente", "id": client_id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -315,28 +2125,14 @@ def api_delete_client(client_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
-            # Eliminación en cascada manual (por si la BD no tiene ON DELETE CASCADE configurado)
-            # 1. Obtener IDs de reservas del cliente
-            cur.execute("SELECT reservation_id FROM reservations WHERE client_id = %s", (client_id,))
-            res_ids = [r['reservation_id'] for r in cur.fetchall()]
-            
-            if res_ids:
-                format_strings = ','.join(['%s'] * len(res_ids))
-                # 2. Eliminar facturas asociadas
-                cur.execute(f"DELETE FROM invoices WHERE reservation_id IN ({format_strings})", tuple(res_ids))
-                # 3. Eliminar servicios de reserva asociados
-                cur.execute(f"DELETE FROM reservation_services WHERE reservation_id IN ({format_strings})", tuple(res_ids))
-                # 4. Eliminar reservas
-                cur.execute(f"DELETE FROM reservations WHERE reservation_id IN ({format_strings})", tuple(res_ids))
-
-            # 5. Eliminar cliente
-            cur.execute("DELETE FROM clients WHERE client_id=%s", (client_id,))
-            
-            if cur.rowcount == 0 and not res_ids: # Si no borró nada y no había reservas
-                return jsonify({"error": "Cliente no encontrado"}), 404
-            
-            return jsonify({"message": "Cliente y sus reservas eliminados"}), 200
+        res_ids, client_deleted = delete_client_cascade(conn, client_id)
+        for res_id in res_ids:
+            availability.remove(res_id)
+        if not client_deleted and not res_ids: # Si no borró nada y no había reservas
+            return jsonify({"error": "Cliente no encontrado"}), 404
+
+        dashboard_counters.invalidate()
+        return jsonify({"message": "Cliente y sus reservas eliminados", "deleted_reservations": res_ids}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -344,12 +2140,26 @@ def api_delete_client(client_id):
 
 # --- HABITACIONES (Gestión de Habitaciones) ---
 @app.route("/api/rooms", methods=["GET"])
+@coalesce_requests
 def api_get_rooms():
     # Acceso de lectura para todos (Cliente, Admin, Empleado)
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page, after = get_page_args(request.args)
+    except ResponseTooLarge as e:
+        return e.response()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     search = request.args.get('q', '')
     status_filter = request.args.get('status') # Nuevo filtro
+
+    # Sin búsqueda de texto: listado servido desde el catálogo en memoria
+    if not search.strip():
+        try:
+            return jsonify(rooms_catalog.paginate(page, per_page, after=after, status=status_filter))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
     
     conn = None
     try:
@@ -371,7 +2181,8 @@ def api_get_rooms():
                 per_page=per_page,
                 extra_where=extra_where,
                 extra_params=extra_params,
-                order_by="room_num ASC"
+                order_by="room_num ASC",
+                after=after
             )
             return jsonify(result)
     except Exception as e:
@@ -379,6 +2190,48 @@ def api_get_rooms():
     finally:
         if conn: conn.close()
 
+# Búsqueda de habitaciones libres para TODA la estancia [checkin, checkout),
+# resuelta en memoria con el índice de disponibilidad (sin escanear reservas).
+@app.route("/api/rooms/available", methods=["GET"])
+def api_get_available_rooms():
+    checkin_str = request.args.get('checkin')
+    checkout_str = request.args.get('checkout')
+    room_type = request.args.get('room_type')
+    capacity = request.args.get('capacity')
+
+    if not checkin_str or not checkout_str:
+        return jsonify({"error": "Los parámetros checkin y checkout son obligatorios (YYYY-MM-DD)."}), 400
+    try:
+        checkin = datetime.strptime(checkin_str, '%Y-%m-%d').date()
+        checkout = datetime.strptime(checkout_str, '%Y-%m-%d').date()
+        capacity = int(capacity) if capacity else None
+    except ValueError:
+        return jsonify({"error": "Parámetros inválidos: fechas YYYY-MM-DD y capacidad numérica."}), 400
+    if checkout <= checkin:
+        return jsonify({"error": "La fecha de salida debe ser posterior a la de entrada."}), 400
+    if room_type == 'todos':
+        room_type = None
+
+    conn = None
+    try:
+        conn = get_conn()
+        with conn.cursor() as cur:
+            availability.ensure_loaded(cur)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn: conn.close()
+
+    nights = (checkout - checkin).days
+    rooms = availability.available_rooms(checkin, checkout, room_type=room_type, min_capacity=capacity)
+    return jsonify({
+        "checkin": checkin.strftime('%Y-%m-%d'),
+        "checkout": checkout.strftime('%Y-%m-%d'),
+        "nights": nights,
+        "total": len(rooms),
+        "data": [dict(room, total_estimado=room['price'] * nights) for room in rooms]
+    })
+
 @app.route("/api/rooms", methods=["POST"])
 @require_role(['admin'])
 def api_create_room():
@@ -389,7 +2242,10 @@ def api_create_room():
         with conn.cursor() as cur:
             cur.execute("INSERT INTO rooms (room_num, room_type, capacity, price) VALUES (%s, %s, %s, %s)",
                         (data['room_num'], data['room_type'], data['capacity'], data['price']))
-            return jsonify({"message": "Habitación creada", "room_id": cur.lastrowid}), 201
+            room_id = cur.lastrowid
+        availability.invalidate()
+        dashboard_counters.apply(total_rooms=1, available_rooms=1)
+        return jsonify({"message": "Habitación creada", "room_id": room_id}), 201
     except pymysql.err.IntegrityError:
         return jsonify({"error": "El número de habitación ya existe."}), 400
     except Exception as e:
@@ -409,6 +2265,8 @@ def api_update_room(room_id):
                         (data['room_num'], data['room_type'], data['capacity'], data['price'], data['status'], room_id))
             if cur.rowcount == 0:
                 return jsonify({"error": "Habitación no encontrada"}), 404
+            availability.invalidate()
+            dashboard_counters.invalidate()
             return jsonify({"message": "Habitación actualizada"}), 200
     except pymysql.err.IntegrityError:
         return jsonify({"error": "El número de habitación ya existe."}), 400
@@ -427,6 +2285,8 @@ def api_delete_room(room_id):
             cur.execute("DELETE FROM rooms WHERE room_id=%s", (room_id,))
             if cur.rowcount == 0:
                 return jsonify({"error": "Habitación no encontrada"}), 404
+            availability.invalidate()
+            dashboard_counters.invalidate()
             return jsonify({"message": "Habitación eliminada"}), 200
     except Exception as e:
         return jsonify({"error": "No se puede eliminar la habitación. Hay reservas asociadas."}), 400
@@ -437,8 +2297,12 @@ def api_delete_room(room_id):
 @app.route("/api/staff", methods=["GET"])
 @require_role(['admin', 'recepcion'])
 def api_get_staff():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page, after = get_page_args(request.args)
+    except ResponseTooLarge as e:
+        return e.response()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     search = request.args.get('q', '')
 
     conn = None
@@ -448,11 +2312,13 @@ def api_get_staff():
             result = get_paginated_query(
                 cur, 
                 table_name="staff", 
-                search_fields=["full_name", "staff_role", "area"], 
+                search_fields=[], 
+                fulltext_fields=["full_name, staff_role, area"],
                 search_query=search, 
                 page=page, 
                 per_page=per_page,
-                order_by="staff_id DESC"
+                order_by="staff_id DESC",
+                after=after
             )
             return jsonify(result)
     except Exception as e:
@@ -514,12 +2380,26 @@ def api_delete_staff(staff_id):
 # --- SERVICIOS (Administración de Servicios) ---
 @app.route("/api/services", methods=["GET"])
 @require_role(['admin', 'spa', 'recepcion', 'cliente']) # Acceso de lectura amplio
+@coalesce_requests
 def api_get_services():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page, after = get_page_args(request.args)
+    except ResponseTooLarge as e:
+        return e.response()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     search = request.args.get('q', '')
     status = request.args.get('status', '')
 
+    # Sin búsqueda de texto: listado servido desde el catálogo en memoria
+    if not search.strip():
+        try:
+            return jsonify(services_catalog.paginate(page, per_page, after=after, status=status))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     conn = None
     try:
         conn = get_conn()
@@ -534,13 +2414,15 @@ def api_get_services():
             result = get_paginated_query(
                 cur, 
                 table_name="services", 
-                search_fields=["service_code", "name", "description"], 
+                search_fields=["service_code"], 
+                fulltext_fields=["name, description"],
                 search_query=search, 
                 page=page, 
                 per_page=per_page,
                 extra_where=extra_where,
                 extra_params=extra_params,
-                order_by="service_id ASC"
+                order_by="service_id ASC",
+                after=after
             )
             return jsonify(result)
     except Exception as e:
@@ -604,14 +2486,295 @@ def api_delete_service(service_id):
     finally:
         if conn: conn.close()
 
+# --- ÍNDICE DE DISPONIBILIDAD DE HABITACIONES ---
+# Estados de reserva que ocupan la habitación. 'checkout', 'cancelada' y 'facturada' la liberan.
+ACTIVE_RESERVATION_STATUSES = ('reservada', 'confirmada', 'checkin')
+AVAILABILITY_TTL = int(os.environ.get("AVAILABILITY_TTL", 60))  # segundos antes de recargar desde la BD
+
+def as_date(value):
+    # Las columnas DATETIME llegan como datetime; el índice trabaja por noches (date)
+    return value.date() if isinstance(value, datetime) else value
+
+class AvailabilityIndex:
+    """
+    Índice en memoria de las reservas activas: por habitación, una lista de intervalos
+    [checkin, checkout) ordenada por checkin y la estancia más larga vista. Un intervalo
+    que choca con [checkin, checkout) empieza antes de 'checkout' y no antes de
+    'checkin - estancia más larga', así que solo se revisa ese tramo: O(log n + k).
+    No se asume que las reservas activas de una habitación no se solapen (datos heredados).
+
+    Además mantiene un mapa de bits por habitación (bit i = noche origin + i ocupada)
+    para buscar habitaciones libres en un rango con una sola operación AND por habitación.
+    """
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._starts = {}          # room_id -> [checkin, ...] (ordenada)
+        self._intervals = {}       # room_id -> [(checkin, checkout, reservation_id), ...]
+        self._longest = {}         # room_id -> estancia más larga (timedelta); no baja al quitar
+        self._by_reservation = {}  # reservation_id -> (room_id, checkin, checkout)
+        self._rooms = []           # catálogo de habitaciones ordenado por room_num
+        self._bitmaps = {}         # room_id -> int
+        self._origin = date.today()
+
+    @staticmethod
+    def _night_mask(origin, checkin, checkout):
+        start = max(0, (checkin - origin).days)
+        end = (checkout - origin).days
+        if end <= start:
+            return 0
+        return ((1 << (end - start)) - 1) << start
+
+    @classmethod
+    def _room_bits(cls, origin, intervals):
+        bits = 0
+        for checkin, checkout, _ in intervals:
+            bits |= cls._night_mask(origin, checkin, checkout)
+        return bits
+
+    def load(self, cur):
+        cur.execute("SELECT room_id, room_num, room_type, capacity, price, status FROM rooms ORDER BY room_num ASC")
+        rooms = cur.fetchall()
+        placeholders = ','.join(['%s'] * len(ACTIVE_RESERVATION_STATUSES))
+        cur.execute(f"""
+            SELECT reservation_id, room_id, checkin_date, checkout_date
+            FROM reservations
+            WHERE status IN ({placeholders})
+            ORDER BY room_id, checkin_date
+        """, ACTIVE_RESERVATION_STATUSES)
+        starts, intervals, by_reservation, longest = {}, {}, {}, {}
+        for row in cur.fetchall():
+            room_id = row['room_id']
+            checkin, checkout = as_date(row['checkin_date']), as_date(row['checkout_date'])
+            starts.setdefault(room_id, []).append(checkin)
+            intervals.setdefault(room_id, []).append((checkin, checkout, row['reservation_id']))
+            by_reservation[row['reservation_id']] = (room_id, checkin, checkout)
+            longest[room_id] = max(longest.get(room_id, timedelta(0)), checkout - checkin)
+        origin = min((iv[0][0] for iv in intervals.values()), default=date.today())
+        bitmaps = {room_id: self._room_bits(origin, room_intervals) for room_id, room_intervals in intervals.items()}
+        with self._lock:
+            self._starts, self._intervals, self._by_reservation = starts, intervals, by_reservation
+            self._longest = longest
+            self._rooms, self._bitmaps, self._origin = rooms, bitmaps, origin
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, cur):
+        with self._lock:
+            fresh = self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+        if not fresh:
+            self.load(cur)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def find_conflict(self, room_id, checkin, checkout, ignore_reservation_id=None):
+        """Devuelve el reservation_id que choca con [checkin, checkout) o None si está libre."""
+        with self._lock:
+            starts = self._starts.get(room_id)
+            if not starts:
+                return None
+            intervals = self._intervals[room_id]
+            first = bisect.bisect_left(starts, checkin - self._longest[room_id])
+            for start, end, res_id in intervals[first:bisect.bisect_left(starts, checkout)]:
+                if end > checkin and res_id != ignore_reservation_id:
+                    return res_id
+            return None
+
+    def is_free(self, room_id, checkin, checkout):
+        return self.find_conflict(room_id, checkin, checkout) is None
+
+    def available_rooms(self, checkin, checkout, room_type=None, min_capacity=None):
+        """Habitaciones (fuera de mantenimiento) libres todas las noches de [checkin, checkout)."""
+        with self._lock:
+            mask = self._night_mask(self._origin, checkin, checkout)
+            bitmaps = self._bitmaps
+            return [
+                room for room in self._rooms
+                if room['status'] != 'mantenimiento'
+                and (not room_type or room['room_type'] == room_type)
+                and (not min_capacity or room['capacity'] >= min_capacity)
+                and not bitmaps.get(room['room_id'], 0) & mask
+            ]
+
+    def add(self, reservation_id, room_id, checkin, checkout):
+        checkin, checkout = as_date(checkin), as_date(checkout)
+        with self._lock:
+            if self._loaded_at is None:
+                return  # se cargará completo en la próxima consulta
+            self._remove_locked(reservation_id)
+            starts = self._starts.setdefault(room_id, [])
+            intervals = self._intervals.setdefault(room_id, [])
+            pos = bisect.bisect_right(starts, checkin)
+            starts.insert(pos, checkin)
+            intervals.insert(pos, (checkin, checkout, reservation_id))
+            self._by_reservation[reservation_id] = (room_id, checkin, checkout)
+            self._longest[room_id] = max(self._longest.get(room_id, timedelta(0)), checkout - checkin)
+            if checkin < self._origin:
+                # Reserva anterior al origen: desplazar todos los mapas de bits
+                shift = (self._origin - checkin).days
+                self._bitmaps = {rid: bits << shift for rid, bits in self._bitmaps.items()}
+                self._origin = checkin
+            self._bitmaps[room_id] = self._bitmaps.get(room_id, 0) | self._night_mask(self._origin, checkin, checkout)
+
+    def remove(self, reservation_id):
+        with self._lock:
+            self._remove_locked(reservation_id)
+
+    def contains(self, reservation_id):
+        with self._lock:
+            return reservation_id in self._by_reservation
+
+    def _remove_locked(self, reservation_id):
+        entry = self._by_reservation.pop(reservation_id, None)
+        if entry is None:
+            return
+        room_id, checkin, checkout = entry
+        starts, intervals = self._starts[room_id], self._intervals[room_id]
+        pos = bisect.bisect_left(starts, checkin)
+        while pos < len(intervals) and intervals[pos][2] != reservation_id:
+            pos += 1
+        if pos < len(intervals):
+            del starts[pos]
+            del intervals[pos]
+        # Otra reserva activa puede ocupar alguna de esas noches: el mapa se recalcula, no se limpia
+        self._bitmaps[room_id] = self._room_bits(self._origin, intervals)
+
+availability = AvailabilityIndex(ttl=AVAILABILITY_TTL)
+invalidation_bus.subscribe(('rooms', 'reservations'), availability.invalidate)
+
+def sync_availability(res_id, status):
+    """Refleja en el índice un cambio de estado de la reserva res_id."""
+    if status in ACTIVE_RESERVATION_STATUSES:
+        # Una reserva reactivada (p. ej. cancelada -> confirmada) no está en el índice: recargar.
+        if not availability.contains(res_id):
+            availability.invalidate()
+    else:
+        availability.remove(res_id)
+
+# --- FLUJOS DE RECEPCIÓN EN UN SOLO VIAJE (check-in/out, facturación, borrados) ---
+# Cada flujo es un CALL a un procedimiento de db_init/Hotel_BD.sql que devuelve el estado
+# resultante. En bases anteriores a los procedimientos (error 1305) se usa la misma lógica
+# desde Python, dentro de transaction(); se detecta una sola vez por worker.
+
+ER_SP_DOES_NOT_EXIST = 1305
+_workflow_procedures = os.getenv('WORKFLOW_PROCEDURES', '0' if DB_BACKEND == 'sqlite' else '1') != '0'
+
+def call_workflow(cur, procedure, *args):
+    """Ejecuta CALL procedure(args). Devuelve False si hay que usar la ruta en Python."""
+    global _workflow_procedures
+    if not _workflow_procedures:
+        return False
+    try:
+        cur.execute(f"CALL {procedure}({', '.join(['%s'] * len(args))})", args)
+        return True
+    except pymysql.err.MySQLError as e:
+        if e.args and e.args[0] == ER_SP_DOES_NOT_EXIST:
+            print(f"⚠️ Procedimiento {procedure} no instalado (ver db_init/add_workflow_procedures.sql); usando SQL desde Python.")
+            _workflow_procedures = False
+            return False
+        raise
+
+def workflow_state(row):
+    """Estado de reserva y habitación tal como lo devuelven los flujos."""
+    return {
+        "reservation": {"reservation_id": row['reservation_id'], "status": row['status']},
+        "room": {"room_id": row['room_id'], "room_num": row['room_num'], "status": row['room_status']},
+    }
+
+def set_reservation_status(conn, res_id, status):
+    """Cambia el estado de la reserva y, en check-in/check-out, el de su habitación. None si no existe."""
+    with conn.cursor() as cur:
+        if call_workflow(cur, 'sp_set_reservation_status', res_id, status):
+            return cur.fetchone()
+        # UPDATE multi-tabla: una sola sentencia, atómica también en autocommit
+        cur.execute("""
+            UPDATE reservations r JOIN rooms ro ON ro.room_id = r.room_id
+            SET r.status = %s,
+                ro.status = CASE %s WHEN 'checkin' THEN 'ocupada' WHEN 'checkout' THEN 'disponible' ELSE ro.status END
+            WHERE r.reservation_id = %s
+        """, (status, status, res_id))
+        cur.execute("""
+            SELECT r.reservation_id, r.status, r.room_id, ro.room_num, ro.status AS room_status
+            FROM reservations r JOIN rooms ro ON ro.room_id = r.room_id
+            WHERE r.reservation_id = %s
+        """, (res_id,))
+        return cur.fetchone()
+
+def create_invoice(conn, res_id, total, method):
+    """
+    Factura una reserva en 'checkout' y la marca 'facturada'. Devuelve una fila con invoice_id
+    (None si no se facturó), previous_status (None si la reserva no existe) y el estado resultante.
+    """
+    with conn.cursor() as cur:
+        if call_workflow(cur, 'sp_create_invoice', res_id, total, method):
+            return cur.fetchone()
+    with transaction(conn) as cur:
+        # FOR UPDATE: dos facturaciones simultáneas de la misma reserva se serializan
+        cur.execute("SELECT status FROM reservations WHERE reservation_id = %s FOR UPDATE", (res_id,))
+        reservation = cur.fetchone()
+        previous_status = reservation['status'] if reservation else None
+        invoice_id = None
+        if previous_status == 'checkout':
+            cur.execute("""
+                INSERT INTO invoices (reservation_id, total, method, invoice_date) 
+                VALUES (%s, %s, %s, CURRENT_DATE())
+            """, (res_id, total, method))
+            invoice_id = cur.lastrowid
+            cur.execute("UPDATE reservations SET status = 'facturada' WHERE reservation_id = %s", (res_id,))
+        cur.execute("""
+            SELECT r.reservation_id, r.status, r.room_id, ro.room_num, ro.status AS room_status
+            FROM reservations r JOIN rooms ro ON ro.room_id = r.room_id
+            WHERE r.reservation_id = %s
+        """, (res_id,))
+        state = cur.fetchone() or {'reservation_id': res_id, 'status': None, 'room_id': None,
+                                   'room_num': None, 'room_status': None}
+    return dict(state, invoice_id=invoice_id, previous_status=previous_status)
+
+def delete_reservation_cascade(conn, res_id):
+    """Borra la reserva con sus servicios y facturas. True si existía."""
+    with conn.cursor() as cur:
+        if call_workflow(cur, 'sp_delete_reservation', res_id):
+            return bool(cur.fetchone()['deleted'])
+    with transaction(conn) as cur:
+        # Primero eliminamos servicios y facturas para evitar error de FK (si no hay cascade)
+        cur.execute("DELETE FROM reservation_services WHERE reservation_id=%s", (res_id,))
+        cur.execute("DELETE FROM invoices WHERE reservation_id=%s", (res_id,))
+        cur.execute("DELETE FROM reservations WHERE reservation_id=%s", (res_id,))
+        return cur.rowcount > 0
+
+def delete_client_cascade(conn, client_id):
+    """Borra el cliente con sus reservas, servicios y facturas. Devuelve (ids de reservas borradas, cliente_borrado)."""
+    with conn.cursor() as cur:
+        if call_workflow(cur, 'sp_delete_client', client_id):
+            res_ids = [r['reservation_id'] for r in cur.fetchall()]
+            cur.nextset()
+            return res_ids, bool(cur.fetchone()['client_deleted'])
+    with transaction(conn) as cur:
+        # Eliminación en cascada manual (por si la BD no tiene ON DELETE CASCADE configurado)
+        cur.execute("SELECT reservation_id FROM reservations WHERE client_id = %s FOR UPDATE", (client_id,))
+        res_ids = [r['reservation_id'] for r in cur.fetchall()]
+        if res_ids:
+            format_strings = ','.join(['%s'] * len(res_ids))
+            cur.execute(f"DELETE FROM invoices WHERE reservation_id IN ({format_strings})", tuple(res_ids))
+            cur.execute(f"DELETE FROM reservation_services WHERE reservation_id IN ({format_strings})", tuple(res_ids))
+            cur.execute(f"DELETE FROM reservations WHERE reservation_id IN ({format_strings})", tuple(res_ids))
+        cur.execute("DELETE FROM clients WHERE client_id=%s", (client_id,))
+        return res_ids, cur.rowcount > 0
+
 # --- RESERVAS (Creación, Consulta, Modificación) ---
 
 @app.route("/api/reservations", methods=["GET"])
 @require_role(['admin', 'recepcion', 'spa', 'cliente'])
 def api_get_reservations():
     client_id = request.args.get('client_id')
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page, after = get_page_args(request.args)
+    except ResponseTooLarge as e:
+        return e.response()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     search = request.args.get('q', '')
 
     conn = None
@@ -619,7 +2782,6 @@ def api_get_reservations():
         conn = get_conn()
         with conn.cursor() as cur:
             # Construcción manual de la consulta paginada debido a los JOINs
-            offset = (page - 1) * per_page
             params = []
             where_clauses = []
 
@@ -635,53 +2797,34 @@ def api_get_reservations():
                 params.append(status_filter)
             
             # Filtro de búsqueda
-            if search:
-                where_clauses.append("(r.reservation_code LIKE %s OR r.guest_name LIKE %s OR c.full_name LIKE %s)")
-                params.append(f"%{search}%")
-                params.append(f"%{search}%")
-                params.append(f"%{search}%")
-
-            where_str = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-
-            # 1. Count
-            count_sql = f"""
-                SELECT COUNT(*) as total 
-                FROM reservations r
-                JOIN clients c ON r.client_id = c.client_id
-                {where_str}
-            """
-            # Nota: params se usa dos veces, así que hacemos una copia o lo pasamos igual si no se modifica
-            cur.execute(count_sql, tuple(params))
-            total_records = cur.fetchone()['total']
-            total_pages = (total_records + per_page - 1) // per_page
-
-            # 2. Data
-            sql = f"""
-                SELECT 
+            search_clause, search_params = build_search_clause(
+                search, fulltext=["r.guest_name", "c.full_name"], prefix=["r.reservation_code"])
+            if search_clause:
+                where_clauses.append(search_clause)
+                params.extend(search_params)
+
+            result = run_paginated_query(
+                cur,
+                select_sql="""
                     r.reservation_id, r.reservation_code, r.room_id, ro.room_num, 
                     COALESCE(r.guest_name, c.full_name) as guest_name, r.guest_email, 
                     r.checkin_date, r.checkout_date, r.total, r.status,
                     c.full_name AS client_name
-                FROM reservations r
-                JOIN rooms ro ON r.room_id = ro.room_id
-                JOIN clients c ON r.client_id = c.client_id
-                {where_str}
-                ORDER BY r.reservation_id DESC
-                LIMIT %s OFFSET %s
-                """
-            params.append(per_page)
-            params.append(offset)
-
-            cur.execute(sql, tuple(params))
-            results = cur.fetchall()
-
-            return jsonify({
-                "data": results,
-                "total": total_records,
-                "page": page,
-                "per_page": per_page,
-                "pages": total_pages
-            })
+                """,
+                from_sql="""
+                    FROM reservations r
+                    JOIN rooms ro ON r.room_id = ro.room_id
+                    JOIN clients c ON r.client_id = c.client_id
+                """,
+                count_from_sql="FROM reservations r JOIN clients c ON r.client_id = c.client_id",
+                where_clauses=where_clauses,
+                params=params,
+                order_by="r.reservation_id DESC",
+                page=page,
+                per_page=per_page,
+                after=after
+            )
+            return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -693,32 +2836,33 @@ def api_create_reservation():
     data = request.json
     conn = None
     try:
+        # Se asegura de manejar la resta de fechas para calcular los días
+        checkin = datetime.strptime(data['checkin_date'], '%Y-%m-%d')
+        checkout = datetime.strptime(data['checkout_date'], '%Y-%m-%d')
+        if checkout <= checkin:
+            return jsonify({"error": "La fecha de salida debe ser posterior a la de entrada."}), 400
+        num_days = (checkout - checkin).days
+        room_id = int(data['room_id'])
+
+        # Obtener nombre del huésped si no se proporciona
+        guest_name = data.get('guest_name')
+        guest_email = data.get('guest_email')
+        guest_phone = data.get('guest_phone')
+
+        # Validaciones de huésped
+        if guest_email and not validate_email(guest_email):
+            return jsonify({"error": "Formato de email de huésped inválido"}), 400
+        if guest_phone and not validate_phone(guest_phone):
+            return jsonify({"error": "El teléfono de huésped debe contener solo números"}), 400
+
         conn = get_conn()
         with conn.cursor() as cur:
-            # 1. Obtener el precio de la habitación para calcular el total inicial
-            cur.execute("SELECT price FROM rooms WHERE room_id = %s", (data['room_id'],))
-            room = cur.fetchone()
-            if not room:
-                return jsonify({"error": "Habitación no válida."}), 400
-            
-            # Cálculo simple
-            price = room['price']
-            # Se asegura de manejar la resta de fechas para calcular los días
-            checkin = datetime.strptime(data['checkin_date'], '%Y-%m-%d')
-            checkout = datetime.strptime(data['checkout_date'], '%Y-%m-%d')
-            num_days = max(1, (checkout - checkin).days)
-            total = price * num_days
-
-            # Obtener nombre del huésped si no se proporciona
-            guest_name = data.get('guest_name')
-            guest_email = data.get('guest_email')
-            guest_phone = data.get('guest_phone')
-
-            # Validaciones de huésped
-            if guest_email and not validate_email(guest_email):
-                return jsonify({"error": "Formato de email de huésped inválido"}), 400
-            if guest_phone and not validate_phone(guest_phone):
-                return jsonify({"error": "El teléfono de huésped debe contener solo números"}), 400
+            # 1. Rechazo rápido con el índice de disponibilidad (sin escanear reservas)
+            availability.ensure_loaded(cur)
+            conflict = availability.find_conflict(room_id, checkin.date(), checkout.date())
+            if conflict:
+                return jsonify({"error": "La habitación no está disponible para las fechas seleccionadas.",
+                                "conflict_reservation_id": conflict}), 409
 
             if not guest_name:
                 cur.execute("SELECT full_name FROM clients WHERE client_id = %s", (data['client_id'],))
@@ -728,23 +2872,54 @@ def api_create_reservation():
                 else:
                     return jsonify({"error": "Cliente no encontrado."}), 400
 
+        with transaction(conn) as cur:
+            # 2. Bloquear la fila de la habitación: serializa las reservas concurrentes
+            #    de la misma habitación (también entre workers) hasta el COMMIT.
+            cur.execute("SELECT price FROM rooms WHERE room_id = %s FOR UPDATE", (room_id,))
+            room = cur.fetchone()
+            if not room:
+                return jsonify({"error": "Habitación no válida."}), 400
+
+            # 3. Verificación definitiva contra la BD (el índice de este worker puede estar desfasado)
+            #    Equivale a DATE(checkin_date) < salida y DATE(checkout_date) > entrada, pero sin
+            #    envolver las columnas en DATE() para que se use idx_res_room_dates.
+            placeholders = ','.join(['%s'] * len(ACTIVE_RESERVATION_STATUSES))
+            cur.execute(f"""
+                SELECT reservation_id FROM reservations
+                WHERE room_id = %s AND status IN ({placeholders})
+                AND checkin_date < %s AND checkout_date >= %s
+                LIMIT 1
+            """, (room_id, *ACTIVE_RESERVATION_STATUSES, checkout, checkin + timedelta(days=1)))
+            clash = cur.fetchone()
+            if clash:
+                availability.invalidate()
+                return jsonify({"error": "La habitación no está disponible para las fechas seleccionadas.",
+                                "conflict_reservation_id": clash['reservation_id']}), 409
+
+            # Cálculo simple
+            price = room['price']
+            total = price * num_days
+
             # Generate reservation code
             reservation_code = f"R-{uuid.uuid4().hex[:8].upper()}"
             
             cur.execute("""
                 INSERT INTO reservations (reservation_code, client_id, room_id, guest_name, guest_email, guest_phone, checkin_date, checkout_date, total, status) 
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'reservada')
-                """, (reservation_code, data['client_id'], data['room_id'], guest_name, data.get('guest_email'), data.get('guest_phone'), 
-                      data['checkin_date'], data['checkout_date'], total))
+                """, (reservation_code, data['client_id'], room_id, guest_name, data.get('guest_email'), data.get('guest_phone'), 
+                      checkin, checkout, total))
             
             reservation_id = cur.lastrowid
-            
-            return jsonify({
-                "message": "Reserva creada exitosamente", 
-                "reservation_id": reservation_id,
-                "reservation_code": reservation_code,
-                "total_estimado": total
-            }), 201
+
+        availability.add(reservation_id, room_id, checkin, checkout)
+        dashboard_counters.apply(active_reservations=1)
+        
+        return jsonify({
+            "message": "Reserva creada exitosamente", 
+            "reservation_id": reservation_id,
+            "reservation_code": reservation_code,
+            "total_estimado": total
+        }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -757,33 +2932,19 @@ def api_update_reservation(res_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
-            status_to_update = data.get('status')
-            
-            # Nota: 'facturada' se actualiza desde la ruta de facturación, pero la mantenemos aquí también.
-            if status_to_update in ['confirmada', 'checkin', 'checkout', 'cancelada', 'facturada']: 
-                cur.execute("UPDATE reservations SET status=%s WHERE reservation_id=%s",
-                            (status_to_update, res_id))
-                
-                # Actualizar estado de la habitación
-                if status_to_update == 'checkin':
-                    # Obtener room_id de la reserva
-                    cur.execute("SELECT room_id FROM reservations WHERE reservation_id=%s", (res_id,))
-                    res = cur.fetchone()
-                    if res:
-                        cur.execute("UPDATE rooms SET status='ocupada' WHERE room_id=%s", (res['room_id'],))
-                elif status_to_update == 'checkout':
-                    cur.execute("SELECT room_id FROM reservations WHERE reservation_id=%s", (res_id,))
-                    res = cur.fetchone()
-                    if res:
-                        cur.execute("UPDATE rooms SET status='disponible' WHERE room_id=%s", (res['room_id'],))
-
-            else:
-                 return jsonify({"error": "Estado de reserva no válido."}), 400
-            
-            if cur.rowcount == 0:
-                return jsonify({"error": "Reserva no encontrada"}), 404
-            return jsonify({"message": "Reserva actualizada"}), 200
+        status_to_update = data.get('status')
+        
+        # Nota: 'facturada' se actualiza desde la ruta de facturación, pero la mantenemos aquí también.
+        if status_to_update not in ['confirmada', 'checkin', 'checkout', 'cancelada', 'facturada']:
+            return jsonify({"error": "Estado de reserva no válido."}), 400
+
+        # Reserva + habitación (ocupada en checkin, disponible en checkout) en un solo viaje
+        state = set_reservation_status(conn, res_id, status_to_update)
+        if not state:
+            return jsonify({"error": "Reserva no encontrada"}), 404
+        sync_availability(res_id, status_to_update)
+        dashboard_counters.invalidate()  # el estado anterior (y el de la habitación) no se conoce aquí
+        return jsonify({"message": "Reserva actualizada", **workflow_state(state)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -795,16 +2956,11 @@ def api_delete_reservation(res_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
-            # Primero eliminamos servicios asociados para evitar error de FK (si no hay cascade)
-            cur.execute("DELETE FROM reservation_services WHERE reservation_id=%s", (res_id,))
-            # Eliminamos facturas asociadas? Mejor no, o sí. Asumamos que sí para limpiar.
-            cur.execute("DELETE FROM invoices WHERE reservation_id=%s", (res_id,))
-            
-            cur.execute("DELETE FROM reservations WHERE reservation_id=%s", (res_id,))
-            if cur.rowcount == 0:
-                return jsonify({"error": "Reserva no encontrada"}), 404
-            return jsonify({"message": "Reserva eliminada"}), 200
+        if not delete_reservation_cascade(conn, res_id):
+            return jsonify({"error": "Reserva no encontrada"}), 404
+        availability.remove(res_id)
+        dashboard_counters.invalidate()
+        return jsonify({"message": "Reserva eliminada"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -825,7 +2981,7 @@ def api_add_reservation_service(res_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
+        with transaction(conn) as cur:
             # 1. Validar Reserva y Fechas
             cur.execute("SELECT client_id, checkin_date, checkout_date, status FROM reservations WHERE reservation_id = %s", (res_id,))
             res = cur.fetchone()
@@ -851,8 +3007,9 @@ def api_add_reservation_service(res_id):
             if not (checkin <= service_date <= checkout):
                 return jsonify({"error": f"La fecha del servicio debe estar entre {checkin} y {checkout}."}), 400
 
-            # 2. Obtener precio actual del servicio
-            cur.execute("SELECT price FROM services WHERE service_id = %s", (service_id,))
+            # 2. Obtener precio actual del servicio (de la BD, no del catálogo en memoria:
+            #    lo que se cobra no puede venir de una copia con hasta CATALOG_TTL de atraso)
+            cur.execute("SELECT price FROM services WHERE service_id = %s FOR UPDATE", (service_id,))
             service = cur.fetchone()
             if not service:
                 return jsonify({"error": "Servicio no válido."}), 400
@@ -879,71 +3036,52 @@ def api_add_reservation_service(res_id):
 @app.route("/api/reservation_services", methods=["GET"])
 @require_role(['admin', 'recepcion', 'spa'])
 def api_get_reservation_services():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    try:
+        page, per_page, after = get_page_args(request.args)
+    except ResponseTooLarge as e:
+        return e.response()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     search = request.args.get('q', '')
 
     conn = None
     try:
         conn = get_conn()
         with conn.cursor() as cur:
-            offset = (page - 1) * per_page
             params = []
             where_clauses = []
 
-            if search:
-                where_clauses.append("(c.full_name LIKE %s OR s.name LIKE %s OR ro.room_num LIKE %s)")
-                params.append(f"%{search}%")
-                params.append(f"%{search}%")
-                params.append(f"%{search}%")
-            
-            where_str = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+            search_clause, search_params = build_search_clause(
+                search, fulltext=["c.full_name", "s.name"], prefix=["ro.room_num"])
+            if search_clause:
+                where_clauses.append(search_clause)
+                params.extend(search_params)
 
-            # Count
-            count_sql = f"""
-                SELECT COUNT(*) as total 
-                FROM reservation_services rs
-                JOIN reservations r ON rs.reservation_id = r.reservation_id
-                JOIN clients c ON r.client_id = c.client_id
-                JOIN rooms ro ON r.room_id = ro.room_id
-                JOIN services s ON rs.service_id = s.service_id
-                {where_str}
-            """
-            cur.execute(count_sql, tuple(params))
-            total_records = cur.fetchone()['total']
-            total_pages = (total_records + per_page - 1) // per_page
-
-            # Data
-            sql = f"""
-                SELECT 
+            result = run_paginated_query(
+                cur,
+                select_sql="""
                     rs.reservation_service_id, rs.service_date, rs.quantity, rs.unit_price, 
                     (rs.quantity * rs.unit_price) as line_total,
                     s.name as service_name,
                     c.full_name as client_name,
                     ro.room_num,
                     r.reservation_code
-                FROM reservation_services rs
-                JOIN reservations r ON rs.reservation_id = r.reservation_id
-                JOIN clients c ON r.client_id = c.client_id
-                JOIN rooms ro ON r.room_id = ro.room_id
-                JOIN services s ON rs.service_id = s.service_id
-                {where_str}
-                ORDER BY rs.service_date DESC, rs.reservation_service_id DESC
-                LIMIT %s OFFSET %s
-            """
-            params.append(per_page)
-            params.append(offset)
-            
-            cur.execute(sql, tuple(params))
-            results = cur.fetchall()
-
-            return jsonify({
-                "data": results,
-                "total": total_records,
-                "page": page,
-                "per_page": per_page,
-                "pages": total_pages
-            })
+                """,
+                from_sql="""
+                    FROM reservation_services rs
+                    JOIN reservations r ON rs.reservation_id = r.reservation_id
+                    JOIN clients c ON r.client_id = c.client_id
+                    JOIN rooms ro ON r.room_id = ro.room_id
+                    JOIN services s ON rs.service_id = s.service_id
+                """,
+                where_clauses=where_clauses,
+                params=params,
+                order_by="rs.service_date DESC, rs.reservation_service_id DESC",
+                page=page,
+                per_page=per_page,
+                after=after
+            )
+            return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -964,7 +3102,9 @@ def api_get_client_active_reservations(client_id):
                 WHERE r.client_id = %s AND r.status IN ('reservada', 'confirmada', 'checkin')
                 ORDER BY r.checkin_date DESC
             """, (client_id,))
-            return jsonify(cur.fetchall())
+            return jsonify(fetch_limited(cur))
+    except ResponseTooLarge as e:
+        return e.response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -973,6 +3113,7 @@ def api_get_client_active_reservations(client_id):
 # --- NUEVA RUTA PARA RESERVAS ELEGIBLES PARA FACTURACIÓN ---
 @app.route("/api/reservations/eligible_for_invoice", methods=["GET"])
 @require_role(['admin', 'recepcion'])
+@shared_cache(ttl=30, tables=('reservations', 'clients', 'rooms'))
 def api_get_eligible_reservations():
     conn = None
     try:
@@ -992,7 +3133,9 @@ def api_get_eligible_reservations():
                 ORDER BY r.checkin_date DESC
             """
             cur.execute(sql)
-            return jsonify(cur.fetchall())
+            return jsonify(fetch_limited(cur))
+    except ResponseTooLarge as e:
+        return e.response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1009,76 +3152,53 @@ def manage_invoices(invoice_id=None):
         with conn.cursor() as cur:
             # GET: Obtener todas las facturas (Paginado)
             if request.method == 'GET' and invoice_id is None:
-                page = int(request.args.get('page', 1))
-                per_page = int(request.args.get('per_page', 10))
+                try:
+                    page, per_page, after = get_page_args(request.args)
+                except ResponseTooLarge as e:
+                    return e.response()
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
                 search = request.args.get('q', '')
 
-                # Construcción manual para JOINs si quisiéramos buscar por nombre de cliente, 
-                # pero invoices no tiene client_id directo (está en reservations).
-                # Haremos un JOIN simple.
-                
-                offset = (page - 1) * per_page
                 params = []
                 where_clauses = []
 
-                if search:
-                    # Buscamos por ID de factura o ID de reserva (convertidos a string)
-                    where_clauses.append("(invoice_id LIKE %s OR reservation_id LIKE %s)")
-                    params.append(f"%{search}%")
-                    params.append(f"%{search}%")
-                
-                where_str = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-
-                # Count
-                cur.execute(f"SELECT COUNT(*) as total FROM invoices {where_str}", tuple(params))
-                total_records = cur.fetchone()['total']
-                total_pages = (total_records + per_page - 1) // per_page
-
-                # Data
-                sql = f"SELECT * FROM invoices {where_str} ORDER BY invoice_date DESC LIMIT %s OFFSET %s"
-                params.append(per_page)
-                params.append(offset)
-                
-                cur.execute(sql, tuple(params))
-                results = cur.fetchall()
-
-                return jsonify({
-                    "data": results,
-                    "total": total_records,
-                    "page": page,
-                    "per_page": per_page,
-                    "pages": total_pages
-                })
+                # Buscamos por ID de factura o ID de reserva (subcadena, como siempre)
+                search_clause, search_params = build_search_clause(search, contains=["invoice_id", "reservation_id"])
+                if search_clause:
+                    where_clauses.append(search_clause)
+                    params.extend(search_params)
+
+                # invoice_id desempata las facturas del mismo día (orden estable para el cursor)
+                result = run_paginated_query(
+                    cur, "*", "FROM invoices", where_clauses, params,
+                    order_by="invoice_date DESC, invoice_id DESC",
+                    page=page, per_page=per_page, after=after
+                )
+                return jsonify(result)
             
             # POST: Crear nueva factura (para reservas en estado 'checkout')
             if request.method == 'POST':
                 data = request.json
                 res_id = data.get('reservation_id')
                 
-                # 1. VERIFICAR ESTADO Y PREVENCIÓN DE DOBLE FACTURACIÓN
-                cur.execute("SELECT status FROM reservations WHERE reservation_id = %s", (res_id,))
-                reservation = cur.fetchone()
+                # Verificación de estado, factura y cambio a 'facturada' en un solo viaje
+                result = create_invoice(conn, res_id, data['total'], data['method'])
+                previous_status = result['previous_status']
 
-                if not reservation:
+                # PREVENCIÓN DE DOBLE FACTURACIÓN
+                if previous_status is None:
                     return jsonify({"error": f"Reserva {res_id} no encontrada."}), 404
 
-                if reservation['status'] == 'facturada':
+                if previous_status == 'facturada':
                     return jsonify({"error": f"La Reserva {res_id} ya ha sido Facturada."}), 400
 
-                if reservation['status'] != 'checkout':
-                    return jsonify({"error": f"Solo se puede Facturar una reserva en estado 'checkout'. Estado actual: {reservation['status'].upper()}."}), 400
-
-                # 2. CREAR LA FACTURA
-                cur.execute("""
-                    INSERT INTO invoices (reservation_id, total, method, invoice_date) 
-                    VALUES (%s, %s, %s, CURRENT_DATE())
-                """, (res_id, data['total'], data['method']))
-                invoice_id = cur.lastrowid
-                
-                # 3. ACTUALIZAR EL ESTADO DE LA RESERVA
-                cur.execute("UPDATE reservations SET status = 'facturada' WHERE reservation_id = %s", (res_id,))
+                if previous_status != 'checkout':
+                    return jsonify({"error": f"Solo se puede Facturar una reserva en estado 'checkout'. Estado actual: {previous_status.upper()}."}), 400
 
-                return jsonify({"message": "Factura generada y reserva actualizada", "invoice_id": invoice_id}), 201
+                dashboard_counters.apply(total_income=Decimal(str(data['total'])))
+                return jsonify({"message": "Factura generada y reserva actualizada", "invoice_id": result['invoice_id'],
+                                **workflow_state(result)}), 201
 
             # PUT: Actualizar factura (CORRECCIÓN DEL ERROR 1292)
             if request.method == 'PUT' and invoice_id is not None:
@@ -1101,6 +3221,7 @@ def manage_invoices(invoice_id=None):
                 
                 if cur.rowcount == 0:
                     return jsonify({"error": "Factura no encontrada"}), 404
+                dashboard_counters.invalidate()
                 return jsonify({"message": "Factura actualizada"}), 200
 
             # DELETE: Eliminar factura
@@ -1110,6 +3231,7 @@ def manage_invoices(invoice_id=None):
                 
                 if cur.rowcount == 0:
                     return jsonify({"error": "Factura no encontrada"}), 404
+                dashboard_counters.invalidate()
                 return jsonify({"message": "Factura eliminada"}), 200
             
             # GET: Obtener una sola factura (si es necesario)
@@ -1128,60 +3250,143 @@ def manage_invoices(invoice_id=None):
 
 
 
+# --- ESTADO DEL POOL DE CONEXIONES (por worker) ---
+@app.route("/api/admin/db_pool", methods=["GET"])
+@require_role(['admin'])
+def api_db_pool_stats():
+    stats = db_pool.stats()
+    stats["pid"] = os.getpid()
+    stats["backend"] = DB_BACKEND
+    stats["heavy_reports"] = heavy_reports.stats()
+    return jsonify(stats)
+
+# --- PERFILES CAPTURADOS ---
+@app.route("/api/admin/profiles", methods=["GET"])
+@require_role(['admin'])
+def api_list_profiles():
+    summary_keys = ("profile_id", "created_at", "pid", "method", "route", "path", "status", "ms", "db_ms", "queries", "samples")
+    return jsonify([{key: capture.get(key) for key in summary_keys} for capture in profiler.list()])
+
+@app.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+@require_role(['admin'])
+def api_get_profile(profile_id):
+    capture = profiler.load(profile_id)
+    if capture is None:
+        return jsonify({"error": "Perfil no encontrado"}), 404
+    capture["collapsed"] = f"/api/admin/profiles/{profile_id}/collapsed"
+    return jsonify(capture)
+
+@app.route("/api/admin/profiles/<profile_id>/collapsed", methods=["GET"])
+@require_role(['admin'])
+def api_get_profile_collapsed(profile_id):
+    if profiler.load(profile_id) is None:
+        return jsonify({"error": "Perfil no encontrado"}), 404
+    return send_file(profiler.path(profile_id, 'collapsed'), mimetype='text/plain')
+
+# --- ESTADO DE LAS CACHÉS EN MEMORIA (por worker) ---
+@app.route("/api/admin/caches", methods=["GET"])
+@require_role(['admin'])
+def api_cache_stats():
+    return jsonify({
+        "pid": os.getpid(),
+        "catalogs": {"rooms": rooms_catalog.stats(), "services": services_catalog.stats()},
+        "counts": count_cache.stats(),
+        "invalidation_bus": invalidation_bus.stats(),
+        "responses": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+    })
+
 # --- DASHBOARD METRICS ---
+# Los contadores del dashboard se mantienen en memoria: se cargan con UNA consulta,
+# las rutas de escritura los ajustan con deltas (alta de cliente, reserva, factura...)
+# o los marcan para recarga cuando el cambio no se puede calcular sin consultar,
+# y se reconcilian con la BD cada DASHBOARD_RECONCILE_SECONDS (también recogen así
+# los cambios hechos por otros workers). Leer el dashboard es O(1).
+DASHBOARD_RECONCILE_SECONDS = int(os.environ.get("DASHBOARD_RECONCILE_SECONDS", 30))
+
+DASHBOARD_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM reservations WHERE status IN ('reservada', 'confirmada', 'checkin')) AS active_reservations,
+        (SELECT COALESCE(SUM(total), 0) FROM invoices) AS total_income,
+        (SELECT COUNT(*) FROM clients) AS total_clients,
+        COUNT(*) AS total_rooms,
+        COALESCE(SUM(status = 'mantenimiento'), 0) AS maintenance_rooms,
+        COALESCE(SUM(status = 'ocupada'), 0) AS occupied_rooms,
+        COALESCE(SUM(status = 'disponible'), 0) AS available_rooms
+    FROM rooms
+"""
+
+class DashboardCounters:
+    def __init__(self, reconcile_seconds):
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._values = None
+        self._loaded_at = 0.0
+        self._generation = 0  # cambia con cada delta/invalidación
+        self.reloads = 0
+
+    def snapshot(self, cur):
+        with self._lock:
+            if self._values is not None and time.monotonic() - self._loaded_at < self.reconcile_seconds:
+                return dict(self._values)
+            generation = self._generation
+        cur.execute(DASHBOARD_SQL)
+        row = cur.fetchone()
+        values = {key: (row[key] if key == 'total_income' else int(row[key] or 0)) for key in row}
+        with self._lock:
+            self.reloads += 1
+            # Si hubo escrituras mientras se consultaba, la próxima lectura vuelve a reconciliar
+            self._values = values
+            self._loaded_at = time.monotonic() if generation == self._generation else 0.0
+        return dict(values)
+
+    def apply(self, **deltas):
+        with self._lock:
+            self._generation += 1
+            if self._values is None:
+                return
+            for key, delta in deltas.items():
+                self._values[key] += delta
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._values = None
+
+dashboard_counters = DashboardCounters(DASHBOARD_RECONCILE_SECONDS)
+invalidation_bus.subscribe(('clients', 'rooms', 'reservations', 'invoices'), dashboard_counters.invalidate)
+
 @app.route("/api/dashboard", methods=["GET"])
 @require_role(['admin', 'recepcion'])
+@shared_cache(ttl=DASHBOARD_RECONCILE_SECONDS, tables=('clients', 'rooms', 'reservations', 'invoices'))
+@coalesce_requests
 def api_dashboard():
     conn = None
     try:
         conn = get_conn()
         with conn.cursor() as cur:
-            # 1. Reservas Activas (reservada, confirmada, checkin)
-            cur.execute("SELECT COUNT(*) as count FROM reservations WHERE status IN ('reservada', 'confirmada', 'checkin')")
-            active_reservations = cur.fetchone()['count']
-
-            # 2. Total Ingresos (suma de facturas)
-            cur.execute("SELECT SUM(total) as total FROM invoices")
-            res_income = cur.fetchone()
-            total_income = res_income['total'] if res_income['total'] else 0
-
-            # 3. Total Clientes
-            cur.execute("SELECT COUNT(*) as count FROM clients")
-            total_clients = cur.fetchone()['count']
-
-            # 4. Habitaciones (Total, Mantenimiento, Ocupadas, Disponibles)
-            cur.execute("SELECT COUNT(*) as count FROM rooms")
-            total_rooms = cur.fetchone()['count']
-
-            cur.execute("SELECT COUNT(*) as count FROM rooms WHERE status='mantenimiento'")
-            maintenance_rooms = cur.fetchone()['count']
-
-            cur.execute("SELECT COUNT(*) as count FROM rooms WHERE status='ocupada'")
-            occupied_rooms = cur.fetchone()['count']
-
-            cur.execute("SELECT COUNT(*) as count FROM rooms WHERE status='disponible'")
-            available_rooms = cur.fetchone()['count']
-
-            # 5. Ocupación %
-            occupancy_rate = 0
-            if total_rooms > 0:
-                occupancy_rate = round((occupied_rooms / total_rooms) * 100, 1)
-
-            return jsonify({
-                "active_reservations": active_reservations,
-                "total_income": total_income,
-                "total_clients": total_clients,
-                "occupancy_rate": occupancy_rate,
-                "total_rooms": total_rooms,
-                "maintenance_rooms": maintenance_rooms,
-                "occupied_rooms": occupied_rooms,
-                "available_rooms": available_rooms
-            })
+            stats = dashboard_counters.snapshot(cur)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn: conn.close()
 
+    # Ocupación %
+    occupancy_rate = 0
+    if stats['total_rooms'] > 0:
+        occupancy_rate = round((stats['occupied_rooms'] / stats['total_rooms']) * 100, 1)
+
+    return jsonify({
+        "active_reservations": stats['active_reservations'],
+        "total_income": stats['total_income'],
+        "total_clients": stats['total_clients'],
+        "occupancy_rate": occupancy_rate,
+        "total_rooms": stats['total_rooms'],
+        "maintenance_rooms": stats['maintenance_rooms'],
+        "occupied_rooms": stats['occupied_rooms'],
+        "available_rooms": stats['available_rooms']
+    })
+
 # NUEVO: Actualizar reserva de servicio (PUT)
 @app.route("/api/reservation_services/<int:rs_id>", methods=["PUT"])
 @require_role(['admin', 'recepcion', 'spa'])
@@ -1193,7 +3398,7 @@ def api_update_reservation_service(rs_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
+        with transaction(conn) as cur:
             # Obtener datos actuales
             cur.execute("SELECT reservation_id, quantity, unit_price FROM reservation_services WHERE reservation_service_id = %s", (rs_id,))
             current = cur.fetchone()
@@ -1232,7 +3437,7 @@ def api_delete_reservation_service(rs_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
+        with transaction(conn) as cur:
             # Obtener datos para restar total
             cur.execute("SELECT reservation_id, quantity, unit_price FROM reservation_services WHERE reservation_service_id = %s", (rs_id,))
             current = cur.fetchone()
@@ -1274,8 +3479,9 @@ def api_my_reservations():
                 WHERE r.client_id = %s
                 ORDER BY r.checkin_date DESC
             """, (client_id,))
-            reservations = cur.fetchall()
-            return jsonify(reservations)
+            return jsonify(fetch_limited(cur))
+    except ResponseTooLarge as e:
+        return e.response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1301,8 +3507,9 @@ def api_my_reservation_services():
                 WHERE r.client_id = %s
                 ORDER BY rs.service_date DESC
             """, (client_id,))
-            services = cur.fetchall()
-            return jsonify(services)
+            return jsonify(fetch_limited(cur))
+    except ResponseTooLarge as e:
+        return e.response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1318,8 +3525,8 @@ def api_cancel_reservation(res_id):
     conn = None
     try:
         conn = get_conn()
-        with conn.cursor() as cur:
-            cur.execute("SELECT status, client_id FROM reservations WHERE reservation_id = %s", (res_id,))
+        with transaction(conn) as cur:
+            cur.execute("SELECT status, client_id FROM reservations WHERE reservation_id = %s FOR UPDATE", (res_id,))
             res = cur.fetchone()
             if not res:
                 return jsonify({"error": "Reserva no encontrada"}), 404
@@ -1334,7 +3541,12 @@ def api_cancel_reservation(res_id):
                     return jsonify({"error": "Solo se pueden cancelar reservas en estado 'reservada'."}), 400
 
             cur.execute("UPDATE reservations SET status = 'cancelada' WHERE reservation_id = %s", (res_id,))
-            return jsonify({"message": "Reserva cancelada exitosamente"}), 200
+
+        # Índice y contadores solo después del COMMIT
+        availability.remove(res_id)
+        if res['status'] in ACTIVE_RESERVATION_STATUSES:
+            dashboard_counters.apply(active_reservations=-1)
+        return jsonify({"message": "Reserva cancelada exitosamente"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1359,8 +3571,10 @@ def api_daily_ops():
                 WHERE r.checkin_date = %s OR r.checkout_date = %s
                 ORDER BY r.checkin_date ASC
             """, (today, today))
-            ops = cur.fetchall()
+            ops = fetch_limited(cur)
             return jsonify(ops)
+    except ResponseTooLarge as e:
+        return e.response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1387,129 +3601,252 @@ def api_in_house_guests():
             """
             params = []
             
-            if search:
-                sql += " AND (r.guest_name LIKE %s OR ro.room_num LIKE %s OR r.reservation_code LIKE %s)"
-                params.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
+            search_clause, search_params = build_search_clause(
+                search, fulltext=["r.guest_name"], prefix=["ro.room_num", "r.reservation_code"])
+            if search_clause:
+                sql += " AND " + search_clause
+                params.extend(search_params)
             
             sql += " ORDER BY ro.room_num ASC"
             
             cur.execute(sql, tuple(params))
-            guests = cur.fetchall()
+            guests = fetch_limited(cur)
             return jsonify(guests)
+    except ResponseTooLarge as e:
+        return e.response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn: conn.close()
 
+# --- CONTROL DE ADMISIÓN DE REPORTES PESADOS ---
+# Como mucho REPORT_CONCURRENCY reportes a la vez, sumando todos los workers, comparten la BD
+# con la recepción; uno más espera hasta REPORT_QUEUE_SECONDS por un hueco y, si no lo hay,
+# recibe 503 con Retry-After. En un export en streaming el hueco se libera al terminar el envío.
+# Los huecos son filas en el archivo de la caché de respuestas (RESPONSE_CACHE_PATH); si no
+# está disponible, el límite pasa a ser por worker.
+REPORT_CONCURRENCY = int(os.environ.get("REPORT_CONCURRENCY", 2))
+REPORT_QUEUE_SECONDS = float(os.environ.get("REPORT_QUEUE_SECONDS", 2))
+REPORT_RETRY_AFTER = int(os.environ.get("REPORT_RETRY_AFTER", 15))
+
+class AdmissionLimiter:
+    LOCAL = "local"   # token de un hueco del semáforo de este worker
+
+    def __init__(self, name, slots, queue_seconds, shared=None):
+        self.name = name
+        self.slots = slots
+        self.queue_seconds = queue_seconds
+        self.shared = shared
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self.active = 0          # de este worker
+        self.admitted = 0
+        self.rejected = 0
+
+    def _claim(self, token, deadline):
+        delay = 0.01
+        while True:
+            claimed = self.shared.claim_slot(self.name, self.slots, token) if self.shared else None
+            if claimed is None:
+                remaining = max(0, deadline - time.monotonic())
+                return self.LOCAL if self._semaphore.acquire(timeout=remaining) else None
+            if claimed:
+                return token
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.1)
+
+    def acquire(self):
+        """Token para release() o None si no hubo hueco en queue_seconds."""
+        token = self._claim(f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}",
+                            time.monotonic() + self.queue_seconds)
+        with self._lock:
+            if token is None:
+                self.rejected += 1
+                return None
+            self.active += 1
+            self.admitted += 1
+        return token
+
+    def release(self, token):
+        with self._lock:
+            self.active -= 1
+        if token == self.LOCAL:
+            self._semaphore.release()
+        else:
+            self.shared.free_slot(self.name, token)
+
+    def stats(self):
+        with self._lock:
+            return {"slots": self.slots, "active": self.active,
+                    "admitted": self.admitted, "rejected": self.rejected}
+
+heavy_reports = AdmissionLimiter("heavy_reports", REPORT_CONCURRENCY, REPORT_QUEUE_SECONDS, shared=response_cache)
+
+def heavy_report(f):
+    """Decorador para rutas de reportes: pasa por el control de admisión."""
+    def wrapper(*args, **kwargs):
+        token = heavy_reports.acquire()
+        if token is None:
+            response = jsonify({"error": "Hay demasiados reportes en curso. Intente de nuevo en unos segundos.",
+                                "retry_after": REPORT_RETRY_AFTER})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(REPORT_RETRY_AFTER)
+            return response
+        try:
+            response = make_response(f(*args, **kwargs))
+        except BaseException:
+            heavy_reports.release(token)
+            raise
+        if response.is_streamed:
+            response.call_on_close(lambda: heavy_reports.release(token))
+        else:
+            heavy_reports.release(token)
+        return response
+    wrapper.__name__ = f.__name__
+    return wrapper
+
 # --- ENDPOINT DE REPORTES (CSV) ---
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))  # filas por bloque enviado al cliente
+
+# Tipo de reporte -> (consulta, encabezados)
+EXPORT_REPORTS = {
+    # Reporte de Reservas Detalladas
+    'reservations': ("""
+        SELECT 
+            r.reservation_code, 
+            c.full_name as client_name, 
+            ro.room_num, 
+            r.checkin_date, 
+            r.checkout_date, 
+            r.total, 
+            r.status 
+        FROM reservations r
+        JOIN clients c ON r.client_id = c.client_id
+        JOIN rooms ro ON r.room_id = ro.room_id
+        ORDER BY r.checkin_date DESC
+    """, ['Código', 'Cliente', 'Habitación', 'Check-in', 'Check-out', 'Total', 'Estado']),
+
+    # Reporte de Ventas de Servicios
+    'services': ("""
+        SELECT 
+            rs.added_at as fecha_venta,
+            s.name as servicio,
+            rs.quantity,
+            rs.unit_price,
+            (rs.quantity * rs.unit_price) as subtotal,
+            r.reservation_code,
+            c.full_name as cliente
+        FROM reservation_services rs
+        JOIN services s ON rs.service_id = s.service_id
+        JOIN reservations r ON rs.reservation_id = r.reservation_id
+        JOIN clients c ON r.client_id = c.client_id
+        ORDER BY rs.added_at DESC
+    """, ['Fecha Venta', 'Servicio', 'Cantidad', 'Precio Unit.', 'Subtotal', 'Reserva', 'Cliente']),
+
+    # Reporte de Facturación por Cliente
+    'invoices_clients': ("""
+        SELECT 
+            i.invoice_code,
+            i.invoice_date,
+            i.total,
+            i.method,
+            c.full_name as client_name,
+            c.email,
+            r.reservation_code
+        FROM invoices i
+        JOIN reservations r ON i.reservation_id = r.reservation_id
+        JOIN clients c ON r.client_id = c.client_id
+        ORDER BY i.invoice_date DESC
+    """, ['Código Factura', 'Fecha', 'Total', 'Método Pago', 'Cliente', 'Email', 'Reserva']),
+}
+
+def iter_csv_rows(cur, headers, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Genera el CSV por bloques a partir de un cursor ya ejecutado. Los acentos se
+    quitan fila por fila, así que la memoria no depende del tamaño del reporte.
+    """
+    si = io.StringIO()
+    cw = csv.writer(si)
+    
+    # Sanitize headers
+    cw.writerow([remove_accents(h) for h in headers])
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        for row in rows:
+            # Sanitize values (remove_accents deja intactos los valores que no son texto)
+            cw.writerow(map(remove_accents, row.values()))
+        yield si.getvalue()
+        si.seek(0)
+        si.truncate(0)
+    if si.tell():
+        yield si.getvalue()
+
+class StreamedQuery:
+    """
+    Resultado de un cursor sin buffer (SSDictCursor) enviado como CSV. La conexión vuelve
+    al pool en close(), que se registra con call_on_close: así se ejecuta también si el
+    generador nunca arranca (HEAD, cliente que corta antes del primer bloque). Si no se
+    leyó todo el resultado, la conexión se descarta en lugar de drenar las filas pendientes.
+    """
+    def __init__(self, conn, cur):
+        self.conn = conn
+        self.cur = cur
+        self.finished = False
+        self.closed = False
+
+    def csv_rows(self, headers):
+        yield from iter_csv_rows(self.cur, headers)
+        self.cur.close()
+        self.finished = True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if not self.finished:
+            self.conn.discard()
+        self.conn.close()
+
 @app.route("/api/reports/export", methods=["GET"])
 @require_role(['admin'])
+@heavy_report
 def api_export_report():
     report_type = request.args.get('type')
-    conn = get_conn()
-    
-    try:
-        with conn.cursor() as cur:
-            if report_type == 'reservations':
-                # Reporte de Reservas Detalladas
-                query = """
-                    SELECT 
-                        r.reservation_code, 
-                        c.full_name as client_name, 
-                        ro.room_num, 
-                        r.checkin_date, 
-                        r.checkout_date, 
-                        r.total, 
-                        r.status 
-                    FROM reservations r
-                    JOIN clients c ON r.client_id = c.client_id
-                    JOIN rooms ro ON r.room_id = ro.room_id
-                    ORDER BY r.checkin_date DESC
-                """
-                cur.execute(query)
-                rows = cur.fetchall()
-                headers = ['Código', 'Cliente', 'Habitación', 'Check-in', 'Check-out', 'Total', 'Estado']
-                
-            elif report_type == 'services':
-                # Reporte de Ventas de Servicios
-                query = """
-                    SELECT 
-                        rs.added_at as fecha_venta,
-                        s.name as servicio,
-                        rs.quantity,
-                        rs.unit_price,
-                        (rs.quantity * rs.unit_price) as subtotal,
-                        r.reservation_code,
-                        c.full_name as cliente
-                    FROM reservation_services rs
-                    JOIN services s ON rs.service_id = s.service_id
-                    JOIN reservations r ON rs.reservation_id = r.reservation_id
-                    JOIN clients c ON r.client_id = c.client_id
-                    ORDER BY rs.added_at DESC
-                """
-                cur.execute(query)
-                rows = cur.fetchall()
-                headers = ['Fecha Venta', 'Servicio', 'Cantidad', 'Precio Unit.', 'Subtotal', 'Reserva', 'Cliente']
-
-            elif report_type == 'invoices_clients':
-                # Reporte de Facturación por Cliente
-                query = """
-                    SELECT 
-                        i.invoice_code,
-                        i.invoice_date,
-                        i.total,
-                        i.method,
-                        c.full_name as client_name,
-                        c.email,
-                        r.reservation_code
-                    FROM invoices i
-                    JOIN reservations r ON i.reservation_id = r.reservation_id
-                    JOIN clients c ON r.client_id = c.client_id
-                    ORDER BY i.invoice_date DESC
-                """
-                cur.execute(query)
-                rows = cur.fetchall()
-                headers = ['Código Factura', 'Fecha', 'Total', 'Método Pago', 'Cliente', 'Email', 'Reserva']
-                
-                
-            else:
-                return jsonify({"error": "Tipo de reporte no válido"}), 400
-
-            # Generar CSV
-            si = io.StringIO()
-            cw = csv.writer(si)
-            
-            # Sanitize headers
-            sanitized_headers = [remove_accents(h) for h in headers]
-            cw.writerow(sanitized_headers)
-            
-            for row in rows:
-                # Sanitize values
-                sanitized_row = []
-                for val in row.values():
-                    if isinstance(val, str):
-                        sanitized_row.append(remove_accents(val))
-                    else:
-                        sanitized_row.append(val)
-                cw.writerow(sanitized_row)
-                
-            output = make_response(si.getvalue())
-            output.headers["Content-Disposition"] = f"attachment; filename=reporte_{report_type}.csv"
-            output.headers["Content-type"] = "text/csv; charset=utf-8"
-            return output
+    if report_type not in EXPORT_REPORTS:
+        return jsonify({"error": "Tipo de reporte no válido"}), 400
+    query, headers = EXPORT_REPORTS[report_type]
 
+    conn = None
+    try:
+        conn = get_conn()
+        # Cursor del lado del servidor: las filas se leen de MySQL a medida que se envían
+        cur = conn.cursor(SSDictCursor)
+        cur.execute(query)
     except Exception as e:
+        if conn:
+            conn.discard()
+            conn.close()
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+
+    stream = StreamedQuery(conn, cur)
+    output = Response(stream.csv_rows(headers), mimetype='text/csv')
+    output.call_on_close(stream.close)
+    output.headers["Content-Disposition"] = f"attachment; filename=reporte_{report_type}.csv"
+    output.headers["Content-type"] = "text/csv; charset=utf-8"
+    return output
 
 # --- REPORTE DE OCUPACIÓN ---
-@app.route("/api/reports/occupancy", methods=["GET"])
-@require_role(['admin', 'recepcion'])
-def api_report_occupancy():
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
-    room_type = request.args.get('room_type')
+# Estados que cuentan como noche ocupada (reporte JSON y CSV usan el mismo criterio)
+OCCUPANCY_STATUSES = ('confirmada', 'checkin', 'checkout')
+
+def parse_report_range(args):
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
     
     # Default to current month if not specified
     today = date.today()
@@ -1524,59 +3861,95 @@ def api_report_occupancy():
         end_date = next_month - timedelta(days=next_month.day)
     else:
         end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    return start_date, end_date
+
+def compute_daily_occupancy(stays, start_date, end_date, total_rooms):
+    """
+    Ocupación diaria por barrido (sweep-line): cada estancia [checkin, checkout)
+    aporta +1 el día de entrada y -1 el de salida en un arreglo de diferencias;
+    la suma acumulada da las habitaciones ocupadas de cada día.
+    Costo O(días + reservas) en lugar de O(días × reservas).
+    """
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return []
+    diff = [0] * (days + 1)
+    for checkin, checkout in stays:
+        first = max((as_date(checkin) - start_date).days, 0)
+        last = min((as_date(checkout) - start_date).days, days)
+        if first < last:
+            diff[first] += 1
+            diff[last] -= 1
+
+    daily_stats = []
+    occupied = 0
+    for offset in range(days):
+        occupied += diff[offset]
+        percentage = (occupied / total_rooms * 100) if total_rooms > 0 else 0
+        daily_stats.append({
+            "date": (start_date + timedelta(days=offset)).strftime('%Y-%m-%d'),
+            "occupied": occupied,
+            "total": total_rooms,
+            "percentage": round(percentage, 2)
+        })
+    return daily_stats
+
+def build_occupancy_report(cur, start_date, end_date, room_type=None):
+    """
+    Motor común de los reportes de ocupación: un conteo de habitaciones y UNA consulta
+    de rango sobre reservas (sin importar cuántos días abarque), más el barrido en memoria.
+    """
+    # 1. Get total rooms (filtered by type if needed)
+    room_filter_sql = ""
+    params = []
+    if room_type:
+        room_filter_sql = " WHERE room_type = %s"
+        params.append(room_type)
+    
+    cur.execute(f"SELECT COUNT(*) as total FROM rooms {room_filter_sql}", tuple(params))
+    res_count = cur.fetchone()
+    total_rooms = res_count['total'] if res_count else 0
+    
+    # 2. Get reservations in range (end_date inclusive)
+    placeholders = ','.join(['%s'] * len(OCCUPANCY_STATUSES))
+    sql = f"""
+        SELECT r.checkin_date, r.checkout_date
+        FROM reservations r
+        JOIN rooms ro ON r.room_id = ro.room_id
+        WHERE r.status IN ({placeholders})
+        AND r.checkout_date > %s AND r.checkin_date < %s
+    """
+    query_params = [*OCCUPANCY_STATUSES, start_date, end_date + timedelta(days=1)]
+    if room_type:
+        sql += " AND ro.room_type = %s"
+        query_params.append(room_type)
+        
+    cur.execute(sql, tuple(query_params))
+    
+    # 3. Calculate daily occupancy (single sweep)
+    stays = ((res['checkin_date'], res['checkout_date']) for res in cur.fetchall())
+    return total_rooms, compute_daily_occupancy(stays, start_date, end_date, total_rooms)
+
+def iter_occupancy_csv(daily_stats):
+    # Headers without accents
+    yield 'Fecha,Habitaciones Ocupadas,Total Habitaciones,Ocupacion (%)\r\n'
+    for day in daily_stats:
+        yield f"{day['date']},{day['occupied']},{day['total']},{day['percentage']:.2f}\r\n"
+
+@app.route("/api/reports/occupancy", methods=["GET"])
+@require_role(['admin', 'recepcion'])
+@shared_cache(ttl=300, tables=('reservations', 'rooms'))
+@coalesce_requests
+@heavy_report
+def api_report_occupancy():
+    start_date, end_date = parse_report_range(request.args)
+    room_type = request.args.get('room_type')
 
     conn = None
     try:
         conn = get_conn()
         with conn.cursor() as cur:
-            # 1. Get total rooms (filtered by type if needed)
-            room_filter_sql = ""
-            params = []
-            if room_type:
-                room_filter_sql = " WHERE room_type = %s"
-                params.append(room_type)
-            
-            cur.execute(f"SELECT COUNT(*) as total FROM rooms {room_filter_sql}", tuple(params))
-            res_count = cur.fetchone()
-            total_rooms = res_count['total'] if res_count else 0
-            
-            # 2. Get reservations in range
-            sql = """
-                SELECT r.checkin_date, r.checkout_date, ro.room_type
-                FROM reservations r
-                JOIN rooms ro ON r.room_id = ro.room_id
-                WHERE r.status IN ('confirmada', 'checkin', 'checkout')
-                AND r.checkout_date > %s AND r.checkin_date < %s
-            """
-            query_params = [start_date, end_date]
-            if room_type:
-                sql += " AND ro.room_type = %s"
-                query_params.append(room_type)
-                
-            cur.execute(sql, tuple(query_params))
-            reservations = cur.fetchall()
-            
-            # 3. Calculate daily occupancy
-            daily_stats = []
-            current = start_date
-            while current <= end_date:
-                occupied = 0
-                for res in reservations:
-                    # Convert datetime to date for comparison
-                    checkin = res['checkin_date'].date() if isinstance(res['checkin_date'], datetime) else res['checkin_date']
-                    checkout = res['checkout_date'].date() if isinstance(res['checkout_date'], datetime) else res['checkout_date']
-                    # Occupied if date is within [checkin, checkout)
-                    if checkin <= current < checkout:
-                        occupied += 1
-                
-                percentage = (occupied / total_rooms * 100) if total_rooms > 0 else 0
-                daily_stats.append({
-                    "date": current.strftime('%Y-%m-%d'),
-                    "occupied": occupied,
-                    "total": total_rooms,
-                    "percentage": round(percentage, 2)
-                })
-                current += timedelta(days=1)
+            total_rooms, daily_stats = build_occupancy_report(cur, start_date, end_date, room_type)
                 
             return jsonify({
                 "start_date": start_date.strftime('%Y-%m-%d'),
@@ -1593,89 +3966,269 @@ def api_report_occupancy():
 # --- REPORTE DE OCUPACIÓN CSV ---
 @app.route("/api/reports/occupancy/csv", methods=["GET"])
 @require_role(['admin', 'recepcion'])
+@heavy_report
 def api_report_occupancy_csv():
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
+    start_date, end_date = parse_report_range(request.args)
     room_type = request.args.get('room_type')
-    
-    # Default to current month if not specified
-    today = date.today()
-    if not start_date_str:
-        start_date = today.replace(day=1)
-    else:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        
-    if not end_date_str:
-        # End date: last day of current month
-        next_month = today.replace(day=28) + timedelta(days=4)
-        end_date = next_month - timedelta(days=next_month.day)
-    else:
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
 
     conn = None
     try:
         conn = get_conn()
         with conn.cursor() as cur:
-            # 1. Get total rooms (filtered by type if needed)
-            sql_rooms = "SELECT COUNT(*) as total FROM rooms"
-            params_rooms = []
-            if room_type:
-                sql_rooms += " WHERE room_type = %s"
-                params_rooms.append(room_type)
-            
-            cur.execute(sql_rooms, tuple(params_rooms))
-            total_rooms = cur.fetchone()['total']
-            
-            # 2. Iterate days and calculate occupancy
-            output = io.StringIO()
-            writer = csv.writer(output)
-            # Headers without accents
-            writer.writerow(['Fecha', 'Habitaciones Ocupadas', 'Total Habitaciones', 'Ocupacion (%)'])
-            
-            current = start_date
-            while current <= end_date:
-                # Count occupied rooms for this date
-                # A room is occupied if a reservation overlaps with 'current' date
-                # AND status is 'checkin' or 'ocupada' (or 'confirmada' if we want projected occupancy)
-                # Let's stick to 'checkin', 'ocupada', 'confirmada' for a report
-                
-                sql_occ = """
-                    SELECT COUNT(*) as occupied 
-                    FROM reservations r
-                    JOIN rooms ro ON r.room_id = ro.room_id
-                    WHERE r.status IN ('checkin', 'ocupada', 'confirmada')
-                    AND %s >= r.checkin_date AND %s < r.checkout_date
-                """
-                params_occ = [current, current]
-                
-                if room_type:
-                    sql_occ += " AND ro.room_type = %s"
-                    params_occ.append(room_type)
-                    
-                cur.execute(sql_occ, tuple(params_occ))
-                occupied = cur.fetchone()['occupied']
-                
-                percentage = (occupied / total_rooms * 100) if total_rooms > 0 else 0
-                
-                writer.writerow([
-                    current.strftime('%Y-%m-%d'),
-                    occupied,
-                    total_rooms,
-                    f"{percentage:.2f}"
-                ])
-                current += timedelta(days=1)
-            
-            # Create response
-            output.seek(0)
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'text/csv; charset=utf-8' # Removed utf-8-sig to avoid BOM if not needed, but standard is fine.
-            response.headers['Content-Disposition'] = f'attachment; filename=ocupacion_{start_date}_{end_date}.csv'
-            return response
-
+            _, daily_stats = build_occupancy_report(cur, start_date, end_date, room_type)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn: conn.close()
 
+    # La conexión ya volvió al pool: las filas se emiten en streaming desde memoria
+    response = Response(iter_occupancy_csv(daily_stats), mimetype='text/csv')
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename=ocupacion_{start_date}_{end_date}.csv'
+    return response
+
+# --- TRABAJOS DE REPORTES EN SEGUNDO PLANO ---
+# POST /api/reports/jobs encola un reporte (los mismos de /api/reports/export y el de ocupación)
+# y responde 202 de inmediato; un pool de hilos de cada worker lo calcula y deja el resultado en
+# REPORT_JOBS_DIR. El estado vive en un archivo JSON por trabajo, así que cualquier worker puede
+# responder GET /api/reports/jobs/<id>. Los resultados caducan a los REPORT_JOB_TTL segundos.
+REPORT_JOBS_DIR = os.environ.get("REPORT_JOBS_DIR", os.path.join(tempfile.gettempdir(), "gestion_hotelera_jobs"))
+# Los hilos son el límite propio de los trabajos: no ocupan los huecos de heavy_reports,
+# así una cola larga de trabajos no deja a los reportes síncronos respondiendo 503.
+REPORT_JOB_WORKERS = int(os.environ.get("REPORT_JOB_WORKERS", 2))        # hilos por worker de gunicorn
+REPORT_JOB_MAX_QUEUED = int(os.environ.get("REPORT_JOB_MAX_QUEUED", 20))  # pendientes por worker
+REPORT_JOB_TTL = int(os.environ.get("REPORT_JOB_TTL", 3600))              # segundos
+REPORT_JOB_STALE_SECONDS = 6 * 3600   # trabajos 'queued'/'running' de un worker que ya no existe
+REPORT_JOB_SWEEP_SECONDS = 60
+REPORT_JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+class ReportJobs:
+    def __init__(self, directory, workers, max_queued):
+        self.directory = directory
+        self.workers = workers
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._next_sweep = 0
+
+    def path(self, job_id, ext):
+        return os.path.join(self.directory, f"{job_id}.{ext}")
+
+    def result_path(self, job):
+        return self.path(job['job_id'], f"result.{job['format']}")
+
+    def _write_json(self, path, data):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp, path)   # quien lee nunca ve un archivo a medio escribir
+
+    def load(self, job_id):
+        if not REPORT_JOB_ID_RE.fullmatch(job_id or ''):
+            return None
+        try:
+            with open(self.path(job_id, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _update(self, job, **fields):
+        job.update(fields, updated_at=time.time())
+        self._write_json(self.path(job['job_id'], 'json'), job)
+
+    def _get_executor(self):
+        # El pool de hilos no sobrevive al fork de gunicorn: uno por proceso
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+                self._pid = os.getpid()
+                self._pending = 0
+            return self._executor
+
+    def submit(self, report, params, role):
+        """Encola el reporte. Retorna el trabajo o None si la cola de este worker está llena."""
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_queued:
+                return None
+            self._pending += 1
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        job = {"job_id": uuid.uuid4().hex, "report": report, "params": params, "role": role, "status": "queued",
+               "created_at": now, "updated_at": now, "started_at": None, "finished_at": None,
+               "expires_at": None, "format": params.get('format', 'csv'), "rows": None, "bytes": None, "error": None}
+        self._write_json(self.path(job['job_id'], 'json'), job)
+        executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        try:
+            self._update(job, status="running", started_at=time.time())
+            artifact = self.result_path(job)
+            tmp = f"{artifact}.tmp"
+            if job['report'] == 'occupancy':
+                rows = self._write_occupancy(job, tmp)
+            else:
+                rows = self._write_export(job, tmp)
+            os.replace(tmp, artifact)
+            finished = time.time()
+            self._update(job, status="done", finished_at=finished, expires_at=finished + REPORT_JOB_TTL,
+                         rows=rows, bytes=os.path.getsize(artifact))
+        except Exception as e:
+            print(f"Error en el trabajo de reporte {job['job_id']}: {e}")
+            finished = time.time()
+            self._update(job, status="failed", finished_at=finished, expires_at=finished + REPORT_JOB_TTL, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _write_export(self, job, path):
+        query, headers = EXPORT_REPORTS[job['report']]
+        conn = get_conn(statement_timeout=ROUTE_STATEMENT_TIMEOUTS_MS['api_export_report'])
+        try:
+            # Mismo camino que /api/reports/export: cursor del servidor y CSV por bloques
+            cur = conn.cursor(SSDictCursor)
+            cur.execute(query)
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(iter_csv_rows(cur, headers))
+            rows = cur.rownumber   # filas leídas por el cursor del servidor
+            cur.close()
+        except BaseException:
+            conn.discard()
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    def _write_occupancy(self, job, path):
+        params = job['params']
+        start_date, end_date = parse_report_range(params)
+        conn = get_conn(statement_timeout=ROUTE_STATEMENT_TIMEOUTS_MS['api_report_occupancy'])
+        try:
+            with conn.cursor() as cur:
+                total_rooms, daily_stats = build_occupancy_report(cur, start_date, end_date, params.get('room_type'))
+        finally:
+            conn.close()
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if job['format'] == 'json':
+                json.dump({"start_date": start_date.strftime('%Y-%m-%d'), "end_date": end_date.strftime('%Y-%m-%d'),
+                           "total_rooms": total_rooms, "daily_stats": daily_stats}, f)
+            else:
+                f.writelines(iter_occupancy_csv(daily_stats))
+        return len(daily_stats)
+
+    def sweep(self):
+        """Borra resultados caducados (como mucho una vez cada REPORT_JOB_SWEEP_SECONDS por worker)."""
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + REPORT_JOB_SWEEP_SECONDS
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            job_id, _, ext = name.partition('.')
+            if ext != 'json':
+                continue
+            job = self.load(job_id)
+            if job is None:
+                continue
+            expired = job['expires_at'] is not None and job['expires_at'] < now
+            stale = job['status'] in ('queued', 'running') and now - job['updated_at'] > REPORT_JOB_STALE_SECONDS
+            if expired or stale:
+                for path in (self.result_path(job), self.path(job_id, 'json')):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+report_jobs = ReportJobs(REPORT_JOBS_DIR, REPORT_JOB_WORKERS, REPORT_JOB_MAX_QUEUED)
+
+def report_job_roles(report):
+    """Roles que pueden crear, consultar y descargar un trabajo: los de la ruta síncrona."""
+    return ['admin'] if report in EXPORT_REPORTS else ['admin', 'recepcion']
+
+def report_job_forbidden(report):
+    roles = report_job_roles(report)
+    if request.headers.get('X-User-Role') in roles:
+        return None
+    return jsonify({"error": f"Acceso no autorizado. Rol requerido: {', '.join(roles)}"}), 403
+
+def report_job_view(job):
+    view = dict(job)
+    if job['status'] == 'done':
+        view['download'] = f"/api/reports/jobs/{job['job_id']}/download"
+    return view
+
+@app.route("/api/reports/jobs", methods=["POST"])
+@require_role(['admin', 'recepcion'])
+def api_create_report_job():
+    data = request.json or {}
+    report = data.get('report')
+    report_jobs.sweep()
+
+    if report == 'occupancy':
+        params = {key: data[key] for key in ('start_date', 'end_date', 'room_type') if data.get(key)}
+        params['format'] = 'json' if data.get('format') == 'json' else 'csv'
+        try:
+            parse_report_range(params)
+        except ValueError:
+            return jsonify({"error": "Fechas inválidas: use YYYY-MM-DD."}), 400
+    elif report in EXPORT_REPORTS:
+        # Mismo permiso que /api/reports/export
+        forbidden = report_job_forbidden(report)
+        if forbidden:
+            return forbidden
+        params = {'format': 'csv'}
+    else:
+        valid = ', '.join(['occupancy', *EXPORT_REPORTS])
+        return jsonify({"error": f"Tipo de reporte no válido. Opciones: {valid}"}), 400
+
+    job = report_jobs.submit(report, params, request.headers.get('X-User-Role'))
+    if job is None:
+        response = jsonify({"error": "Demasiados reportes en cola. Intente de nuevo más tarde.",
+                            "retry_after": REPORT_RETRY_AFTER})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(REPORT_RETRY_AFTER)
+        return response
+    response = jsonify(report_job_view(job))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/reports/jobs/{job['job_id']}"
+    return response
+
+@app.route("/api/reports/jobs/<job_id>", methods=["GET"])
+@require_role(['admin', 'recepcion'])
+def api_get_report_job(job_id):
+    report_jobs.sweep()
+    job = report_jobs.load(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado o caducado"}), 404
+    forbidden = report_job_forbidden(job['report'])
+    if forbidden:
+        return forbidden
+    return jsonify(report_job_view(job))
+
+@app.route("/api/reports/jobs/<job_id>/download", methods=["GET"])
+@require_role(['admin', 'recepcion'])
+def api_download_report_job(job_id):
+    job = report_jobs.load(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado o caducado"}), 404
+    forbidden = report_job_forbidden(job['report'])
+    if forbidden:
+        return forbidden
+    if job['status'] != 'done':
+        return jsonify({"error": f"El reporte aún no está listo (estado: {job['status']})."}), 409
+    mimetype = 'application/json' if job['format'] == 'json' else 'text/csv'
+    try:
+        return send_file(report_jobs.result_path(job), mimetype=mimetype, as_attachment=True,
+                         download_name=f"reporte_{job['report']}_{job_id[:8]}.{job['format']}")
+    except FileNotFoundError:
+        return jsonify({"error": "Trabajo no encontrado o caducado"}), 404
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5001, debug=True)
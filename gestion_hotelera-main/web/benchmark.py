@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la API contra un hotel sintético a varias escalas.
+
+Por cada escala (1k, 100k, 1m reservas) genera los datos con db_init/generate_hotel_data.py,
+los carga en una base de datos aparte (BENCH_DB_NAME, nunca la de desarrollo) y lanza, en un
+proceso nuevo (cachés, pool e índices de disponibilidad vacíos), una mezcla de peticiones con
+el cliente de pruebas de Flask desde varios hilos: listado de habitaciones, búsqueda de
+reservas, alta de servicios, check-in/check-out, dashboard y reportes de ocupación/exportación.
+Con --backend sqlite cada escala se carga en un archivo SQLite temporal y no hace falta MySQL.
+
+Los resultados (throughput, p50/p95/p99 y consultas SQL por petición, globales y por operación)
+se guardan en un JSON; con --compare se comparan contra los de otra versión.
+
+    python benchmark.py --scales 1k,100k --requests 5000 --concurrency 8
+    python benchmark.py --scales 1k --compare benchmark_results_anterior.json
+    python benchmark.py --backend sqlite --scales 1k,100k
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pymysql
+
+import sqlite_backend
+
+WEB_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_INIT_DIR = os.path.join(os.path.dirname(WEB_DIR), "db_init")
+SCHEMA_FILE = os.path.join(DB_INIT_DIR, "Hotel_BD.sql")
+GENERATOR = os.path.join(DB_INIT_DIR, "generate_hotel_data.py")
+
+DB_HOST = os.environ.get("DB_HOST", "127.0.0.1")
+DB_PORT = int(os.environ.get("DB_PORT", 3307))
+DB_USER = os.environ.get("DB_USER", "root")
+DB_PASS = os.environ.get("DB_PASS", "")
+BENCH_DB_NAME = os.environ.get("BENCH_DB_NAME", "gestion_hotelera_bench")
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Mezcla de operaciones (nombre, peso). Aproxima un día de recepción: muchas lecturas de
+# listados y del dashboard, algunas escrituras y pocos reportes pesados.
+MIX = (
+    ("rooms_list", 20),
+    ("reservations_search", 20),
+    ("dashboard", 15),
+    ("add_service", 15),
+    ("checkin", 10),
+    ("checkout", 10),
+    ("occupancy_report", 7),
+    ("export_report", 3),
+)
+
+ADMIN = {"X-User-Role": "admin"}
+RECEPCION = {"X-User-Role": "recepcion"}
+
+# --- CARGA DEL HOTEL SINTÉTICO ---
+_DATABASE_NAME_RE = re.compile(r'^(DROP DATABASE IF EXISTS|CREATE DATABASE|USE)\s+`?gestion_hotelera`?', re.IGNORECASE)
+
+def execute_sql_script(conn, path):
+    count = 0
+    with conn.cursor() as cur:
+        for statement in sqlite_backend.iter_sql_statements(path):
+            # Los scripts apuntan a gestion_hotelera; el benchmark trabaja en su propia base
+            cur.execute(_DATABASE_NAME_RE.sub(lambda m: f"{m.group(1)} `{BENCH_DB_NAME}`", statement))
+            count += 1
+    conn.commit()
+    return count
+
+def load_hotel(reservations, workdir, backend="mysql", seed=12345):
+    """Genera un hotel con 'reservations' reservas y lo carga en BENCH_DB_NAME (la recrea) o,
+    con backend="sqlite", en un archivo nuevo dentro de 'workdir'."""
+    data_file = os.path.join(workdir, f"hotel_{reservations}.sql")
+    started = time.perf_counter()
+    print(f"  Generando {reservations} reservas...")
+    subprocess.run([sys.executable, GENERATOR, "--scale", str(reservations), "--seed", str(seed), "--output", data_file],
+                   check=True, stdout=subprocess.DEVNULL)
+    generated = time.perf_counter()
+
+    if backend == "sqlite":
+        print(f"  Cargando en {sqlite_path(workdir, reservations)}...")
+        conn = sqlite_backend.SQLiteDatabase(sqlite_path(workdir, reservations), [SCHEMA_FILE]).connect()
+        try:
+            sqlite_backend.load_script(conn, data_file)
+        finally:
+            conn.close()
+            os.remove(data_file)
+        loaded = time.perf_counter()
+        return {"generate_seconds": round(generated - started, 2), "load_seconds": round(loaded - generated, 2)}
+
+    print(f"  Cargando en {DB_HOST}:{DB_PORT}/{BENCH_DB_NAME}...")
+    conn = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASS, port=DB_PORT,
+                           charset='utf8mb4', autocommit=False)
+    try:
+        execute_sql_script(conn, SCHEMA_FILE)
+        execute_sql_script(conn, data_file)
+    finally:
+        conn.close()
+        os.remove(data_file)
+    loaded = time.perf_counter()
+    return {"generate_seconds": round(generated - started, 2), "load_seconds": round(loaded - generated, 2)}
+
+def sqlite_path(workdir, reservations):
+    return os.path.join(workdir, f"hotel_{reservations}.sqlite3")
+
+# --- CARGA DE TRABAJO (proceso hijo) ---
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return round(sorted_values[int(rank) - 1], 2)
+
+def summarize(samples, seconds):
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[1] for sample in samples if sample[1] is not None]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample[2] >= 500),
+        "rejected": sum(1 for sample in samples if sample[2] == 503),
+        "throughput_rps": round(len(samples) / seconds, 2) if seconds else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(latencies[-1], 2) if latencies else None,
+        },
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+class QueryCounter(logging.Handler):
+    """Toma el número de consultas del log estructurado de cada petición. El cliente de
+    pruebas atiende la petición en el hilo que la hace, así que basta un valor por hilo."""
+    def __init__(self):
+        super().__init__()
+        self.local = threading.local()
+
+    def emit(self, record):
+        try:
+            entry = json.loads(record.getMessage())
+        except ValueError:
+            return
+        if entry.get("event") == "request":
+            self.local.queries = entry.get("queries")
+
+    def take(self):
+        queries = getattr(self.local, "queries", None)
+        self.local.queries = None
+        return queries
+
+class Workload:
+    def __init__(self, app_module, seed):
+        self.app = app_module.app
+        self.seed = seed
+        self._load_samples(app_module.get_conn)
+        today = date.today()
+        self.report_range = (today.replace(day=1), today.replace(day=1) + timedelta(days=30))
+
+    def _load_samples(self, get_conn):
+        rng = random.Random(self.seed)
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT MIN(reservation_id) AS lo, MAX(reservation_id) AS hi FROM reservations")
+                bounds = cur.fetchone()
+                lo, hi = bounds['lo'] or 0, bounds['hi'] or 0
+                ids = [rng.randint(lo, hi) for _ in range(500)] if hi else [0]
+                placeholders = ", ".join(["%s"] * len(ids))
+                cur.execute(f"SELECT guest_name FROM reservations WHERE reservation_id IN ({placeholders})", ids)
+                self.search_terms = [row['guest_name'].split()[-1] for row in cur.fetchall() if row['guest_name']]
+
+                cur.execute("SELECT reservation_id, checkin_date, status FROM reservations "
+                            "WHERE status IN ('reservada', 'confirmada', 'checkin') AND reservation_id >= %s "
+                            "ORDER BY reservation_id LIMIT 2000", (rng.randint(lo, max(lo, hi - 2000)),))
+                active = cur.fetchall()
+
+                cur.execute("SELECT service_id FROM services WHERE status = 'activo' LIMIT 200")
+                self.service_ids = [row['service_id'] for row in cur.fetchall()]
+
+                cur.execute("SELECT COUNT(*) AS total FROM rooms")
+                self.room_pages = max(1, cur.fetchone()['total'] // 20)
+        finally:
+            conn.close()
+
+        rng.shuffle(active)
+        self.active = [(row['reservation_id'], row['checkin_date']) for row in active]
+        # deque: append/pop son atómicos, los hilos se reparten las reservas sin candado
+        self.to_checkin = collections.deque(row['reservation_id'] for row in active if row['status'] != 'checkin')
+        self.to_checkout = collections.deque(row['reservation_id'] for row in active if row['status'] == 'checkin')
+
+    def run(self, client, op, rng):
+        return getattr(self, op)(client, rng)
+
+    def rooms_list(self, client, rng):
+        return client.get(f"/api/rooms?page={rng.randint(1, self.room_pages)}", headers=RECEPCION)
+
+    def reservations_search(self, client, rng):
+        term = rng.choice(self.search_terms) if self.search_terms else "a"
+        return client.get(f"/api/reservations?q={term}&per_page=20", headers=RECEPCION)
+
+    def dashboard(self, client, rng):
+        return client.get("/api/dashboard", headers=ADMIN)
+
+    def add_service(self, client, rng):
+        if not self.active or not self.service_ids:
+            return self.rooms_list(client, rng)
+        reservation_id, checkin = rng.choice(self.active)
+        service_date = checkin.date() if isinstance(checkin, datetime) else checkin
+        return client.post(f"/api/reservations/{reservation_id}/services", headers=RECEPCION,
+                           json={"service_id": rng.choice(self.service_ids), "quantity": 1,
+                                 "service_date": str(service_date)[:10]})
+
+    def checkin(self, client, rng):
+        try:
+            reservation_id = self.to_checkin.pop()
+        except IndexError:
+            return self.dashboard(client, rng)
+        response = client.put(f"/api/reservations/{reservation_id}", headers=RECEPCION, json={"status": "checkin"})
+        self.to_checkout.appendleft(reservation_id)
+        return response
+
+    def checkout(self, client, rng):
+        try:
+            reservation_id = self.to_checkout.pop()
+        except IndexError:
+            return self.checkin(client, rng)
+        return client.put(f"/api/reservations/{reservation_id}", headers=RECEPCION, json={"status": "checkout"})
+
+    def occupancy_report(self, client, rng):
+        start, end = self.report_range
+        return client.get(f"/api/reports/occupancy?start_date={start}&end_date={end}", headers=ADMIN)
+
+    def export_report(self, client, rng):
+        return client.get("/api/reports/export?type=reservations", headers=ADMIN)
+
+def drive(args):
+    """Proceso hijo: importa la app contra BENCH_DB_NAME y ejecuta la mezcla de peticiones."""
+    sys.path.insert(0, WEB_DIR)
+    import app as app_module
+
+    counter = QueryCounter()
+    app_module.logger.handlers[:] = [counter]
+    workload = Workload(app_module, args.seed)
+
+    operations = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    samples = collections.defaultdict(list)
+    samples_lock = threading.Lock()
+    per_worker = max(1, args.requests // args.concurrency)
+    warmup_per_worker = args.warmup // args.concurrency
+    start_barrier = threading.Barrier(args.concurrency + 1)
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        client = workload.app.test_client()
+        local = collections.defaultdict(list)
+        for i in range(warmup_per_worker + per_worker):
+            if i == warmup_per_worker:
+                start_barrier.wait()
+            op = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = workload.run(client, op, rng)
+                try:
+                    response.get_data()   # consume también las respuestas en streaming
+                    status = response.status_code
+                finally:
+                    response.close()
+            except Exception as e:   # p. ej. un error a mitad de un CSV en streaming
+                print(f"Error en {op}: {e}", file=sys.stderr)
+                status = 500
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if i >= warmup_per_worker:
+                local[op].append((elapsed_ms, counter.take(), status))
+            else:
+                counter.take()
+        with samples_lock:
+            for op, values in local.items():
+                samples[op].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    every = [sample for values in samples.values() for sample in values]
+    result = summarize(every, seconds)
+    result["seconds"] = round(seconds, 2)
+    result["endpoints"] = {op: summarize(samples[op], seconds) for op, _ in MIX if samples[op]}
+    with open(args.drive_output, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+def run_scale(label, args, workdir):
+    result = {"reservations": SCALES.get(label)}
+    if label != "current":
+        result.update(load_hotel(SCALES[label], workdir, args.backend, args.seed))
+
+    drive_output = os.path.join(workdir, f"drive_{label}.json")
+    env = dict(os.environ,
+               DB_NAME=os.environ.get("DB_NAME", "gestion_hotelera") if label == "current" else BENCH_DB_NAME,
+               DB_POOL_MAX=str(max(args.concurrency + 2, int(os.environ.get("DB_POOL_MAX", 10)))),
+               LOG_LEVEL="INFO",
+               PROFILE_SAMPLE_RATE="0",
+               RESPONSE_CACHE_PATH=os.path.join(workdir, f"responses_{label}.sqlite3"),
+               METRICS_DIR=os.path.join(workdir, f"metrics_{label}"),
+               REPORT_JOBS_DIR=os.path.join(workdir, f"jobs_{label}"),
+               DB_BACKEND=args.backend)
+    if args.backend == "sqlite" and label != "current":
+        # La base ya está cargada: la app no vuelve a ejecutar el esquema
+        env.update(SQLITE_PATH=sqlite_path(workdir, SCALES[label]), SQLITE_SCRIPTS="")
+    print(f"  Ejecutando {args.requests} peticiones con {args.concurrency} hilos...")
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--drive-output", drive_output,
+                    "--requests", str(args.requests), "--warmup", str(args.warmup),
+                    "--concurrency", str(args.concurrency), "--seed", str(args.seed)],
+                   check=True, env=env, cwd=WEB_DIR)
+    with open(drive_output, encoding='utf-8') as f:
+        result.update(json.load(f))
+    return result
+
+# --- COMPARACIÓN ENTRE VERSIONES ---
+def _change(new, old):
+    if not new or not old:
+        return "n/d"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def compare(results, baseline):
+    print(f"\nComparación contra {baseline.get('label')} ({baseline.get('created_at')}):")
+    print(f"{'escala':8} {'operación':22} {'rps':>10} {'p95 ms':>10} {'p99 ms':>10} {'consultas':>10}")
+    for label, scale in results["scales"].items():
+        old_scale = baseline.get("scales", {}).get(label)
+        if not old_scale:
+            continue
+        rows = [("total", scale, old_scale)] + [
+            (op, stats, old_scale.get("endpoints", {}).get(op, {})) for op, stats in scale["endpoints"].items()]
+        for name, new, old in rows:
+            print(f"{label:8} {name:22} "
+                  f"{_change(new.get('throughput_rps'), old.get('throughput_rps')):>10} "
+                  f"{_change(new['latency_ms']['p95'], old.get('latency_ms', {}).get('p95')):>10} "
+                  f"{_change(new['latency_ms']['p99'], old.get('latency_ms', {}).get('p99')):>10} "
+                  f"{_change(new.get('queries_per_request'), old.get('queries_per_request')):>10}")
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=WEB_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la API contra un hotel sintético")
+    parser.add_argument("--scales", default="1k",
+                        help="escalas separadas por comas: 1k, 100k, 1m, o 'current' para la base ya cargada")
+    parser.add_argument("--requests", type=int, default=2000, help="peticiones medidas por escala")
+    parser.add_argument("--warmup", type=int, default=200, help="peticiones de calentamiento (no se miden)")
+    parser.add_argument("--concurrency", type=int, default=8, help="hilos lanzando peticiones")
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default=os.environ.get("DB_BACKEND", "mysql"),
+                        help="motor de base de datos (sqlite no necesita un servidor MySQL)")
+    parser.add_argument("--label", default=None, help="nombre de la versión (por defecto el commit actual)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="JSON de resultados de otra versión")
+    parser.add_argument("--drive-output", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.concurrency = max(1, args.concurrency)
+
+    if args.drive_output:
+        drive(args)
+        return
+
+    labels = [label.strip().lower() for label in args.scales.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SCALES and label != "current"]
+    if unknown:
+        parser.error(f"escalas no válidas: {', '.join(unknown)}")
+
+    results = {
+        "label": args.label or git_revision(),
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "python": sys.version.split()[0],
+        "config": {"backend": args.backend, "requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency,
+                   "seed": args.seed, "mix": dict(MIX)},
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="hotel_bench_") as workdir:
+        for label in labels:
+            print(f"Escala {label}:")
+            scale = run_scale(label, args, workdir)
+            results["scales"][label] = scale
+            print(f"  {scale['throughput_rps']} req/s, p50 {scale['latency_ms']['p50']} ms, "
+                  f"p95 {scale['latency_ms']['p95']} ms, p99 {scale['latency_ms']['p99']} ms, "
+                  f"{scale['queries_per_request']} consultas/petición")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,623 @@
+# -*- coding: utf-8 -*-
+"""
+Backend SQLite para get_conn() (DB_BACKEND=sqlite): la API completa sin servidor MySQL,
+para pruebas locales, CI y benchmarks.
+
+Las conexiones imitan la interfaz de pymysql que usa app.py (cursores de diccionario,
+con y sin buffer, begin/commit/rollback, server_status, ping, lastrowid/rowcount y los
+errores de pymysql.err con sus códigos de MySQL), así que el pool, la instrumentación y
+las rutas no distinguen el backend. Cada sentencia se traduce del dialecto de MySQL:
+
+- %s -> ?, FOR UPDATE se quita (BEGIN IMMEDIATE ya serializa las escrituras),
+  ON DUPLICATE KEY UPDATE -> ON CONFLICT DO UPDATE, CURRENT_DATE()/NOW() en hora local.
+- SHA2() y REGEXP se registran como funciones.
+- SET SESSION max_execution_time se emula con un progress handler (error 3024).
+- CALL devuelve el error 1305 (sin procedimientos almacenados): app.py usa la misma
+  lógica desde Python.
+- Los DATETIME/DATE vuelven como datetime/date y los DECIMAL como Decimal.
+
+El esquema (db_init/Hotel_BD.sql) se carga traducido al crear la base: ENUM -> TEXT con
+CHECK, AUTO_INCREMENT -> INTEGER PRIMARY KEY AUTOINCREMENT, INDEX -> CREATE INDEX. Los
+índices FULLTEXT, los procedimientos y el SQL de sesión (SET @..., PREPARE) se omiten.
+
+SQLITE_PATH=':memory:' usa una base en memoria por proceso (vfs memdb): las escrituras
+bloquean a los lectores, suficiente para pruebas. Para carga concurrente (benchmarks) use
+un archivo, que se abre en modo WAL.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+MEMORY = ':memory:'
+
+ER_DUP_ENTRY = 1062
+ER_BAD_NULL_ERROR = 1048
+ER_DATA_TRUNCATED = 1265
+ER_ROW_IS_REFERENCED = 1451
+ER_NO_REFERENCED_ROW = 1452
+ER_CHECK_CONSTRAINT_VIOLATED = 3819
+ER_NO_SUCH_TABLE = 1146
+ER_BAD_FIELD_ERROR = 1054
+ER_PARSE_ERROR = 1064
+ER_SP_DOES_NOT_EXIST = 1305
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_QUERY_TIMEOUT = 3024
+
+# --- TIPOS ---
+def _to_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+def _to_date(value):
+    text = value.decode()
+    return date.fromisoformat(text[:10])
+
+def _to_decimal(value):
+    # Todos los DECIMAL del esquema son (10,2)
+    return Decimal(value.decode()).quantize(Decimal('0.01'))
+
+sqlite3.register_converter("DATETIME", _to_datetime)
+sqlite3.register_converter("TIMESTAMP", _to_datetime)
+sqlite3.register_converter("DATE", _to_date)
+sqlite3.register_converter("DECIMAL", _to_decimal)
+
+def _adapt(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+def _convert(value):
+    # El esquema no tiene columnas FLOAT/DOUBLE: un REAL viene de un DECIMAL (p. ej. SUM(total))
+    return Decimal(repr(value)) if isinstance(value, float) else value
+
+def _sha2(text, bits):
+    if text is None:
+        return None
+    if int(bits) not in (0, 256):
+        raise ValueError("Solo se admite SHA2(..., 256)")
+    return hashlib.sha256(str(text).encode('utf-8')).hexdigest()
+
+def _regexp(pattern, value):
+    if pattern is None or value is None:
+        return None
+    return re.search(pattern, str(value)) is not None
+
+# --- TRADUCCIÓN DE SENTENCIAS ---
+_PLACEHOLDER_RE = re.compile(r"%(s|%)")
+_NAMED_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s|%%")
+_SESSION_TIMEOUT_RE = re.compile(r"^\s*SET\s+(?:SESSION\s+)?max_execution_time\s*=\s*(%s|\d+)\s*$", re.IGNORECASE)
+_SELECT_RE = re.compile(r"^\s*\(?\s*(SELECT|WITH)\b", re.IGNORECASE)
+_CALL_RE = re.compile(r"^\s*CALL\s+(\w+)", re.IGNORECASE)
+_ON_DUPLICATE_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_FUNCTION_RE = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_TABLE_ROWS_RE = re.compile(r"\bFROM\s+information_schema\.TABLES\b", re.IGNORECASE)
+
+_REWRITES = (
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE), ""),
+    (re.compile(r"\s+LOCK\s+IN\s+SHARE\s+MODE\b", re.IGNORECASE), ""),
+    (re.compile(r"\b(?:CURRENT_DATE|CURDATE)\(\)", re.IGNORECASE), "DATE('now', 'localtime')"),
+    (re.compile(r"\b(?:NOW|CURRENT_TIMESTAMP)\(\)", re.IGNORECASE), "DATETIME('now', 'localtime')"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\bDATABASE\(\)", re.IGNORECASE), "'main'"),
+)
+
+_translated = {}
+_TRANSLATION_CACHE_MAX_SQL = 4096   # las sentencias de la app se repiten; los INSERT masivos no
+
+def _rewrite(query):
+    sql = query
+    for pattern, replacement in _REWRITES:
+        sql = pattern.sub(replacement, sql)
+    match = _ON_DUPLICATE_RE.search(sql)
+    if match:
+        update = _VALUES_FUNCTION_RE.sub(r"excluded.\1", sql[match.end():])
+        sql = sql[:match.start()] + "ON CONFLICT DO UPDATE SET" + update
+    return sql
+
+def translate(query, args):
+    """(sql, parámetros) de SQLite para una sentencia de MySQL con parámetros al estilo pymysql."""
+    if _TABLE_ROWS_RE.search(query):
+        # Estimación de filas de InnoDB: no existe en SQLite (la app cuenta de forma exacta)
+        return "SELECT NULL AS total", ()
+    key = (query, args is None, isinstance(args, dict))
+    sql = _translated.get(key)
+    if sql is None:
+        sql = _rewrite(query)
+        if isinstance(args, dict):
+            sql = _NAMED_PLACEHOLDER_RE.sub(lambda m: f":{m.group(1)}" if m.group(1) else "%", sql)
+        elif args is not None:
+            # Igual que pymysql: '%' solo se interpreta cuando hay parámetros
+            sql = _PLACEHOLDER_RE.sub(lambda m: "?" if m.group(1) == "s" else "%", sql)
+        if len(query) <= _TRANSLATION_CACHE_MAX_SQL:
+            _translated[key] = sql
+    if args is None:
+        return sql, ()
+    if isinstance(args, dict):
+        return sql, {name: _adapt(value) for name, value in args.items()}
+    if not isinstance(args, (tuple, list)):
+        args = (args,)
+    return sql, tuple(_adapt(value) for value in args)
+
+_MULTI_TABLE_UPDATE_RE = re.compile(
+    r"^\s*UPDATE\s+(\w+)\s+(?:AS\s+)?(\w+)\s+(?:INNER\s+)?JOIN\s+(\w+)\s+(?:AS\s+)?(\w+)\s+ON\s+(.*?)"
+    r"\s+SET\s+(.*?)\s+WHERE\s+(.*)$", re.IGNORECASE | re.DOTALL)
+_ASSIGNMENT_RE = re.compile(r"^(\w+)\.(\w+)\s*=\s*(.*)$", re.DOTALL)
+
+def split_multi_table_update(sql, params):
+    """
+    UPDATE a x JOIN b y ON ... SET x.c = ..., y.d = ... WHERE ... de MySQL como un
+    UPDATE ... FROM de SQLite por cada tabla modificada (en el orden del SET).
+    None si la sentencia no es un UPDATE multi-tabla.
+    """
+    match = _MULTI_TABLE_UPDATE_RE.match(sql)
+    if not match or isinstance(params, dict):
+        return None
+    first, first_alias, second, second_alias, on, assignments, where = match.groups()
+    tables = {first_alias: (first, second, second_alias), second_alias: (second, first, first_alias)}
+    params = list(params)
+    position = 0
+    groups = {}
+    for item in _split_top_level(assignments):
+        assignment = _ASSIGNMENT_RE.match(item)
+        if not assignment or assignment.group(1) not in tables:
+            return None
+        used = item.count("?")
+        groups.setdefault(assignment.group(1), []).append(
+            (f"{assignment.group(2)} = {assignment.group(3)}", params[position:position + used]))
+        position += used
+    tail = params[position:]   # parámetros de ON y WHERE
+    statements = []
+    for alias, items in groups.items():
+        table, other, other_alias = tables[alias]
+        statements.append((
+            f"UPDATE {table} AS {alias} SET {', '.join(text for text, _ in items)} "
+            f"FROM {other} AS {other_alias} WHERE ({on}) AND ({where})",
+            tuple(value for _, values in items for value in values) + tuple(tail)))
+    return statements
+
+def _error(code, message):
+    # Misma clase que elegiría pymysql para ese código de MySQL
+    default = pymysql.err.OperationalError if code >= 1000 else pymysql.err.InternalError
+    return pymysql.err.error_map.get(code, default)(code, message)
+
+def mysql_error(e, sql):
+    """Error de pymysql (con el código de MySQL equivalente) para una excepción de sqlite3."""
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        if message.startswith("UNIQUE") or "PRIMARY KEY" in message:
+            return _error(ER_DUP_ENTRY, message)
+        if "FOREIGN KEY" in message:
+            referenced = sql.lstrip()[:6].upper() in ("DELETE", "UPDATE")
+            return _error(ER_ROW_IS_REFERENCED if referenced else ER_NO_REFERENCED_ROW, message)
+        if "NOT NULL" in message:
+            return _error(ER_BAD_NULL_ERROR, message)
+        if " IN (" in message:
+            return _error(ER_DATA_TRUNCATED, message)   # valor fuera de un ENUM
+        return _error(ER_CHECK_CONSTRAINT_VIOLATED, message)
+    if "no such table" in message:
+        return _error(ER_NO_SUCH_TABLE, message)
+    if "no such column" in message:
+        return _error(ER_BAD_FIELD_ERROR, message)
+    if "interrupted" in message:
+        return _error(ER_QUERY_TIMEOUT, "Query execution was interrupted, maximum statement execution time exceeded")
+    if "locked" in message or "busy" in message:
+        return _error(ER_LOCK_WAIT_TIMEOUT, message)
+    return _error(ER_PARSE_ERROR, message)
+
+# --- CONEXIÓN Y CURSOR ---
+class SQLiteCursor:
+    """Cursor con la interfaz de DictCursor / SSDictCursor (unbuffered=True) de pymysql."""
+    arraysize = 1
+
+    def __init__(self, connection, unbuffered=False):
+        self.connection = connection
+        self.unbuffered = unbuffered
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+        self._index = 0        # filas ya leídas (rownumber)
+        self._names = None
+        self._stream = None
+
+    @property
+    def rownumber(self):
+        return self._index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _reset(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+        self._index = 0
+        self.connection._deadline = None
+
+    def execute(self, query, args=None):
+        self._reset()
+        conn = self.connection
+        if conn._raw is None:
+            raise pymysql.err.InterfaceError(0, "La conexión está cerrada.")
+        timeout = _SESSION_TIMEOUT_RE.match(query)
+        if timeout:
+            conn._statement_timeout = int(args[0] if timeout.group(1) == "%s" else timeout.group(1))
+            return 0
+        if re.match(r"^\s*SET\s", query, re.IGNORECASE):
+            return 0   # SET NAMES, variables de sesión de MySQL
+        call = _CALL_RE.match(query)
+        if call:
+            raise pymysql.err.OperationalError(ER_SP_DOES_NOT_EXIST, f"PROCEDURE {call.group(1)} does not exist")
+
+        sql, params = translate(query, args)
+        if conn._statement_timeout and _SELECT_RE.match(sql):
+            conn._deadline = time.monotonic() + conn._statement_timeout / 1000
+        statements = split_multi_table_update(sql, params) if sql.lstrip()[:6].upper() == "UPDATE" else None
+        if statements:
+            return self._execute_atomic(statements)
+        try:
+            cursor = conn._raw.execute(sql, params)
+            self.lastrowid = cursor.lastrowid
+            if cursor.description is None:
+                self.rowcount = cursor.rowcount
+                return self.rowcount
+            self.description = cursor.description
+            self._names = [column[0] for column in cursor.description]
+            if self.unbuffered:
+                self._stream = cursor
+                return 0
+            self._rows = [self._row(row) for row in cursor.fetchall()]
+            self.rowcount = len(self._rows)
+            return self.rowcount
+        except sqlite3.Error as e:
+            raise mysql_error(e, sql) from e
+        finally:
+            if self._stream is None:
+                conn._deadline = None
+
+    def _execute_atomic(self, statements):
+        # Varias sentencias que en MySQL eran una: todas o ninguna, también en autocommit
+        raw = self.connection._raw
+        raw.execute("SAVEPOINT multi_table_update")
+        try:
+            self.rowcount = sum(raw.execute(sql, params).rowcount for sql, params in statements)
+        except sqlite3.Error as e:
+            raw.execute("ROLLBACK TO multi_table_update")
+            raw.execute("RELEASE multi_table_update")
+            raise mysql_error(e, statements[0][0]) from e
+        raw.execute("RELEASE multi_table_update")
+        return self.rowcount
+
+    def executemany(self, query, args):
+        args = list(args)
+        if not args:
+            return 0
+        total = 0
+        for params in args:
+            total += max(self.execute(query, params), 0)
+        self.rowcount = total
+        return total
+
+    def _row(self, row):
+        return {name: _convert(value) for name, value in zip(self._names, row)}
+
+    def fetchone(self):
+        if self._stream is not None:
+            rows = self.fetchmany(1)
+            return rows[0] if rows else None
+        if self._index >= len(self._rows):
+            return None
+        self._index += 1
+        return self._rows[self._index - 1]
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        if self._stream is not None:
+            try:
+                rows = [self._row(row) for row in self._stream.fetchmany(size)]
+            except sqlite3.Error as e:
+                raise mysql_error(e, "SELECT") from e
+            self._index += len(rows)
+            return rows
+        rows = self._rows[self._index:self._index + size]
+        self._index += len(rows)
+        return rows
+
+    def fetchall(self):
+        if self._stream is not None:
+            try:
+                rows = [self._row(row) for row in self._stream.fetchall()]
+            except sqlite3.Error as e:
+                raise mysql_error(e, "SELECT") from e
+            self._index += len(rows)
+            return rows
+        rows = self._rows[self._index:]
+        self._index = len(self._rows)
+        return rows
+
+    def nextset(self):
+        return None
+
+    def close(self):
+        if self.connection._raw is not None:
+            self._reset()
+
+class SQLiteConnection:
+    def __init__(self, raw):
+        self._raw = raw
+        self._statement_timeout = 0   # ms, como max_execution_time
+        self._deadline = None
+        raw.create_function("SHA2", 2, _sha2, deterministic=True)
+        raw.create_function("REGEXP", 2, _regexp, deterministic=True)
+        raw.set_progress_handler(self._check_deadline, 1000)
+
+    def _check_deadline(self):
+        return 1 if self._deadline is not None and time.monotonic() > self._deadline else 0
+
+    @property
+    def open(self):
+        return self._raw is not None
+
+    @property
+    def server_status(self):
+        status = SERVER_STATUS.SERVER_STATUS_AUTOCOMMIT
+        if self._raw is not None and self._raw.in_transaction:
+            status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        return status
+
+    def cursor(self, cursorclass=None):
+        unbuffered = cursorclass is not None and issubclass(cursorclass, pymysql.cursors.SSCursor)
+        return SQLiteCursor(self, unbuffered=unbuffered)
+
+    def _control(self, statement):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError(0, "La conexión está cerrada.")
+        try:
+            self._raw.execute(statement)
+        except sqlite3.Error as e:
+            raise mysql_error(e, statement) from e
+
+    def begin(self):
+        # Como en MySQL, BEGIN confirma la transacción anterior. IMMEDIATE toma el bloqueo
+        # de escritura al empezar: hace el papel de los SELECT ... FOR UPDATE.
+        if self._raw is not None and self._raw.in_transaction:
+            self._control("COMMIT")
+        self._control("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._raw is not None and self._raw.in_transaction:
+            self._control("COMMIT")
+
+    def rollback(self):
+        if self._raw is not None and self._raw.in_transaction:
+            self._control("ROLLBACK")
+
+    def ping(self, reconnect=False):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError(0, "La conexión está cerrada.")
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            raw.close()
+
+class SQLiteDatabase:
+    """
+    Base SQLite compartida por las conexiones de un proceso. Si al abrirla no tiene tablas
+    se ejecutan 'scripts' (esquema y, opcionalmente, datos) traducidos desde MySQL.
+    """
+    def __init__(self, path, scripts=(), timeout=30.0):
+        self.path = path
+        self.scripts = [script for script in scripts if script]
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._keeper = None   # en memoria: mantiene viva la base aunque el pool cierre todo
+
+    def _target(self):
+        if self.path == MEMORY:
+            return f"file:/gestion_hotelera_{os.getpid()}?vfs=memdb", True
+        return self.path, False
+
+    def _open_raw(self):
+        target, uri = self._target()
+        raw = sqlite3.connect(target, uri=uri, timeout=self.timeout, isolation_level=None,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        raw.execute("PRAGMA foreign_keys = ON")
+        return raw
+
+    def connect(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._prepare()
+                self._pid = os.getpid()
+        return SQLiteConnection(self._open_raw())
+
+    def _prepare(self):
+        raw = self._open_raw()
+        if self.path == MEMORY:
+            self._keeper = raw
+        else:
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute("PRAGMA synchronous = NORMAL")
+        conn = SQLiteConnection(raw)
+        try:
+            # BEGIN IMMEDIATE: si otro proceso abre la misma base a la vez, espera a que termine la carga
+            with _script_transaction(conn):
+                tables = raw.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+                if not tables:
+                    for script in self.scripts:
+                        load_script(conn, script, transaction=False)
+        finally:
+            if self.path != MEMORY:
+                conn.close()
+
+# --- SCRIPTS SQL (Hotel_BD.sql, hotel_data_inserts.sql) ---
+def iter_sql_statements(path):
+    """Sentencias de un script de MySQL, respetando DELIMITER y saltando comentarios.
+    Lee línea a línea, así que sirve para los archivos de datos de 1M de reservas."""
+    delimiter = ';'
+    buffer = []
+    in_comment = False
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if in_comment:
+                in_comment = '*/' not in stripped
+                continue
+            if not buffer and stripped.startswith('/*'):
+                in_comment = '*/' not in stripped
+                continue
+            if not stripped or stripped.startswith('--'):
+                continue
+            if stripped.upper().startswith('DELIMITER '):
+                delimiter = stripped.split()[1]
+                continue
+            if stripped.endswith(delimiter):
+                buffer.append(stripped[:-len(delimiter)])
+                yield "\n".join(buffer)
+                buffer = []
+            else:
+                buffer.append(stripped)
+
+# Sentencias propias del servidor MySQL o de la sesión: no tienen equivalente en SQLite
+_SKIPPED_SCRIPT_RE = re.compile(
+    r"^(DROP\s+DATABASE|CREATE\s+DATABASE|USE\s|SET\s|PREPARE\s|EXECUTE\s|DEALLOCATE\s|"
+    r"(CREATE|DROP)\s+(PROCEDURE|FUNCTION|TRIGGER)\b|START\s+TRANSACTION|BEGIN\b|COMMIT\b|ROLLBACK\b|"
+    r"SELECT\b[^;]*\bINTO\s+@)", re.IGNORECASE)
+_CREATE_TABLE_RE = re.compile(r"^CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\((.*)\)([^)]*)$",
+                              re.IGNORECASE | re.DOTALL)
+_TABLE_INDEX_RE = re.compile(r"^(UNIQUE\s+|FULLTEXT\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_ALTER_ADD_INDEX_RE = re.compile(r"^ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+(UNIQUE\s+|FULLTEXT\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*\((.*)\)$",
+                                 re.IGNORECASE | re.DOTALL)
+_CREATE_INDEX_RE = re.compile(r"^CREATE\s+(UNIQUE\s+|FULLTEXT\s+)?INDEX\b", re.IGNORECASE)
+_ENUM_RE = re.compile(r"^(`?\w+`?)\s+ENUM\s*\((.*?)\)", re.IGNORECASE | re.DOTALL)
+_AUTO_INCREMENT_RE = re.compile(r"^(`?\w+`?)\s+\w+(\(\d+\))?\s+.*AUTO_INCREMENT.*$", re.IGNORECASE | re.DOTALL)
+_COLUMN_REWRITES = (
+    (re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b", re.IGNORECASE), ""),
+    (re.compile(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", re.IGNORECASE), "DEFAULT (DATETIME('now', 'localtime'))"),
+    (re.compile(r"\s+(CHARACTER\s+SET|CHARSET|COLLATE)\s+\w+", re.IGNORECASE), ""),
+    (re.compile(r"\s+UNSIGNED\b", re.IGNORECASE), ""),
+    (re.compile(r"\s+COMMENT\s+'(?:[^']|'')*'", re.IGNORECASE), ""),
+    (re.compile(r"\\\\"), r"\\"),   # '\\.' de MySQL es '\.' en SQLite (no hay escapes con '\')
+)
+
+def _split_top_level(body):
+    """Separa por comas fuera de paréntesis y de literales de texto."""
+    items, current, depth, quote = [], [], 0, None
+    for char in body:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if "".join(current).strip():
+        items.append("".join(current).strip())
+    return items
+
+def _index_statement(unique, name, table, columns):
+    columns = re.sub(r"\(\d+\)", "", columns)   # prefijos de índice: col(20)
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+
+def _translate_create_table(match):
+    table, body = match.group(2), match.group(3)
+    definitions, indexes = [], []
+    for item in _split_top_level(body):
+        index = _TABLE_INDEX_RE.match(item)
+        if index:
+            kind = (index.group(1) or "").strip().upper()
+            if kind != "FULLTEXT":   # la búsqueda usa SEARCH_MODE=like
+                indexes.append(_index_statement(kind == "UNIQUE", index.group(2), table, index.group(3)))
+            continue
+        enum = _ENUM_RE.match(item)
+        if enum:
+            item = f"{enum.group(1)} TEXT CHECK ({enum.group(1)} IN ({enum.group(2)}))" + item[enum.end():]
+        elif _AUTO_INCREMENT_RE.match(item):
+            item = f"{_AUTO_INCREMENT_RE.match(item).group(1)} INTEGER PRIMARY KEY AUTOINCREMENT"
+        for pattern, replacement in _COLUMN_REWRITES:
+            item = pattern.sub(replacement, item)
+        definitions.append(item)
+    create = f"CREATE TABLE {'IF NOT EXISTS ' if match.group(1) else ''}{table} (\n  " + ",\n  ".join(definitions) + "\n)"
+    return [create] + indexes
+
+def translate_script_statement(statement):
+    """Sentencias de SQLite (0, 1 o varias) equivalentes a una sentencia de un script de MySQL."""
+    statement = statement.strip()
+    if not statement or _SKIPPED_SCRIPT_RE.match(statement):
+        return []
+    create = _CREATE_TABLE_RE.match(statement)
+    if create:
+        return _translate_create_table(create)
+    alter_index = _ALTER_ADD_INDEX_RE.match(statement)
+    if alter_index:
+        kind = (alter_index.group(2) or "").strip().upper()
+        if kind == "FULLTEXT":
+            return []
+        return [_index_statement(kind == "UNIQUE", alter_index.group(3), alter_index.group(1), alter_index.group(4))]
+    if _CREATE_INDEX_RE.match(statement):
+        if statement.upper().startswith("CREATE FULLTEXT"):
+            return []
+        return [re.sub(r"\s+USING\s+\w+", "", statement, flags=re.IGNORECASE)]
+    if re.match(r"^ALTER\s+TABLE\b", statement, re.IGNORECASE):
+        for pattern, replacement in _COLUMN_REWRITES:
+            statement = pattern.sub(replacement, statement)
+    return [statement]
+
+@contextlib.contextmanager
+def _script_transaction(conn):
+    # Como los volcados de MySQL (SET FOREIGN_KEY_CHECKS=0): la carga no valida claves foráneas.
+    # El PRAGMA no tiene efecto dentro de una transacción, por eso va antes de BEGIN.
+    conn._control("PRAGMA foreign_keys = OFF")
+    conn.begin()
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        conn._control("PRAGMA foreign_keys = ON")
+
+def load_script(conn, path, transaction=True):
+    """Ejecuta un script de MySQL (esquema o datos) en una SQLiteConnection, en una sola
+    transacción salvo transaction=False. Retorna el número de sentencias ejecutadas."""
+    count = 0
+    with _script_transaction(conn) if transaction else contextlib.nullcontext():
+        with conn.cursor() as cur:
+            for statement in iter_sql_statements(path):
+                for sql in translate_script_statement(statement):
+                    cur.execute(sql)
+                    count += 1
+    return count